@@ -0,0 +1,166 @@
+"""
+Сравнение путей сериализации GET /finance/transactions.
+
+- pydantic: ORM-сущности -> TransactionResponse на строку -> повторная
+  валидация и jsonable_encoder через response_model -> JSONResponse
+  (так работал обработчик до быстрого пути);
+- fast: кортежи колонок -> словари -> ORJSONResponse (текущий обработчик).
+
+Запуск из корня репозитория:
+    python benchmarks/finance_serialization.py [--rows 20 100 1000] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SERVICE_DIR = ROOT_DIR / "services" / "finance-service"
+for p in (ROOT_DIR, SERVICE_DIR):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from db.models import Transaction  # noqa: E402
+from app.schemas import TransactionResponse, TransactionsListResponse, from_cents  # noqa: E402
+from app.serialization import FastJSONResponse, transactions_page_payload  # noqa: E402
+
+RESPONSE_FIELD = create_response_field(name="response", type_=TransactionsListResponse)
+NAMES = {1: "food", 2: "transport", 3: "salary"}
+
+
+def make_rows(count: int) -> list[tuple]:
+    """Синтетические строки в порядке TRANSACTION_COLUMNS."""
+    user_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    return [
+        (
+            str(uuid.uuid4()),
+            user_id,
+            "expense" if i % 3 else "income",
+            1000 + i * 7,
+            i % 3 + 1,
+            f"row {i}",
+            now - timedelta(hours=i),
+            now,
+        )
+        for i in range(count)
+    ]
+
+
+def make_entities(rows: list[tuple]) -> list[Transaction]:
+    """Те же данные в виде ORM-сущностей."""
+    return [
+        Transaction(
+            id=r[0],
+            user_id=r[1],
+            type=r[2],
+            amount_cents=r[3],
+            category_id=r[4],
+            description=r[5],
+            occurred_at=r[6],
+            created_at=r[7],
+        )
+        for r in rows
+    ]
+
+
+async def pydantic_path(entities: list[Transaction]) -> bytes:
+    model = TransactionsListResponse(
+        items=[
+            TransactionResponse(
+                id=str(tx.id),
+                user_id=str(tx.user_id),
+                type=tx.type,
+                amount=from_cents(tx.amount_cents),
+                category=NAMES[tx.category_id],
+                description=tx.description,
+                occurred_at=tx.occurred_at,
+                created_at=tx.created_at,
+            )
+            for tx in entities
+        ],
+        total=len(entities),
+        limit=len(entities),
+        offset=0,
+    )
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=model)
+    return JSONResponse(content).body
+
+
+def fast_path(rows: list[tuple]) -> bytes:
+    payload = transactions_page_payload(rows, NAMES, total=len(rows), limit=len(rows), offset=0)
+    return FastJSONResponse(payload).body
+
+
+async def best_time(call: Callable[[], Awaitable[bytes]], number: int, repeat: int) -> float:
+    """Лучшее из repeat среднее время вызова в секундах."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            await call()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+async def measure(counts: list[int], repeat: int) -> list[dict]:
+    """
+    Оба пути замеряются в одной корутине одного event loop.
+
+    Старый путь и в обработчике был корутиной, так что его await входит в
+    замер, а запуск loop на каждую итерацию — нет.
+    """
+
+    async def fast(rows: list[tuple]) -> bytes:
+        return fast_path(rows)
+
+    results = []
+    for count in counts:
+        rows = make_rows(count)
+        entities = make_entities(rows)
+        assert json.loads(await pydantic_path(entities)) == json.loads(fast_path(rows))
+
+        number = max(1, 20000 // count)
+        slow = await best_time(lambda: pydantic_path(entities), number, repeat)
+        quick = await best_time(lambda: fast(rows), number, repeat)
+        results.append(
+            {
+                "rows": count,
+                "pydantic_ms": round(slow * 1000, 4),
+                "fast_ms": round(quick * 1000, 4),
+                "speedup": round(slow / quick, 2),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(measure(args.rows, args.repeat))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'rows':>6} {'pydantic, ms':>14} {'fast, ms':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['rows']:>6} {r['pydantic_ms']:>14.3f} {r['fast_ms']:>10.3f} {r['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Нагрузочный прогон сервисов в одном процессе.
+
+Все четыре сервиса загружаются как ASGI-приложения (каждый пакет app под своим
+именем) и вызываются через httpx.ASGITransport, без сети и uvicorn. БД — файл
+SQLite во временном каталоге или локальный Postgres (--db-url). Вызовы
+сервисов друг к другу перехватываются respx, как в тестах: /auth/validate по
+умолчанию мокается (токен "Bearer <user_id>:<username>"), с --real-auth
+уходит в auth-service с настоящими JWT; /notify/log всегда доходит до
+notification-service.
+
+Сценарии (--scenario, можно несколько):
+- auth_storm — регистрация и логин новых пользователей;
+- dashboard — загрузка дашборда: профиль, операции и три вида статистики
+  параллельно, как это делает SPA;
+- transaction_writes — создание операций (с уведомлением);
+- log_reads — чтение журнала уведомлений со случайным смещением.
+
+Результат — JSON с пропускной способностью и p50/p95/p99 по эндпоинтам.
+Сравнение двух прогонов (например, до и после изменения):
+    python benchmarks/loadtest.py --scenario dashboard log_reads --duration 15 --output base.json
+    python benchmarks/loadtest.py --scenario dashboard log_reads --duration 15 --output new.json
+    python benchmarks/loadtest.py --compare base.json new.json --max-regression 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Awaitable, Callable, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SERVICES_DIR = ROOT_DIR / "services"
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+SERVICES = {
+    "auth-service": "http://auth-service:8001",
+    "profile-service": "http://profile-service:8002",
+    "finance-service": "http://finance-service:8003",
+    "notification-service": "http://notification-service:8004",
+}
+PASSWORD = "load-test-password"
+CATEGORIES = ("food", "transport", "rent", "salary", "fun")
+
+
+def prepare_environment(db_url: str) -> None:
+    """Переменные окружения до импорта сервисов: БД и отключение фоновых задач и шумных логов."""
+    os.environ["DATABASE_URL"] = db_url
+    # логи сервисов идут в stdout и смешались бы с отчетом
+    os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+    os.environ.setdefault("DB_SLOW_QUERY_MS", "0")
+    os.environ.setdefault("REPORTS_REFRESH_INTERVAL_SECONDS", "0")
+    os.environ.setdefault("READINESS_INTERVAL_SECONDS", "3600")
+    os.environ.setdefault("DRAIN_SECONDS", "0")
+
+
+def enable_sqlite_types() -> None:
+    """Типы Postgres в моделях (UUID, JSONB) для SQLite."""
+    from sqlalchemy.dialects.postgresql import JSONB, UUID
+    from sqlalchemy.ext.compiler import compiles
+
+    compiles(UUID, "sqlite")(lambda type_, compiler, **kw: "CHAR(36)")
+    compiles(JSONB, "sqlite")(lambda type_, compiler, **kw: "JSON")
+
+
+def load_service(name: str) -> ModuleType:
+    """Импортирует services/<name>/app как отдельный пакет и возвращает его main."""
+    package = "svc_" + name.replace("-", "_")
+    if package not in sys.modules:
+        app_dir = SERVICES_DIR / name / "app"
+        spec = importlib.util.spec_from_file_location(
+            package, app_dir / "__init__.py", submodule_search_locations=[str(app_dir)]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[package] = module
+        spec.loader.exec_module(module)
+    return importlib.import_module(f"{package}.main")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль q (0..100) с линейной интерполяцией по отсортированному списку."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[str, int] = field(default_factory=dict)
+
+    def summary(self, duration: float) -> dict[str, Any]:
+        ordered = sorted(self.latencies)
+        ms = 1000.0
+        return {
+            "requests": len(ordered) + self.errors,
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "throughput_rps": round(len(ordered) / duration, 2) if duration else 0.0,
+            "mean_ms": round(sum(ordered) / len(ordered) * ms, 3) if ordered else 0.0,
+            "p50_ms": round(percentile(ordered, 50) * ms, 3),
+            "p95_ms": round(percentile(ordered, 95) * ms, 3),
+            "p99_ms": round(percentile(ordered, 99) * ms, 3),
+            "max_ms": round(ordered[-1] * ms, 3) if ordered else 0.0,
+        }
+
+
+@dataclass
+class User:
+    user_id: str
+    username: str
+    token: str = ""
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token or f'{self.user_id}:{self.username}'}"}
+
+
+class Harness:
+    """Сервисы в процессе, клиенты к ним и сбор задержек по эндпоинтам."""
+
+    def __init__(self, real_auth: bool, sqlite: bool) -> None:
+        import httpx
+
+        self.real_auth = real_auth
+        self.sqlite = sqlite
+        self.modules = {name: load_service(name) for name in SERVICES}
+        self.clients = {
+            name: httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=module.app),
+                base_url=SERVICES[name],
+                timeout=60.0,
+            )
+            for name, module in self.modules.items()
+        }
+        self.stats: dict[str, EndpointStats] = {}
+        self.users: list[User] = []
+
+    async def start(self) -> None:
+        from db.models import Base
+        import db.session as db_session
+
+        async with db_session.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        for module in self.modules.values():
+            await module.app.router.startup()
+
+    async def stop(self) -> None:
+        import db.session as db_session
+
+        for name, module in self.modules.items():
+            await module.app.router.shutdown()
+            await self.clients[name].aclose()
+        await db_session.engine.dispose()
+
+    async def call(self, label: str, service: str, method: str, path: str, **kwargs: Any) -> Any:
+        """Выполняет запрос и записывает задержку под меткой label."""
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = EndpointStats()
+        started = time.perf_counter()
+        try:
+            resp = await self.clients[service].request(method, path, **kwargs)
+        except Exception as exc:
+            stats.errors += 1
+            key = type(exc).__name__
+            stats.statuses[key] = stats.statuses.get(key, 0) + 1
+            return None
+        elapsed = time.perf_counter() - started
+        key = str(resp.status_code)
+        stats.statuses[key] = stats.statuses.get(key, 0) + 1
+        if resp.status_code >= 400:
+            stats.errors += 1
+        else:
+            stats.latencies.append(elapsed)
+        return resp
+
+    def mock_upstreams(self, router: Any) -> None:
+        """Маршруты respx для вызовов сервисов друг к другу."""
+        import httpx
+
+        def forward(service: str) -> Callable[[httpx.Request], Awaitable[httpx.Response]]:
+            client = self.clients[service]
+
+            async def handler(request: httpx.Request) -> httpx.Response:
+                headers = {
+                    key: value
+                    for key, value in request.headers.items()
+                    if key in ("authorization", "content-type", "traceparent", "x-request-id")
+                }
+                resp = await client.request(
+                    request.method, request.url.path, params=request.url.params, headers=headers, content=request.content
+                )
+                return httpx.Response(resp.status_code, headers=resp.headers, content=resp.content)
+
+            return handler
+
+        async def fake_validate(request: httpx.Request) -> httpx.Response:
+            user_id, _, username = request.headers.get("authorization", "").removeprefix("Bearer ").partition(":")
+            if not username:
+                return httpx.Response(401, json={"detail": "Недействительный токен"})
+            return httpx.Response(200, json={"user_id": user_id, "username": username})
+
+        auth = SERVICES["auth-service"]
+        router.get(f"{auth}/health/live").mock(return_value=httpx.Response(200, json={"status": "live"}))
+        router.get(f"{auth}/auth/validate").mock(
+            side_effect=forward("auth-service") if self.real_auth else fake_validate
+        )
+        notification = SERVICES["notification-service"]
+        router.post(f"{notification}/notify/log").mock(side_effect=forward("notification-service"))
+
+    async def seed(self, users: int, transactions_per_user: int) -> None:
+        """Пользователи с профилями не создаются заранее (их создает GET /profile/me), операции — да."""
+        from sqlalchemy import insert
+
+        import db.session as db_session
+        from db.models import Category, Transaction, User as UserModel
+
+        security = sys.modules["svc_auth_service.security"]
+        password_hash = security.hash_password(PASSWORD)
+        now = datetime.now(timezone.utc)
+        rng = random.Random(42)
+        async with db_session.SessionFactory() as session:
+            for i in range(users):
+                user = User(str(uuid.uuid4()), f"load_{uuid.uuid4().hex[:10]}")
+                session.add(UserModel(id=user.user_id, username=user.username, password_hash=password_hash))
+                await session.flush()
+                category_ids = []
+                for name in CATEGORIES:
+                    category = Category(user_id=user.user_id, name=name)
+                    session.add(category)
+                    await session.flush()
+                    category_ids.append(category.id)
+                # Core insert без RETURNING: ORM-пачка со строковыми UUID не сопоставляется
+                # с ответом asyncpg (insertmanyvalues)
+                if transactions_per_user:
+                    await session.execute(
+                        insert(Transaction),
+                        [
+                            {
+                                "id": str(uuid.uuid4()),
+                                "user_id": user.user_id,
+                                "type": "income" if j % 10 == 0 else "expense",
+                                "amount_cents": rng.randint(100, 500_000),
+                                "category_id": rng.choice(category_ids),
+                                "description": f"seed {j}",
+                                "occurred_at": now - timedelta(hours=rng.randint(0, 24 * 120)),
+                            }
+                            for j in range(transactions_per_user)
+                        ],
+                    )
+                self.users.append(user)
+            await session.commit()
+
+        if self.real_auth:
+            for user in self.users:
+                resp = await self.clients["auth-service"].post(
+                    "/auth/login", json={"username": user.username, "password": PASSWORD}
+                )
+                resp.raise_for_status()
+                user.token = resp.json()["access_token"]
+
+
+async def scenario_auth_storm(h: Harness, worker: int, iteration: int) -> None:
+    username = f"storm_{worker}_{iteration}_{uuid.uuid4().hex[:8]}"
+    credentials = {"username": username, "password": PASSWORD}
+    await h.call("POST /auth/register", "auth-service", "POST", "/auth/register", json=credentials)
+    await h.call("POST /auth/login", "auth-service", "POST", "/auth/login", json=credentials)
+
+
+async def scenario_dashboard(h: Harness, worker: int, iteration: int) -> None:
+    user = h.users[(worker + iteration) % len(h.users)]
+    headers = user.headers
+    calls = [
+        h.call("GET /profile/me", "profile-service", "GET", "/profile/me", headers=headers),
+        h.call(
+            "GET /finance/transactions",
+            "finance-service",
+            "GET",
+            "/finance/transactions",
+            params={"limit": 20},
+            headers=headers,
+        ),
+        h.call("GET /finance/stats/summary", "finance-service", "GET", "/finance/stats/summary", headers=headers),
+        h.call(
+            "GET /finance/stats/by-category", "finance-service", "GET", "/finance/stats/by-category", headers=headers
+        ),
+    ]
+    if not h.sqlite:
+        # в SQLite func.date() возвращает строку, и эндпоинт отвечает 500
+        calls.append(
+            h.call(
+                "GET /finance/stats/by-day",
+                "finance-service",
+                "GET",
+                "/finance/stats/by-day",
+                params={"days": 30},
+                headers=headers,
+            )
+        )
+    await asyncio.gather(*calls)
+
+
+async def scenario_transaction_writes(h: Harness, worker: int, iteration: int) -> None:
+    user = h.users[(worker + iteration) % len(h.users)]
+    payload = {
+        "type": "expense",
+        "amount": f"{random.randint(1, 5000)}.{random.randint(0, 99):02d}",
+        "category": random.choice(CATEGORIES),
+        "description": "load test",
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+    }
+    await h.call(
+        "POST /finance/transactions", "finance-service", "POST", "/finance/transactions", json=payload, headers=user.headers
+    )
+
+
+async def scenario_log_reads(h: Harness, worker: int, iteration: int) -> None:
+    await h.call(
+        "GET /notify/logs",
+        "notification-service",
+        "GET",
+        "/notify/logs",
+        params={"limit": 50, "offset": random.randint(0, 200)},
+    )
+
+
+Scenario = Callable[[Harness, int, int], Awaitable[None]]
+SCENARIOS: dict[str, Scenario] = {
+    "auth_storm": scenario_auth_storm,
+    "dashboard": scenario_dashboard,
+    "transaction_writes": scenario_transaction_writes,
+    "log_reads": scenario_log_reads,
+}
+
+
+async def run_scenario(
+    h: Harness, scenario: Scenario, concurrency: int, duration: float, max_iterations: Optional[int]
+) -> float:
+    """Гоняет сценарий concurrency воркерами до истечения duration (или max_iterations итераций)."""
+    started = time.perf_counter()
+    deadline = started + duration
+    issued = 0
+
+    async def worker(worker_id: int) -> None:
+        nonlocal issued
+        iteration = 0
+        while time.perf_counter() < deadline and (max_iterations is None or issued < max_iterations):
+            issued += 1
+            await scenario(h, worker_id, iteration)
+            iteration += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return time.perf_counter() - started
+
+
+def git_revision() -> Optional[str]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{revision}-dirty" if dirty else revision
+
+
+async def run(args: argparse.Namespace, db_url: str) -> dict[str, Any]:
+    import respx
+
+    h = Harness(real_auth=args.real_auth, sqlite=db_url.startswith("sqlite"))
+    await h.start()
+    report: dict[str, Any] = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "db": db_url.split(":", 1)[0],
+            "real_auth": args.real_auth,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "users": args.users,
+            "seed_transactions": args.seed_transactions,
+        },
+        "scenarios": {},
+    }
+    try:
+        with respx.mock(assert_all_called=False) as router:
+            h.mock_upstreams(router)
+            await h.seed(args.users, args.seed_transactions)
+            for name in args.scenario:
+                scenario = SCENARIOS[name]
+                if args.warmup > 0:
+                    await run_scenario(h, scenario, args.concurrency, args.warmup, None)
+                h.stats = {}
+                elapsed = await run_scenario(h, scenario, args.concurrency, args.duration, args.iterations)
+                endpoints = {label: stats.summary(elapsed) for label, stats in sorted(h.stats.items())}
+                completed = sum(len(stats.latencies) for stats in h.stats.values())
+                report["scenarios"][name] = {
+                    "elapsed_s": round(elapsed, 3),
+                    "requests": sum(item["requests"] for item in endpoints.values()),
+                    "errors": sum(item["errors"] for item in endpoints.values()),
+                    "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+                    "endpoints": endpoints,
+                }
+                print(f"{name}: {completed} запросов за {elapsed:.1f} с", file=sys.stderr)
+    finally:
+        await h.stop()
+    return report
+
+
+def compare(base_path: str, new_path: str, max_regression: Optional[float]) -> int:
+    """Печатает изменения p50/p95/p99 и пропускной способности; 1 — если p95 вырос больше порога."""
+    base = json.loads(Path(base_path).read_text(encoding="utf-8"))
+    new = json.loads(Path(new_path).read_text(encoding="utf-8"))
+    print(f"{base['meta'].get('revision')} -> {new['meta'].get('revision')}")
+    regressions = []
+
+    def delta(old: float, current: float) -> str:
+        if not old:
+            return "   n/a"
+        return f"{(current - old) / old * 100:+6.1f}%"
+
+    for scenario, data in new["scenarios"].items():
+        old_scenario = base["scenarios"].get(scenario)
+        if old_scenario is None:
+            print(f"\n{scenario}: нет в базовом прогоне")
+            continue
+        print(
+            f"\n{scenario}: {old_scenario['throughput_rps']} -> {data['throughput_rps']} rps "
+            f"({delta(old_scenario['throughput_rps'], data['throughput_rps'])})"
+        )
+        print(f"  {'endpoint':40} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+        for label, current in data["endpoints"].items():
+            old = old_scenario["endpoints"].get(label)
+            if old is None:
+                print(f"  {label:40} (новый эндпоинт)")
+                continue
+            cells = [
+                f"{old[key]:>7.2f}->{current[key]:>7.2f} {delta(old[key], current[key])}"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            ]
+            print(f"  {label:40} " + " ".join(cells))
+            if max_regression is not None and old["p95_ms"] and (
+                (current["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 > max_regression
+            ):
+                regressions.append(f"{scenario} {label}")
+    if regressions:
+        print(f"\np95 вырос больше чем на {max_regression}%: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["dashboard"])
+    parser.add_argument("--concurrency", type=int, default=10, help="число параллельных виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность каждого сценария, с")
+    parser.add_argument("--iterations", type=int, default=None, help="ограничить число итераций сценария")
+    parser.add_argument("--warmup", type=float, default=1.0, help="прогрев перед замером, с")
+    parser.add_argument("--users", type=int, default=20, help="пользователей с операциями для dashboard/writes")
+    parser.add_argument("--seed-transactions", type=int, default=200, help="операций на пользователя")
+    parser.add_argument("--db-url", default=None, help="URL БД (по умолчанию временный файл SQLite)")
+    parser.add_argument("--real-auth", action="store_true", help="проверять токены настоящим auth-service")
+    parser.add_argument("--output", default=None, help="куда записать JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="сравнить два JSON-отчета")
+    parser.add_argument("--max-regression", type=float, default=None, help="порог роста p95 для --compare, %%")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.max_regression))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = args.db_url or f"sqlite+aiosqlite:///{tmp}/loadtest.db"
+        prepare_environment(db_url)
+        if db_url.startswith("sqlite"):
+            enable_sqlite_types()
+        report = asyncio.run(run(args, db_url))
+
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
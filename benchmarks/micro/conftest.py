@@ -0,0 +1,158 @@
+"""
+Общие фикстуры микробенчмарков и сравнение с базовой линией.
+
+Пакеты app разных сервисов называются одинаково, поэтому каждый загружается
+под своим именем (svc_<service>), как в benchmarks/loadtest.py.
+
+Результаты сводятся в компактный JSON (медиана, минимум и число раундов по
+имени бенчмарка, ключи отсортированы), который хранится в репозитории:
+    pytest benchmarks/micro --save-baseline                      # записать baseline.json
+    pytest benchmarks/micro --compare-baseline --max-regression 20
+Сравнение идет по медиане; запуск падает, если какой-то бенчмарк медленнее
+базовой линии больше чем на --max-regression процентов.
+"""
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+SERVICES_DIR = ROOT_DIR / "services"
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+
+def load_module(service: str, module: str) -> ModuleType:
+    """Импортирует services/<service>/app/<module>."""
+    package = "svc_" + service.replace("-", "_")
+    if package not in sys.modules:
+        app_dir = SERVICES_DIR / service / "app"
+        spec = importlib.util.spec_from_file_location(
+            package, app_dir / "__init__.py", submodule_search_locations=[str(app_dir)]
+        )
+        loaded = importlib.util.module_from_spec(spec)
+        sys.modules[package] = loaded
+        spec.loader.exec_module(loaded)
+    return importlib.import_module(f"{package}.{module}")
+
+
+@pytest.fixture(scope="session")
+def auth_security() -> ModuleType:
+    return load_module("auth-service", "security")
+
+
+@pytest.fixture(scope="session")
+def finance_schemas() -> ModuleType:
+    return load_module("finance-service", "schemas")
+
+
+@pytest.fixture(scope="session")
+def finance_serialization() -> ModuleType:
+    return load_module("finance-service", "serialization")
+
+
+@pytest.fixture(scope="session")
+def notification_schemas() -> ModuleType:
+    return load_module("notification-service", "schemas")
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("baseline", "сравнение с базовой линией")
+    group.addoption("--baseline", default=str(BASELINE_FILE), help="файл базовой линии")
+    group.addoption("--save-baseline", action="store_true", help="записать результаты как базовую линию")
+    group.addoption("--compare-baseline", action="store_true", help="сравнить результаты с базовой линией")
+    group.addoption(
+        "--max-regression", type=float, default=20.0, help="допустимый рост медианы, %% (по умолчанию 20)"
+    )
+
+
+def _revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def collect_results(config: pytest.Config) -> dict[str, dict[str, Any]]:
+    """Медиана и минимум (мкс) по каждому выполненному бенчмарку."""
+    session = getattr(config, "_benchmarksession", None)
+    results: dict[str, dict[str, Any]] = {}
+    for bench in session.benchmarks if session is not None else ():
+        if not bench.stats.data:
+            continue
+        results[bench.name] = {
+            "median_us": round(bench.stats.median * 1e6, 3),
+            "min_us": round(bench.stats.min * 1e6, 3),
+            "rounds": bench.stats.rounds,
+        }
+    return results
+
+
+def compare_results(
+    baseline: dict[str, dict[str, Any]], current: dict[str, dict[str, Any]], max_regression: float
+) -> tuple[list[str], list[str]]:
+    """Строки отчета и имена бенчмарков, медиана которых выросла больше порога."""
+    lines = []
+    regressions = []
+    for name, result in sorted(current.items()):
+        old = baseline.get(name)
+        if old is None or not old["median_us"]:
+            lines.append(f"{name:50} {result['median_us']:>14.3f} мкс (нет в базовой линии)")
+            continue
+        change = (result["median_us"] - old["median_us"]) / old["median_us"] * 100
+        mark = ""
+        if change > max_regression:
+            regressions.append(name)
+            mark = "  РЕГРЕССИЯ"
+        lines.append(f"{name:50} {old['median_us']:>14.3f} -> {result['median_us']:>14.3f} мкс {change:+7.1f}%{mark}")
+    return lines, regressions
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    config = session.config
+    if not (config.getoption("save_baseline") or config.getoption("compare_baseline")):
+        return
+    current = collect_results(config)
+    path = Path(config.getoption("baseline"))
+    report: list[str] = []
+    if config.getoption("compare_baseline"):
+        if not path.exists():
+            report.append(f"Нет базовой линии {path}")
+            session.exitstatus = pytest.ExitCode.USAGE_ERROR
+        else:
+            baseline = json.loads(path.read_text(encoding="utf-8"))["benchmarks"]
+            max_regression = config.getoption("max_regression")
+            report, regressions = compare_results(baseline, current, max_regression)
+            if regressions:
+                report.append(f"Медиана выросла больше чем на {max_regression}%: {', '.join(regressions)}")
+                session.exitstatus = pytest.ExitCode.TESTS_FAILED
+    if config.getoption("save_baseline"):
+        payload = {
+            "meta": {"revision": _revision(), "python": platform.python_version(), "machine": platform.machine()},
+            "benchmarks": current,
+        }
+        path.write_text(json.dumps(payload, indent=2, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        report.append(f"Базовая линия записана в {path} ({len(current)} бенчмарков)")
+    config._baseline_report = report
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    report = getattr(config, "_baseline_report", None)
+    if report:
+        terminalreporter.section("baseline")
+        for line in report:
+            terminalreporter.write_line(line)
@@ -0,0 +1,22 @@
+"""Выпуск и проверка JWT, хеширование паролей."""
+import pytest
+from passlib.context import CryptContext
+
+
+def test_create_access_token(benchmark, auth_security):
+    result = benchmark(auth_security.create_access_token, user_id="8d0c8c9e-5b5c-4b8e-9a53-3f1f0c1d2e3f", username="alice")
+    assert result["token"]
+
+
+def test_decode_token(benchmark, auth_security):
+    token = auth_security.create_access_token(user_id="8d0c8c9e-5b5c-4b8e-9a53-3f1f0c1d2e3f", username="alice")["token"]
+    claims = benchmark(auth_security.decode_token, token)
+    assert claims["username"] == "alice"
+
+
+@pytest.mark.parametrize("rounds", [4, 10, 12])
+def test_hash_password(benchmark, auth_security, monkeypatch, rounds):
+    # 12 — значение по умолчанию passlib, с которым работает сервис
+    monkeypatch.setattr(auth_security, "pwd_context", CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds))
+    hashed = benchmark.pedantic(auth_security.hash_password, args=("correct horse battery",), rounds=5, iterations=1)
+    assert hashed.startswith("$2b$%02d$" % rounds)
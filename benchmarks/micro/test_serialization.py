@@ -0,0 +1,90 @@
+"""Построение ответов со списками: pydantic-модели и быстрый путь finance-service."""
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+SIZES = [20, 100, 1000]
+NAMES = {1: "food", 2: "transport", 3: "salary"}
+
+
+def transaction_rows(count):
+    user_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    return [
+        (
+            str(uuid.uuid4()),
+            user_id,
+            "expense" if i % 3 else "income",
+            1000 + i * 7,
+            i % 3 + 1,
+            f"row {i}",
+            now - timedelta(hours=i),
+            now,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_transaction_response_list(benchmark, finance_schemas, count):
+    rows = transaction_rows(count)
+
+    def build():
+        return [
+            finance_schemas.TransactionResponse(
+                id=tx_id,
+                user_id=user_id,
+                type=t_type,
+                amount=finance_schemas.from_cents(amount_cents),
+                category=NAMES[category_id],
+                description=description,
+                occurred_at=occurred_at,
+                created_at=created_at,
+            )
+            for tx_id, user_id, t_type, amount_cents, category_id, description, occurred_at, created_at in rows
+        ]
+
+    items = benchmark(build)
+    assert items[0].amount == Decimal("10.00")
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_transactions_page_payload(benchmark, finance_serialization, count):
+    rows = transaction_rows(count)
+
+    def render():
+        payload = finance_serialization.transactions_page_payload(rows, NAMES, total=count, limit=count, offset=0)
+        return finance_serialization.FastJSONResponse(payload).body
+
+    assert benchmark(render).startswith(b'{"items":[')
+
+
+@pytest.mark.parametrize("count", SIZES)
+def test_notification_log_response_list(benchmark, notification_schemas, count):
+    now = datetime.utcnow()
+    logs = [
+        (i, str(uuid.uuid4()), "transaction_created", f"Создана операция {i}", {"amount": "10.00", "type": "expense"}, now)
+        for i in range(count)
+    ]
+
+    def build():
+        return notification_schemas.NotificationLogsList(
+            items=[
+                notification_schemas.NotificationLogResponse(
+                    id=log_id,
+                    user_id=user_id,
+                    event_type=event_type,
+                    message=message,
+                    payload=payload,
+                    created_at=created_at,
+                )
+                for log_id, user_id, event_type, message, payload, created_at in logs
+            ],
+            total=count,
+            limit=count,
+            offset=0,
+        )
+
+    assert len(benchmark(build).items) == count
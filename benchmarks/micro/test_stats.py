@@ -0,0 +1,34 @@
+"""Обработка агрегатов на стороне Python в /finance/stats/by-category и /finance/stats/by-day."""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.mark.parametrize("categories", [10, 200])
+def test_category_stats_payload(benchmark, finance_serialization, categories):
+    rng = random.Random(1)
+    names = {i: f"category {i}" for i in range(categories)}
+    # строки (type, category_id, sum) как из GROUP BY type, category_id; суммы Postgres — Decimal
+    rows = [(t_type, i, Decimal(rng.randint(100, 10**8))) for i in range(categories) for t_type in ("income", "expense")]
+
+    def render():
+        return finance_serialization.FastJSONResponse(finance_serialization.category_stats_payload(rows, names)).body
+
+    assert b'"income"' in benchmark(render)
+
+
+@pytest.mark.parametrize("days", [30, 365])
+def test_day_stats_payload(benchmark, finance_serialization, days):
+    rng = random.Random(1)
+    today = date.today()
+    rows = [
+        (today - timedelta(days=i), Decimal(rng.randint(0, 10**6)), None if i % 4 else Decimal(rng.randint(0, 10**6)))
+        for i in range(days)
+    ]
+
+    def render():
+        return finance_serialization.FastJSONResponse(finance_serialization.day_stats_payload(rows)).body
+
+    assert benchmark(render).count(b'"date"') == days
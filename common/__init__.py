@@ -0,0 +1 @@
+"""Общий код сервисов: health-проверки, метрики, трассировка и т.п."""
@@ -0,0 +1,147 @@
+"""
+Проверки готовности (readiness) с кэшированием.
+
+Проверки зависимостей (БД, auth-service) выполняются фоновой задачей раз в
+READINESS_INTERVAL_SECONDS, а /health/ready отдает последний результат, поэтому
+частые пробы kubelet не создают нагрузки на зависимости. Результат старше
+READINESS_STALE_SECONDS считается недействительным (фоновая задача зависла).
+Во время остановки (drain) сервис сразу сообщает, что не готов. Перевести
+сервис в drain и вернуть из него можно только с localhost (preStop-хук
+выполняется внутри пода): иначе любой клиент в кластере мог бы вывести все
+поды из балансировки.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+from fastapi import HTTPException, Request, status
+
+READINESS_INTERVAL_SECONDS = float(os.getenv("READINESS_INTERVAL_SECONDS", "5"))
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+READINESS_STALE_SECONDS = float(os.getenv("READINESS_STALE_SECONDS", "30"))
+# сколько ждать после перехода в drain, чтобы балансировщики убрали под из ротации
+DRAIN_SECONDS = float(os.getenv("DRAIN_SECONDS", "10"))
+LOOPBACK_HOSTS = frozenset({"127.0.0.1", "::1"})
+
+Check = Callable[[], Awaitable[None]]
+
+logger = logging.getLogger("readiness")
+
+
+class ReadinessMonitor:
+    """Периодически выполняет проверки и хранит их последний результат."""
+
+    def __init__(
+        self,
+        interval: float = READINESS_INTERVAL_SECONDS,
+        timeout: float = READINESS_TIMEOUT_SECONDS,
+        stale_after: float = READINESS_STALE_SECONDS,
+    ) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.checks: dict[str, Check] = {}
+        self.results: dict[str, str] = {}
+        self.checked_at: Optional[float] = None
+        self.draining = False
+        self._task: Optional[asyncio.Task] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def add_check(self, name: str, check: Check) -> None:
+        """Регистрирует проверку: корутина, которая бросает исключение при сбое."""
+        self.checks[name] = check
+
+    def add_http_check(self, name: str, url: str) -> None:
+        """Проверка доступности HTTP-зависимости: ответ 2xx на GET url."""
+
+        async def check() -> None:
+            if self._http is None:
+                self._http = httpx.AsyncClient(timeout=self.timeout)
+            resp = await self._http.get(url)
+            resp.raise_for_status()
+
+        self.add_check(name, check)
+
+    async def refresh(self) -> dict[str, str]:
+        """Выполняет все проверки параллельно и сохраняет результат."""
+        names = list(self.checks)
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(self.checks[name](), self.timeout) for name in names),
+            return_exceptions=True,
+        )
+        results = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                results[name] = f"error: {type(outcome).__name__}"
+                if self.results.get(name, "ok") == "ok":
+                    logger.warning("Проверка готовности %s не прошла: %r", name, outcome)
+            else:
+                results[name] = "ok"
+        self.results = results
+        self.checked_at = time.monotonic()
+        return results
+
+    def status(self) -> tuple[bool, dict[str, Any]]:
+        """Готовность по кэшированному результату, без обращения к зависимостям."""
+        if self.draining:
+            return False, {"status": "draining"}
+        if self.checked_at is None:
+            return False, {"status": "starting"}
+        if time.monotonic() - self.checked_at > self.stale_after:
+            return False, {"status": "stale", "checks": self.results}
+        ready = all(result == "ok" for result in self.results.values())
+        return ready, {"status": "ready" if ready else "not_ready", "checks": self.results}
+
+    async def start(self) -> None:
+        """Выполняет первые проверки (сервис стартует с известным состоянием) и запускает фоновое обновление."""
+        self.draining = False
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def drain(self, seconds: float = DRAIN_SECONDS) -> None:
+        """Переводит сервис в drain и ждет, пока под уберут из балансировки."""
+        if not self.draining:
+            logger.info("Сервис переходит в drain на %.0f с", seconds)
+        self.draining = True
+        await asyncio.sleep(seconds)
+
+    def undrain(self) -> None:
+        """Возвращает сервис из drain (например, если остановку пода отменили)."""
+        if self.draining:
+            logger.info("Сервис вышел из drain")
+        self.draining = False
+
+    async def stop(self) -> None:
+        """Останавливает фоновые проверки; после этого сервис не готов."""
+        self.draining = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.warning("Не удалось обновить проверки готовности", exc_info=True)
+
+
+def require_loopback(request: Request) -> None:
+    """Зависимость FastAPI: пропускает только запросы с localhost, иначе 403."""
+    host = request.client.host if request.client else None
+    if host not in LOOPBACK_HOSTS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Доступно только с localhost",
+        )
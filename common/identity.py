@@ -0,0 +1,54 @@
+"""
+Подписанный заголовок с личностью пользователя для внутренних вызовов.
+
+web-frontend проверяет JWT на входе и передает profile/finance заголовок
+X-Internal-Identity: base64url(JSON {user_id, username, exp}) и
+HMAC-SHA256 от него на общем секрете INTERNAL_IDENTITY_SECRET. Сервисы,
+получив корректный неистекший заголовок, не вызывают auth-service
+/auth/validate. Срок жизни заголовка — секунды: его достаточно на один
+запрос, а перехваченное значение быстро становится бесполезным.
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, Optional
+
+IDENTITY_HEADER = "X-Internal-Identity"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _signature(payload: str, secret: str) -> str:
+    return _b64encode(hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def sign_identity(user_id: str, username: str, secret: str, ttl_seconds: int) -> str:
+    """Значение заголовка X-Internal-Identity."""
+    claims = {"user_id": user_id, "username": username, "exp": int(time.time()) + ttl_seconds}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":"), ensure_ascii=False).encode())
+    return f"{payload}.{_signature(payload, secret)}"
+
+
+def verify_identity(value: Optional[str], secret: str) -> Optional[Dict[str, str]]:
+    """{user_id, username} из заголовка или None, если он отсутствует, подделан или истек."""
+    if not value or not secret:
+        return None
+    payload, _, signature = value.partition(".")
+    if not payload or not hmac.compare_digest(signature.encode(), _signature(payload, secret).encode()):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(claims, dict) or claims.get("exp", 0) < time.time() or not claims.get("user_id"):
+        return None
+    return {"user_id": claims["user_id"], "username": claims.get("username")}
@@ -0,0 +1,220 @@
+"""
+Неблокирующее структурированное логирование.
+
+Корневой логгер пишет в QueueHandler: на event loop остается только создание
+записи и постановка в очередь, а форматирование (JSON или LOG_FORMAT) и запись
+в stdout выполняет QueueListener в отдельном потоке. Логи uvicorn
+(включая access log) идут через ту же очередь.
+
+Каждая запись получает request_id (заголовок X-Request-ID или новый) и trace_id
+текущей трассы. Для шумных логгеров можно задать долю сохраняемых записей
+уровня INFO и ниже: LOG_SAMPLING="uvicorn.access=0.1,notification-service.events=0.2".
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.tracing import current_trace_id, trace_headers
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# атрибуты LogRecord, которые не выводятся как дополнительные поля JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "trace_id",
+    "color_message",  # дубль сообщения с ANSI-цветами от uvicorn
+}
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def correlation_headers(headers: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Заголовки исходящего запроса: traceparent и X-Request-ID текущего запроса."""
+    result = trace_headers(headers)
+    request_id = _request_id.get()
+    if request_id is not None:
+        result[REQUEST_ID_HEADER] = request_id
+    return result
+
+
+def parse_sampling(value: str) -> dict[str, float]:
+    """Разбирает "logger=rate,..." в словарь; некорректные элементы пропускаются."""
+    rates: dict[str, float] = {}
+    for item in value.split(","):
+        name, sep, rate = item.partition("=")
+        if not sep:
+            continue
+        try:
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class ContextFilter(logging.Filter):
+    """
+    Дополняет запись request_id/trace_id и применяет выборку.
+
+    Работает в потоке, создавшем запись: contextvars недоступны в потоке
+    QueueListener, поэтому значения копируются в запись здесь.
+    """
+
+    def __init__(self, sampling: Optional[dict[str, float]] = None) -> None:
+        super().__init__()
+        self.sampling = sampling or {}
+        self._rates: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._rates.get(name)
+        if rate is None:
+            # настройка логгера действует и на его потомков: a.b.c -> a.b -> a
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.sampling:
+                    rate = self.sampling[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._rates[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sampling and record.levelno <= logging.INFO:
+            rate = self._rate(record.name)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        record.request_id = _request_id.get()
+        record.trace_id = current_trace_id()
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, который передает запись слушателю почти без обработки.
+
+    На месте только подставляются аргументы в сообщение (msg % args): это
+    дешево, а отложенная подстановка в потоке слушателя увидела бы уже
+    измененные аргументы, а repr ORM-объекта мог бы обратиться к БД вне
+    event loop. JSON и трассировка исключения по-прежнему форматируются
+    слушателем.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись; поля из extra= выводятся как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            data["request_id"] = request_id
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            data["trace_id"] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str, fmt: str, json_format: bool = True, sampling: str = "") -> None:
+    """
+    Направляет корневой логгер и логгеры uvicorn в очередь с фоновой записью в stdout.
+
+    json_format=False — текстовый формат fmt (как LOG_FORMAT раньше).
+    """
+    global _listener
+    stop_logging()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if json_format else logging.Formatter(fmt))
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(ContextFilter(parse_sampling(sampling)))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, stream)
+    _listener.start()
+
+
+@atexit.register
+def stop_logging() -> None:
+    """Дописывает записи из очереди и останавливает поток записи."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """ASGI-middleware: request_id для логов запроса и заголовок X-Request-ID в ответе."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                # чужое значение ограничивается, чтобы не раздувать логи
+                request_id = value.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+        encoded = request_id.encode("latin-1")
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", encoded)]
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_id.reset(token)
+
+
+def install_request_id(app: Any) -> None:
+    """Подключает RequestIdMiddleware к FastAPI-приложению."""
+    app.add_middleware(RequestIdMiddleware)
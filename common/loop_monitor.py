@@ -0,0 +1,117 @@
+"""
+Задержка event loop и поиск блокирующих вызовов.
+
+Фоновая задача просыпается раз в LOOP_LAG_INTERVAL_SECONDS и записывает в
+гистограмму event_loop_lag_seconds, насколько позже запланированного она
+получила управление: это время, которое готовые задачи ждут очереди из-за
+синхронного кода (bcrypt, запись логов, тяжелая сериализация).
+
+LOOP_BLOCK_DETECTION=true (staging, отладка, тесты) включает сторожевой поток:
+если loop опоздал больше чем на LOOP_BLOCK_THRESHOLD_MS, поток снимает стек
+потока event loop (тот код, который его держит) и пишет его в логгер
+loop.blocking; последние случаи доступны в LoopMonitor.blocks.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from prometheus_client import Counter, Histogram
+
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+LOOP_BLOCK_DETECTION = os.getenv("LOOP_BLOCK_DETECTION", "").strip().lower() in ("1", "true", "yes", "on")
+# сколько последних блокировок хранить для тестов и отладки
+BLOCKS_KEPT = 20
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Задержка запуска запланированной задачи event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+LOOP_BLOCKS = Counter(
+    "event_loop_blocked_total",
+    "Случаи, когда event loop был занят дольше LOOP_BLOCK_THRESHOLD_MS (при LOOP_BLOCK_DETECTION)",
+)
+
+logger = logging.getLogger("loop.blocking")
+
+
+class LoopMonitor:
+    """Замер задержки event loop и (опционально) сторожевой поток для блокирующих вызовов."""
+
+    def __init__(
+        self,
+        interval: float = LOOP_LAG_INTERVAL_SECONDS,
+        threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS,
+        detect_blocking: bool = LOOP_BLOCK_DETECTION,
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold_ms / 1000
+        self.detect_blocking = detect_blocking
+        self.max_lag = 0.0
+        self.blocks: deque[str] = deque(maxlen=BLOCKS_KEPT)
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id = 0
+        # момент (time.monotonic), когда задача замера должна проснуться
+        self._expected_at = 0.0
+
+    async def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._expected_at = time.monotonic() + self._tick
+        self._task = asyncio.create_task(self._run())
+        if self.detect_blocking:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    @property
+    def _tick(self) -> float:
+        # при поиске блокировок задача просыпается чаще, чтобы короткие блокировки не терялись
+        return min(self.interval, self.threshold) if self.detect_blocking else self.interval
+
+    async def _run(self) -> None:
+        tick = self._tick
+        while True:
+            self._expected_at = time.monotonic() + tick
+            await asyncio.sleep(tick)
+            lag = max(time.monotonic() - self._expected_at, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        reported_for = 0.0
+        poll = max(self.threshold / 4, 0.005)
+        while not self._stop.wait(poll):
+            expected_at = self._expected_at
+            if expected_at == reported_for or time.monotonic() - expected_at < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            # одна запись на одно опоздание loop
+            reported_for = expected_at
+            stack = "".join(traceback.format_stack(frame))
+            self.blocks.append(stack)
+            LOOP_BLOCKS.inc()
+            logger.warning("Event loop занят дольше %.0f мс:\n%s", self.threshold * 1000, stack)
@@ -0,0 +1,145 @@
+"""
+Метрики HTTP-запросов в формате Prometheus.
+
+Middleware считает запросы, задержки (гистограмма) и запросы в обработке по
+шаблону маршрута (`/finance/transactions`, а не конкретный путь) и статусу.
+Шаблон маршрута определяется до вызова приложения и кэшируется по пути;
+дочерние метрики с метками создаются один раз на сочетание меток, так что на
+запрос не выделяются словари меток.
+
+Несколько воркеров uvicorn: задайте PROMETHEUS_MULTIPROC_DIR (пустой каталог,
+очищаемый при старте контейнера) — тогда значения пишутся в общие файлы, а
+/metrics агрегирует их по всем процессам.
+"""
+import os
+import time
+from typing import Any, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# метка для путей, не совпавших ни с одним маршрутом (404, сканеры)
+UNMATCHED_ROUTE = "unmatched"
+# верхняя граница кэша путь -> шаблон маршрута
+ROUTE_CACHE_SIZE = 4096
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Число HTTP-запросов",
+    ["method", "route", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP-запросы в обработке",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+
+class PrometheusMiddleware:
+    """ASGI-middleware, обновляющее REQUESTS, LATENCY и IN_FLIGHT."""
+
+    def __init__(self, app: ASGIApp, routes: list[BaseRoute]) -> None:
+        self.app = app
+        self.routes = routes
+        self._route_cache: dict[tuple[str, str], str] = {}
+        self._in_flight: dict[tuple[str, str], Any] = {}
+        self._observers: dict[tuple[str, str, int], tuple[Any, Any]] = {}
+
+    def _route(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        route = self._route_cache.get(key)
+        if route is None:
+            route = UNMATCHED_ROUTE
+            for candidate in self.routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    route = candidate.path
+                    break
+            if len(self._route_cache) >= ROUTE_CACHE_SIZE:
+                self._route_cache.clear()
+            self._route_cache[key] = route
+        return route
+
+    def _observe(self, method: str, route: str, status: int, elapsed: float) -> None:
+        key = (method, route, status)
+        observers = self._observers.get(key)
+        if observers is None:
+            labels = (method, route, str(status))
+            observers = self._observers[key] = (REQUESTS.labels(*labels), LATENCY.labels(*labels))
+        observers[0].inc()
+        observers[1].observe(elapsed)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        in_flight = self._in_flight.get((method, route))
+        if in_flight is None:
+            in_flight = self._in_flight[(method, route)] = IN_FLIGHT.labels(method, route)
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            self._observe(method, route, status, time.perf_counter() - started)
+
+
+def _registry() -> Optional[CollectorRegistry]:
+    if not MULTIPROC_DIR:
+        return None
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Отдает метрики процесса (или всех воркеров в режиме multiprocess)."""
+    registry = _registry()
+    payload = generate_latest(registry) if registry is not None else generate_latest()
+    return Response(payload, media_type=CONTENT_TYPE_LATEST)
+
+
+def install_metrics(app: Any) -> None:
+    """Подключает middleware и эндпоинт /metrics к FastAPI-приложению."""
+    app.add_middleware(PrometheusMiddleware, routes=app.router.routes)
+    app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+
+
+def mark_process_dead() -> None:
+    """Убирает gauge завершающегося воркера из агрегата (только multiprocess)."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,121 @@
+"""
+Профилирование отдельных запросов по требованию.
+
+Запрос профилируется cProfile, если в нем есть заголовок X-Profile-Token со
+значением PROFILE_TOKEN (пустой токен — триггер выключен) или если выпала
+доля PROFILE_SAMPLE_RATE (по умолчанию 0). Профиль пишется в PROFILE_DIR в
+формате pstats, имя файла содержит время, маршрут и request_id:
+    20240101T120000_GET_finance_stats_by-day_<request_id>.prof
+и возвращается клиенту в заголовке X-Profile-File. Открыть:
+    python -m pstats <файл>   или   snakeviz <файл>
+
+cProfile видит весь поток event loop, поэтому в профиль попадают и
+конкурентные запросы того же воркера; одновременно профилируется не больше
+одного запроса, остальные в это время обрабатываются как обычно.
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from common.logs import current_request_id
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_-]+")
+
+logger = logging.getLogger("profiling")
+
+
+def profile_filename(scope: Scope, request_id: Optional[str]) -> str:
+    """Имя файла профиля: время, метод, шаблон маршрута и request_id."""
+    # маршруты Starlette (не APIRoute) не кладут себя в scope — тогда берется путь
+    path = getattr(scope.get("route"), "path", None) or scope["path"]
+    route_part = _UNSAFE_CHARS.sub("_", path).strip("_") or "root"
+    # request_id приходит от клиента (X-Request-ID): в имени файла только безопасные символы
+    request_part = _UNSAFE_CHARS.sub("_", request_id or "").strip("_") or "none"
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    return f"{stamp}_{scope['method']}_{route_part}_{request_part}.prof"
+
+
+def _dump(profiler: cProfile.Profile, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(path))
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: cProfile для запросов с токеном или по выборке."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str = PROFILE_TOKEN,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        directory: str = PROFILE_DIR,
+    ) -> None:
+        self.app = app
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+        self._busy = threading.Lock()
+
+    def _requested(self, scope: Scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile-token":
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        filename: Optional[str] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal filename
+            if message["type"] == "http.response.start":
+                # маршрут к этому моменту уже определен роутером
+                filename = profile_filename(scope, current_request_id())
+                message["headers"] = [*message.get("headers", []), (b"x-profile-file", filename.encode())]
+            await send(message)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+            if filename is None:
+                filename = profile_filename(scope, current_request_id())
+            path = self.directory / filename
+            if not path.resolve().is_relative_to(self.directory.resolve()):
+                logger.warning("Профиль не записан: путь %s вне %s", path, self.directory)
+                return
+            try:
+                await run_in_threadpool(_dump, profiler, path)
+            except OSError:
+                logger.warning("Не удалось записать профиль %s", path, exc_info=True)
+            else:
+                logger.info("Профиль запроса записан в %s", path)
+        finally:
+            self._busy.release()
+
+
+def install_profiling(app: Any) -> None:
+    """Подключает профилирование, если задан PROFILE_TOKEN или PROFILE_SAMPLE_RATE."""
+    if PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,327 @@
+"""
+Распределенная трассировка по W3C Trace Context (заголовок traceparent).
+
+Входящий traceparent продолжает трассу (или начинается новая), текущий спан
+хранится в contextvar, исходящие запросы получают заголовок через
+trace_headers(). Спаны HTTP-запросов, вызовов других сервисов и SQL-выражений
+выгружаются пачками из фонового потока:
+
+- TRACE_EXPORT=file — JSON по строке на спан в TRACE_EXPORT_FILE;
+- TRACE_EXPORT=otlp — OTLP/HTTP JSON на TRACE_OTLP_ENDPOINT (коллектор или
+  его заглушка);
+- пусто (по умолчанию) — спаны не выгружаются, но traceparent передается.
+
+Доля новых трасс, которые записываются, — TRACE_SAMPLE_RATE; решение
+передается дальше флагом sampled в traceparent.
+"""
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "").strip().lower()
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE", "/tmp/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://otel-collector:4318/v1/traces")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# размер пачки и период выгрузки
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL_SECONDS = 1.0
+# очередь на выгрузку; при переполнении спаны отбрасываются, а не копятся
+EXPORT_QUEUE_SIZE = 10000
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+logger = logging.getLogger("tracing")
+
+
+class Span:
+    """Операция в трассе. Время — в наносекундах Unix."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, kind: int) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = 0
+        self.attributes: dict[str, Any] = {}
+        self.error = False
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def finish(self) -> None:
+        self.end = time.time_ns()
+        if self.sampled and _exporter is not None:
+            _exporter.submit(self)
+
+    def as_dict(self, service: str) -> dict[str, Any]:
+        return {
+            "service": service,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": "server" if self.kind == SPAN_KIND_SERVER else "client",
+            "start_ns": self.start,
+            "duration_ms": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple[str, str, bool]]:
+    """(trace_id, parent span_id, sampled) из заголовка или None, если он некорректен."""
+    if not value:
+        return None
+    match = TRACEPARENT_RE.match(value.strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Идентификатор текущей трассы (для логов и полезной нагрузки событий)."""
+    span = _current.get()
+    return span.trace_id if span is not None else None
+
+
+def trace_headers(headers: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Заголовки исходящего запроса с traceparent текущего спана."""
+    result = dict(headers) if headers else {}
+    span = _current.get()
+    if span is not None:
+        result["traceparent"] = span.traceparent
+    return result
+
+
+def _start_span(name: str, kind: int, parent: Optional[tuple[str, str, bool]] = None) -> Span:
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        current = _current.get()
+        if current is not None:
+            trace_id, parent_id, sampled = current.trace_id, current.span_id, current.sampled
+        else:
+            trace_id = f"{random.getrandbits(128):032x}"
+            parent_id = None
+            sampled = random.random() < TRACE_SAMPLE_RATE
+    return Span(name, trace_id, parent_id, sampled, kind)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Дочерний спан текущего (например, вызов другого сервиса)."""
+    child = _start_span(name, SPAN_KIND_CLIENT)
+    child.attributes.update(attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException:
+        child.error = True
+        raise
+    finally:
+        _current.reset(token)
+        child.finish()
+
+
+class TracingMiddleware:
+    """ASGI-middleware: серверный спан на каждый HTTP-запрос и заголовок X-Trace-Id в ответе."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        server = _start_span(scope["method"], SPAN_KIND_SERVER, parent)
+        token = _current.set(server)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                server.attributes["http.status_code"] = message["status"]
+                server.error = message["status"] >= 500
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", server.trace_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            server.error = True
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            server.name = f'{scope["method"]} {getattr(route, "path", scope["path"])}'
+            server.attributes["http.method"] = scope["method"]
+            server.attributes["http.target"] = scope["path"]
+            server.finish()
+
+
+class SpanExporter:
+    """Фоновый поток, выгружающий спаны пачками в файл или OTLP-коллектор."""
+
+    def __init__(self, service: str, mode: str) -> None:
+        self.service = service
+        self.mode = mode
+        self.queue: queue.Queue[Span] = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._stop = threading.Event()
+        self._thread.start()
+
+    def submit(self, span: Span) -> None:
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _drain(self) -> list[Span]:
+        batch: list[Span] = []
+        while len(batch) < EXPORT_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            stopping = self._stop.wait(EXPORT_INTERVAL_SECONDS)
+            while True:
+                batch = self._drain()
+                if not batch:
+                    break
+                try:
+                    self.export(batch)
+                except Exception:
+                    logger.warning("Не удалось выгрузить %s спанов", len(batch), exc_info=True)
+            if stopping:
+                return
+
+    def export(self, batch: list[Span]) -> None:
+        if self.mode == "file":
+            with open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as fh:
+                for item in batch:
+                    fh.write(json.dumps(item.as_dict(self.service), ensure_ascii=False) + "\n")
+        elif self.mode == "otlp":
+            httpx.post(TRACE_OTLP_ENDPOINT, json=otlp_payload(self.service, batch), timeout=5.0)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(service: str, batch: list[Span]) -> dict[str, Any]:
+    """Пачка спанов в формате OTLP/HTTP JSON (ExportTraceServiceRequest)."""
+    spans = []
+    for item in batch:
+        data: dict[str, Any] = {
+            "traceId": item.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": item.kind,
+            "startTimeUnixNano": str(item.start),
+            "endTimeUnixNano": str(item.end),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+            "status": {"code": 2 if item.error else 1},
+        }
+        if item.parent_id:
+            data["parentSpanId"] = item.parent_id
+        spans.append(data)
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{"scope": {"name": "autoexam"}, "spans": spans}],
+            }
+        ]
+    }
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    current = _current.get()
+    if current is not None and current.sampled:
+        db_span = _start_span("db " + statement.lstrip().split(None, 1)[0].upper(), SPAN_KIND_CLIENT)
+        db_span.attributes["db.statement"] = " ".join(statement.split())[:500]
+        context._trace_span = db_span
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    db_span = getattr(context, "_trace_span", None)
+    if db_span is not None:
+        db_span.finish()
+
+
+def _handle_db_error(exception_context: Any) -> None:
+    db_span = getattr(exception_context.execution_context, "_trace_span", None)
+    if db_span is not None:
+        db_span.error = True
+        db_span.finish()
+
+
+def install_tracing(app: Any, service: str, trace_db: bool = True) -> None:
+    """
+    Подключает трассировку к FastAPI-приложению.
+
+    Выгрузка спанов и SQL-спаны включаются только при заданном TRACE_EXPORT.
+    """
+    global _exporter
+    app.add_middleware(TracingMiddleware)
+    if TRACE_EXPORT not in ("file", "otlp"):
+        return
+    if _exporter is None:
+        _exporter = SpanExporter(service, TRACE_EXPORT)
+        app.add_event_handler("shutdown", _exporter.shutdown)
+    if trace_db:
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_db_error)
@@ -0,0 +1,54 @@
+"""Словарь категорий пользователя и ссылка transactions.category_id."""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0004_categories"
+down_revision = "20251228_0003_seed_sanchez"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Создает categories, переносит в нее названия и заменяет колонку category на category_id."""
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=False), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.UniqueConstraint("user_id", "name", name="categories_user_name_unique"),
+    )
+    op.execute(
+        "INSERT INTO categories (user_id, name) SELECT DISTINCT user_id, category FROM transactions;"
+    )
+
+    op.add_column("transactions", sa.Column("category_id", sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE transactions AS t SET category_id = c.id "
+        "FROM categories AS c WHERE c.user_id = t.user_id AND c.name = t.category;"
+    )
+    op.alter_column("transactions", "category_id", nullable=False)
+    op.create_foreign_key(
+        "transactions_category_id_fkey", "transactions", "categories", ["category_id"], ["id"]
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_category ON transactions (user_id, category_id);"
+    )
+    op.drop_column("transactions", "category")
+
+
+def downgrade() -> None:
+    """Возвращает текстовую колонку category и удаляет словарь."""
+    op.add_column(
+        "transactions",
+        sa.Column("category", sa.String(length=64), server_default=sa.text("'general'::varchar"), nullable=False),
+    )
+    op.execute(
+        "UPDATE transactions AS t SET category = c.name FROM categories AS c WHERE c.id = t.category_id;"
+    )
+    op.drop_index("idx_transactions_user_category", table_name="transactions")
+    op.drop_constraint("transactions_category_id_fkey", "transactions", type_="foreignkey")
+    op.drop_column("transactions", "category_id")
+    op.drop_table("categories")
@@ -0,0 +1,29 @@
+"""Хранение сумм операций в копейках (BIGINT) вместо NUMERIC(12,2)."""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0005_amount_cents"
+down_revision = "20261019_0004_categories"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Переносит transactions.amount в transactions.amount_cents."""
+    op.add_column("transactions", sa.Column("amount_cents", sa.BigInteger(), nullable=True))
+    op.execute("UPDATE transactions SET amount_cents = round(amount * 100)::bigint;")
+    op.alter_column("transactions", "amount_cents", nullable=False)
+    op.drop_constraint("transactions_amount_check", "transactions", type_="check")
+    op.drop_column("transactions", "amount")
+    op.create_check_constraint("transactions_amount_cents_check", "transactions", "amount_cents > 0")
+
+
+def downgrade() -> None:
+    """Возвращает NUMERIC(12,2) колонку amount."""
+    op.add_column("transactions", sa.Column("amount", sa.Numeric(12, 2), nullable=True))
+    op.execute("UPDATE transactions SET amount = amount_cents / 100.0;")
+    op.alter_column("transactions", "amount", nullable=False)
+    op.drop_constraint("transactions_amount_cents_check", "transactions", type_="check")
+    op.drop_column("transactions", "amount_cents")
+    op.create_check_constraint("transactions_amount_check", "transactions", "amount > 0")
@@ -0,0 +1,75 @@
+"""Материализованные представления для отчетов администратора."""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_0006_report_views"
+down_revision = "20261019_0005_amount_cents"
+branch_labels = None
+depends_on = None
+
+VIEWS = ("mv_daily_volume", "mv_top_categories", "mv_active_users")
+
+
+def upgrade() -> None:
+    """Создает представления, уникальные индексы (нужны для CONCURRENTLY) и журнал обновлений."""
+    op.create_table(
+        "report_refreshes",
+        sa.Column("view_name", sa.String(length=64), primary_key=True),
+        sa.Column("refreshed_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_daily_volume AS
+        SELECT date(occurred_at) AS day,
+               count(*) AS tx_count,
+               coalesce(sum(amount_cents) FILTER (WHERE type = 'income'), 0) AS income_cents,
+               coalesce(sum(amount_cents) FILTER (WHERE type = 'expense'), 0) AS expense_cents,
+               count(DISTINCT user_id) AS active_users
+        FROM transactions
+        GROUP BY date(occurred_at);
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX mv_daily_volume_day ON mv_daily_volume (day);")
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_top_categories AS
+        SELECT c.name AS category,
+               t.type,
+               count(*) AS tx_count,
+               sum(t.amount_cents) AS total_cents,
+               count(DISTINCT t.user_id) AS users
+        FROM transactions AS t
+        JOIN categories AS c ON c.id = t.category_id
+        GROUP BY c.name, t.type;
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX mv_top_categories_key ON mv_top_categories (category, type);")
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_active_users AS
+        SELECT t.user_id,
+               u.username,
+               count(*) AS tx_count,
+               sum(t.amount_cents) AS volume_cents,
+               max(t.occurred_at) AS last_activity
+        FROM transactions AS t
+        JOIN users AS u ON u.id = t.user_id
+        GROUP BY t.user_id, u.username;
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX mv_active_users_user ON mv_active_users (user_id);")
+    op.execute("CREATE INDEX mv_active_users_last_activity ON mv_active_users (last_activity DESC);")
+
+    values = ", ".join(f"('{name}', now())" for name in VIEWS)
+    op.execute(f"INSERT INTO report_refreshes (view_name, refreshed_at) VALUES {values};")
+
+
+def downgrade() -> None:
+    """Удаляет представления и журнал обновлений."""
+    for name in reversed(VIEWS):
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name};")
+    op.drop_table("report_refreshes")
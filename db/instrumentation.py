@@ -0,0 +1,164 @@
+"""
+Учет SQL-запросов по эндпоинтам и журнал медленных запросов.
+
+События движка засекают время каждого выражения и относят его к текущему
+HTTP-запросу (маршрут FastAPI определяется после роутинга). По маршрутам
+накапливаются число запросов к БД на HTTP-запрос и доля времени в БД от
+общего времени обработки — так видны N+1 и эндпоинты, упирающиеся в Python.
+Выражения дольше DB_SLOW_QUERY_MS пишутся в лог с замаскированными
+параметрами.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# порог медленного запроса, мс; 0 — журнал выключен
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# сколько символов SQL выводить в журнал медленных запросов
+SLOW_QUERY_SQL_LIMIT = 2000
+
+logger = logging.getLogger("db.slow_queries")
+
+
+class RequestQueries:
+    """Запросы к БД в рамках одного HTTP-запроса."""
+
+    __slots__ = ("scope", "count", "db_seconds")
+
+    def __init__(self, scope: Scope) -> None:
+        self.scope = scope
+        self.count = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope)
+
+
+class RouteQueryStats:
+    """Накопленные показатели одного маршрута."""
+
+    __slots__ = ("requests", "queries", "max_queries", "db_seconds", "total_seconds")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.db_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def observe(self, queries: RequestQueries, total_seconds: float) -> None:
+        self.requests += 1
+        self.queries += queries.count
+        self.max_queries = max(self.max_queries, queries.count)
+        self.db_seconds += queries.db_seconds
+        self.total_seconds += total_seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / self.requests, 2) if self.requests else 0.0,
+            "max_queries_per_request": self.max_queries,
+            "db_seconds": round(self.db_seconds, 6),
+            "total_seconds": round(self.total_seconds, 6),
+            "db_share": round(self.db_seconds / self.total_seconds, 3) if self.total_seconds else 0.0,
+        }
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("db_request_queries", default=None)
+ROUTE_STATS: dict[str, RouteQueryStats] = {}
+_listening = False
+
+
+def route_label(scope: Scope) -> str:
+    """Метод и шаблон пути маршрута (без подставленных параметров)."""
+    route = scope.get("route")
+    return f'{scope.get("method", "-")} {getattr(route, "path", scope.get("path", "-"))}'
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Заменяет значения параметров их типами, сохраняя имена и количество."""
+    if isinstance(parameters, dict):
+        return {key: f"<{type(value).__name__}>" for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: достаточно формы первой строки и числа строк
+            return [redact_parameters(parameters[0]), f"... {len(parameters)} rows"]
+        return [f"<{type(value).__name__}>" for value in parameters]
+    return "<redacted>"
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    current = _current.get()
+    if current is not None:
+        current.count += 1
+        current.db_seconds += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Медленный запрос %.1f мс (%s): %s; параметры: %s",
+            elapsed * 1000,
+            current.route if current is not None else "вне запроса",
+            " ".join(statement.split())[:SLOW_QUERY_SQL_LIMIT],
+            redact_parameters(parameters),
+        )
+
+
+def _listen() -> None:
+    global _listening
+    if not _listening:
+        # события на классе Engine действуют на все движки процесса (primary и реплики)
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _listening = True
+
+
+class QueryStatsMiddleware:
+    """ASGI-middleware: относит SQL-запросы к маршруту и копит статистику по маршрутам."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        _listen()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = _current.set(queries)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            if scope.get("route") is not None:
+                stats = ROUTE_STATS.get(queries.route)
+                if stats is None:
+                    stats = ROUTE_STATS[queries.route] = RouteQueryStats()
+                stats.observe(queries, time.perf_counter() - started)
+
+
+def install_query_stats(app: Any) -> None:
+    """Подключает учет SQL-запросов к приложению."""
+    app.add_middleware(QueryStatsMiddleware)
+
+
+def query_stats() -> dict[str, dict[str, Any]]:
+    """Статистика по маршрутам, отсортированная по суммарному времени в БД."""
+    ordered = sorted(ROUTE_STATS.items(), key=lambda item: item[1].db_seconds, reverse=True)
+    return {route: stats.as_dict() for route, stats in ordered}
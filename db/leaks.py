@@ -0,0 +1,107 @@
+"""
+Детектор утечек соединений с БД (включается DB_LEAK_DETECTION=true).
+
+Пока идет HTTP-запрос, каждое взятое из пула соединение запоминается вместе со
+стеком вызова. Если после отправки ответа соединение все еще не возвращено в
+пул, в лог пишется предупреждение с эндпоинтом и этим стеком. Сбор стеков
+дорогой, поэтому детектор предназначен для отладки и нагрузочных прогонов.
+"""
+import logging
+import traceback
+from contextvars import ContextVar
+from typing import Any, Optional
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from db.instrumentation import route_label
+from db.pool import env_flag
+
+LEAK_DETECTION = env_flag("DB_LEAK_DETECTION")
+# сколько последних кадров стека сохранять
+STACK_LIMIT = 25
+
+logger = logging.getLogger("db.leaks")
+
+# соединения, взятые в рамках текущего запроса: id записи пула -> стек
+_checkouts: ContextVar[Optional[dict[int, str]]] = ContextVar("db_checkouts", default=None)
+_listening = False
+
+
+def _caller_stack() -> str:
+    """
+    Стек кода, запросившего соединение.
+
+    Событие пула вызывается внутри greenlet SQLAlchemy, стек которого
+    обрывается на greenlet_spawn; код приложения — в стеке родительского
+    greenlet, приостановленного в await.
+    """
+    current = greenlet.getcurrent()
+    frame = current.parent.gr_frame if current.parent is not None else None
+    frames = [
+        summary
+        for summary in traceback.extract_stack(frame)
+        if "/asyncio/" not in summary.filename
+    ]
+    return "".join(traceback.format_list(frames[-STACK_LIMIT:]))
+
+
+def _on_checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+    checkouts = _checkouts.get()
+    if checkouts is None:
+        return
+    checkouts[id(record)] = _caller_stack()
+    record.info["leak_checkouts"] = checkouts
+
+
+def _on_checkin(dbapi_connection: Any, record: Any) -> None:
+    checkouts = record.info.pop("leak_checkouts", None)
+    if checkouts is not None:
+        checkouts.pop(id(record), None)
+
+
+def _listen() -> None:
+    global _listening
+    if not _listening:
+        # события на классе Pool действуют на все пулы процесса, в том числе реплик
+        event.listen(Pool, "checkout", _on_checkout)
+        event.listen(Pool, "checkin", _on_checkin)
+        _listening = True
+
+
+class SessionLeakMiddleware:
+    """ASGI-middleware: после ответа проверяет, что запрос вернул все соединения."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        _listen()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        checkouts: dict[int, str] = {}
+        token = _checkouts.set(checkouts)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _checkouts.reset(token)
+            if checkouts:
+                endpoint = route_label(scope)
+                for stack in checkouts.values():
+                    logger.warning(
+                        "Соединение с БД не возвращено в пул после ответа %s, взято в:\n%s",
+                        endpoint,
+                        stack,
+                    )
+
+
+def install_leak_detector(app: Any) -> bool:
+    """Подключает детектор к приложению, если он включен DB_LEAK_DETECTION."""
+    if not LEAK_DETECTION:
+        return False
+    app.add_middleware(SessionLeakMiddleware)
+    return True
@@ -3,12 +3,12 @@ from datetime import datetime
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     CheckConstraint,
     Column,
     DateTime,
     ForeignKey,
     Index,
-    Numeric,
     String,
     Text,
     UniqueConstraint,
@@ -54,14 +54,32 @@ class Profile(Base):
     )
 
 
+class Category(Base):
+
+    __tablename__ = "categories"
+    __table_args__ = (UniqueConstraint("user_id", "name", name="categories_user_name_unique"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    name: Mapped[str] = mapped_column(String(64), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP")
+    )
+
+
 class Transaction(Base):
 
     __tablename__ = "transactions"
     __table_args__ = (
         CheckConstraint("type IN ('income','expense')", name="transactions_type_check"),
-        CheckConstraint("amount > 0", name="transactions_amount_check"),
+        CheckConstraint("amount_cents > 0", name="transactions_amount_cents_check"),
         Index("idx_transactions_user_occurred", "user_id", "occurred_at"),
         Index("idx_transactions_user_type", "user_id", "type"),
+        Index("idx_transactions_user_category", "user_id", "category_id"),
     )
 
     id: Mapped[str] = mapped_column(UUID(as_uuid=False), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -71,8 +89,9 @@ class Transaction(Base):
         nullable=False,
     )
     type: Mapped[str] = mapped_column(String(16), nullable=False)
-    amount: Mapped[float] = mapped_column(Numeric(12, 2), nullable=False)
-    category: Mapped[str] = mapped_column(String(64), nullable=False, server_default="general")
+    # сумма в минимальных единицах (копейках); в API конвертируется в Decimal
+    amount_cents: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     occurred_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP")
@@ -110,3 +129,11 @@ class NotificationLog(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP")
     )
+
+
+class ReportRefresh(Base):
+
+    __tablename__ = "report_refreshes"
+
+    view_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,142 @@
+"""
+Настройки и метрики пула соединений с БД.
+
+Параметры пула задаются переменными окружения (общими для всех сервисов):
+DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE и DB_TRANSACTION_POOLING — режим
+для прокси с пулингом транзакций (PgBouncer), в котором отключены
+подготовленные выражения asyncpg.
+"""
+import os
+import time
+import uuid
+from bisect import bisect_left
+from typing import Any, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Булева переменная окружения: 1/true/yes/on."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# соединения старше этого числа секунд пересоздаются; -1 — без ограничения
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = env_flag("DB_POOL_PRE_PING")
+# кэш подготовленных выражений asyncpg на соединение; 0 — выключен
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+TRANSACTION_POOLING = env_flag("DB_TRANSACTION_POOLING")
+
+# границы корзин гистограммы ожидания соединения, секунды
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    """Счетчики одного пула: время получения соединения и таймауты."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wait_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.wait_count = 0
+        self.timeouts = 0
+        self.pool: Optional["InstrumentedPool"] = None
+
+    def observe_wait(self, seconds: float) -> None:
+        self.wait_counts[bisect_left(WAIT_BUCKETS, seconds)] += 1
+        self.wait_sum += seconds
+        self.wait_count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Текущее состояние пула и накопленная гистограмма (кумулятивная, как в Prometheus)."""
+        pool = self.pool
+        buckets: dict[str, int] = {}
+        total = 0
+        for bound, count in zip(WAIT_BUCKETS, self.wait_counts):
+            total += count
+            buckets[str(bound)] = total
+        buckets["+Inf"] = self.wait_count
+        return {
+            "name": self.name,
+            "size": pool.size() if pool else 0,
+            "checked_out": pool.checkedout() if pool else 0,
+            "checked_in": pool.checkedin() if pool else 0,
+            "overflow": max(pool.overflow(), 0) if pool else 0,
+            "max_overflow": pool._max_overflow if pool else 0,
+            "timeouts": self.timeouts,
+            "wait_seconds": {
+                "count": self.wait_count,
+                "sum": round(self.wait_sum, 6),
+                "buckets": buckets,
+            },
+        }
+
+
+# метрики по имени пула; переживают пересоздание пула при engine.dispose()
+POOL_METRICS: dict[str, PoolMetrics] = {}
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул, измеряющий время ожидания соединения. Имя метрик — logging_name пула."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        name = self._orig_logging_name or "default"
+        self.metrics = POOL_METRICS.setdefault(name, PoolMetrics(name))
+        self.metrics.pool = self
+
+    def _do_get(self):  # type: ignore[no-untyped-def]
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe_wait(time.perf_counter() - started)
+
+
+def engine_options(url: str, name: str) -> dict[str, Any]:
+    """
+    Аргументы create_async_engine для url.
+
+    Для Postgres включается InstrumentedPool с параметрами из окружения;
+    прочие БД (SQLite в тестах) используют пул по умолчанию.
+    """
+    options: dict[str, Any] = {"echo": False, "future": True}
+    if make_url(url).get_backend_name() != "postgresql":
+        return options
+    options.update(
+        poolclass=InstrumentedPool,
+        pool_logging_name=name,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+    if TRANSACTION_POOLING:
+        # прокси может отдать следующую транзакцию другому серверному соединению,
+        # поэтому подготовленные выражения не кэшируются и получают уникальные имена
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    else:
+        options["connect_args"] = {"prepared_statement_cache_size": STATEMENT_CACHE_SIZE}
+    return options
+
+
+def pool_stats() -> list[dict[str, Any]]:
+    """Снимки всех пулов процесса: primary и реплик."""
+    return [metrics.snapshot() for metrics in POOL_METRICS.values()]
@@ -0,0 +1,43 @@
+"""
+Материализованные представления для отчетов по всей платформе.
+
+Представления создаются миграцией 20261019_0006_report_views и обновляются
+finance-service (REFRESH MATERIALIZED VIEW CONCURRENTLY). Описаны в отдельной
+MetaData, чтобы Base.metadata.create_all не создавал их как таблицы.
+"""
+from sqlalchemy import BigInteger, Column, Date, DateTime, Integer, MetaData, String, Table
+from sqlalchemy.dialects.postgresql import UUID
+
+report_metadata = MetaData()
+
+daily_volume = Table(
+    "mv_daily_volume",
+    report_metadata,
+    Column("day", Date, primary_key=True),
+    Column("tx_count", BigInteger, nullable=False),
+    Column("income_cents", BigInteger, nullable=False),
+    Column("expense_cents", BigInteger, nullable=False),
+    Column("active_users", Integer, nullable=False),
+)
+
+top_categories = Table(
+    "mv_top_categories",
+    report_metadata,
+    Column("category", String(64), primary_key=True),
+    Column("type", String(16), primary_key=True),
+    Column("tx_count", BigInteger, nullable=False),
+    Column("total_cents", BigInteger, nullable=False),
+    Column("users", Integer, nullable=False),
+)
+
+active_users = Table(
+    "mv_active_users",
+    report_metadata,
+    Column("user_id", UUID(as_uuid=False), primary_key=True),
+    Column("username", String(64), nullable=False),
+    Column("tx_count", BigInteger, nullable=False),
+    Column("volume_cents", BigInteger, nullable=False),
+    Column("last_activity", DateTime(timezone=True), nullable=False),
+)
+
+REPORT_VIEWS = (daily_volume.name, top_categories.name, active_users.name)
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     log_format: str = Field(
         "%(asctime)s %(levelname)s [%(name)s] %(message)s", env="LOG_FORMAT"
     )
+    log_json: bool = Field(True, env="LOG_JSON")
+    log_sampling: str = Field("", env="LOG_SAMPLING")
     jwt_secret: str = Field("change-me", env="JWT_SECRET")
     jwt_ttl_seconds: int = Field(3600, env="JWT_TTL_SECONDS")
 
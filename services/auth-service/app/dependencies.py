@@ -1,18 +1,18 @@
-from typing import Annotated
+from typing import Annotated, AsyncGenerator
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.session import get_session
+from db.session import session_scope
 from .security import decode_token
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-async def get_db_session() -> AsyncSession:
-    async for session in get_session():
-        return session
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with session_scope() as session:
+        yield session
 
 
 async def get_current_user_token(
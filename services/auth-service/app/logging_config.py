@@ -1,12 +1,12 @@
-import logging
-
+from common.logs import setup_logging
 from .config import get_settings
 
 
 def configure_logging() -> None:
     settings = get_settings()
-    logging.basicConfig(
+    setup_logging(
         level=settings.log_level,
-        format=settings.log_format,
-        handlers=[logging.StreamHandler()],
+        fmt=settings.log_format,
+        json_format=settings.log_json,
+        sampling=settings.log_sampling,
     )
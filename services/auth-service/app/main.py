@@ -2,11 +2,23 @@ import logging
 from typing import Dict
 
 from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-
+from starlette.concurrency import run_in_threadpool
+
+from common.health import ReadinessMonitor, require_loopback
+from common.logs import install_request_id
+from common.loop_monitor import LoopMonitor
+from common.metrics import install_metrics, mark_process_dead
+from common.profiling import install_profiling
+from common.tracing import install_tracing
+from db.instrumentation import install_query_stats, query_stats
+from db.leaks import install_leak_detector
 from db.models import User
+from db.pool import pool_stats
+from db.session import ping
 from .config import get_settings
 from .dependencies import get_current_user_token, get_db_session
 from .logging_config import configure_logging
@@ -23,11 +35,21 @@ configure_logging()
 settings = get_settings()
 logger = logging.getLogger(settings.app_name)
 
+readiness = ReadinessMonitor()
+readiness.add_check("db", ping)
+loop_monitor = LoopMonitor()
+
 app = FastAPI(
     title="Auth Service",
     version="0.1.0",
     description="Каркас сервиса авторизации.",
 )
+install_profiling(app)
+install_leak_detector(app)
+install_query_stats(app)
+install_metrics(app)
+install_tracing(app, settings.app_name)
+install_request_id(app)
 
 
 @app.get("/health/live")
@@ -36,10 +58,34 @@ async def health_live() -> Dict[str, str]:
 
 
 @app.get("/health/ready")
-async def health_ready() -> Dict[str, str]:
+async def health_ready() -> JSONResponse:
+    ready, body = readiness.status()
+    status_code = status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.post("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_drain() -> Dict[str, str]:
+    await readiness.drain()
+    return {"status": "draining"}
+
+
+@app.delete("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_undrain() -> Dict[str, str]:
+    readiness.undrain()
     return {"status": "ready"}
 
 
+@app.get("/metrics/db-pool")
+async def metrics_db_pool() -> Dict[str, list]:
+    return {"pools": pool_stats()}
+
+
+@app.get("/metrics/db-queries")
+async def metrics_db_queries() -> Dict[str, dict]:
+    return {"routes": query_stats()}
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
     logger.info(
@@ -49,6 +95,8 @@ async def on_startup() -> None:
         settings.port,
         settings.database_url,
     )
+    await readiness.start()
+    await loop_monitor.start()
 
     if settings.jwt_secret == "change-me":
         logger.warning("JWT_SECRET не задан, используется небезопасное значение по умолчанию")
@@ -58,6 +106,9 @@ async def on_startup() -> None:
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await loop_monitor.stop()
+    await readiness.stop()
+    mark_process_dead()
     logger.info("Сервис %s завершает работу", settings.app_name)
 
 
@@ -69,7 +120,9 @@ async def on_shutdown() -> None:
 async def register_user(
     payload: RegisterRequest, session: AsyncSession = Depends(get_db_session)
 ) -> RegisterResponse:
-    user = User(username=payload.username, password_hash=hash_password(payload.password))
+    # bcrypt занимает сотни миллисекунд и не должен держать event loop
+    password_hash = await run_in_threadpool(hash_password, payload.password)
+    user = User(username=payload.username, password_hash=password_hash)
     session.add(user)
     try:
         await session.commit()
@@ -95,7 +148,7 @@ async def login_user(
     result = await session.execute(stmt)
     user: User | None = result.scalar_one_or_none()
 
-    if user is None or not verify_password(payload.password, user.password_hash):
+    if user is None or not await run_in_threadpool(verify_password, payload.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный логин или пароль",
@@ -1,10 +1,14 @@
 """Минимальные тесты для /auth/register, /auth/login, /auth/validate."""
 import asyncio
+import json
+import logging
 import os
 import sys
+import time
 import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
+from queue import Queue
 from typing import AsyncGenerator
 
 import pytest
@@ -17,9 +21,11 @@ for p in (ROOT_DIR, SERVICE_DIR):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
 
+import common.logs as common_logs  # noqa: E402
 import db.session as db_session  # noqa: E402
 from db.models import Base  # noqa: E402
-from app.main import app  # noqa: E402
+from common.loop_monitor import LoopMonitor  # noqa: E402
+from app.main import app, loop_monitor  # noqa: E402
 
 
 @asynccontextmanager
@@ -95,3 +101,79 @@ def test_register_and_login_and_validate(client: TestClient) -> None:
     assert resp_valid.status_code == 200, resp_valid.text
     valid_data = resp_valid.json()
     assert valid_data["username"] == username
+
+
+def test_request_id_in_response_and_json_logs(client: TestClient) -> None:
+    """X-Request-ID возвращается в ответе; JSON-формат и выборка логов."""
+    resp = client.get("/health/live", headers={"X-Request-ID": "req-42"})
+    assert resp.headers["x-request-id"] == "req-42"
+    assert client.get("/health/live").headers["x-request-id"]
+
+    context_filter = common_logs.ContextFilter({"noisy": 0.0})
+    info = logging.LogRecord("noisy.child", logging.INFO, __file__, 1, "Событие %s", ("x",), None)
+    warning = logging.LogRecord("noisy", logging.WARNING, __file__, 1, "Сбой", (), None)
+    other = logging.LogRecord("quiet", logging.INFO, __file__, 1, "Строка", (), None)
+    assert not context_filter.filter(info)
+    assert context_filter.filter(warning)
+    assert context_filter.filter(other)
+
+    other.user_id = "u-1"
+    data = json.loads(common_logs.JsonFormatter().format(other))
+    assert data["level"] == "INFO"
+    assert data["logger"] == "quiet"
+    assert data["message"] == "Строка"
+    assert data["user_id"] == "u-1"
+    assert "request_id" not in data
+
+
+def test_deferred_handler_interpolates_args_at_call_time() -> None:
+    """Аргументы подставляются в момент вызова, а не позже в потоке слушателя."""
+    queue: Queue = Queue()
+    handler = common_logs.DeferredQueueHandler(queue)
+    items = ["a"]
+    record = logging.LogRecord("app", logging.INFO, __file__, 1, "Элементы %s", (items,), None)
+    handler.emit(record)
+    items.append("b")
+
+    queued = queue.get_nowait()
+    assert queued.getMessage() == "Элементы ['a']"
+    assert queued.args is None
+
+
+def test_loop_monitor_captures_blocking_stack() -> None:
+    """Сторожевой поток записывает стек синхронного вызова, заблокировавшего event loop."""
+
+    def blocking_helper() -> None:
+        time.sleep(0.2)
+
+    async def scenario() -> LoopMonitor:
+        monitor = LoopMonitor(interval=0.5, threshold_ms=50, detect_blocking=True)
+        await monitor.start()
+        await asyncio.sleep(0.06)
+        blocking_helper()
+        await asyncio.sleep(0.06)
+        await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    # на загруженной машине порог могут превысить и другие задержки, важно найти нашу
+    assert len(monitor.blocks) >= 1
+    assert any("in blocking_helper" in block for block in monitor.blocks)
+    assert monitor.max_lag >= 0.1
+
+
+def test_register_and_login_do_not_block_event_loop(client: TestClient) -> None:
+    """bcrypt выполняется вне event loop: сторожевой поток не видит блокировок."""
+    client.portal.call(loop_monitor.stop)
+    loop_monitor.detect_blocking, loop_monitor.threshold = True, 0.05
+    loop_monitor.blocks.clear()
+    client.portal.call(loop_monitor.start)
+    try:
+        credentials = {"username": f"user_{uuid.uuid4().hex[:8]}", "password": "password123"}
+        assert client.post("/auth/register", json=credentials).status_code == 201
+        assert client.post("/auth/login", json=credentials).status_code == 200
+    finally:
+        client.portal.call(loop_monitor.stop)
+        loop_monitor.detect_blocking = False
+        client.portal.call(loop_monitor.start)
+    assert not loop_monitor.blocks, loop_monitor.blocks[0]
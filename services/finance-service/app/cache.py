@@ -0,0 +1,44 @@
+"""Простой ограниченный LRU-кэш для данных в памяти процесса."""
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Словарь с ограничением по числу ключей.
+
+    При переполнении вытесняется ключ, к которому дольше всего не обращались.
+    Не потокобезопасен: рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max(1, max_size)
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+    def get(self, key: K) -> Optional[V]:
+        """Возвращает значение и помечает ключ как недавно использованный."""
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """Сохраняет значение, при необходимости вытесняя самый старый ключ."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        """Удаляет ключ, если он есть."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,115 @@
+"""
+Словарь категорий пользователя.
+
+В transactions хранится только целочисленный category_id, а API принимает и
+возвращает названия. Соответствие name <-> id кэшируется в памяти процесса:
+запись в categories никогда не меняется после создания, поэтому кэш не
+устаревает, а промах (например, категория создана другой репликой) просто
+перечитывает словарь пользователя одним запросом. Новая категория попадает в
+кэш только после коммита создавшей ее сессии: при откате или отмене запроса
+в кэше не остается id, которого нет в базе.
+"""
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.models import Category
+from .cache import LRUCache
+from .config import get_settings
+
+# категории, созданные в сессии и еще не закоммиченные: (user_id, name, id)
+PENDING_KEY = "pending_categories"
+
+
+@dataclass
+class UserCategories:
+    """Двусторонний словарь категорий одного пользователя."""
+
+    ids: dict[str, int] = field(default_factory=dict)
+    names: dict[int, str] = field(default_factory=dict)
+
+
+class CategoryCache:
+    """Кэш словарей категорий с ограничением по числу пользователей."""
+
+    def __init__(self, max_users: int) -> None:
+        self._users: LRUCache[str, UserCategories] = LRUCache(max_users)
+
+    async def _load(self, session: AsyncSession, user_id: str) -> UserCategories:
+        rows = (
+            await session.execute(
+                select(Category.id, Category.name).where(Category.user_id == user_id)
+            )
+        ).all()
+        entry = UserCategories(
+            ids={name: cat_id for cat_id, name in rows},
+            names={cat_id: name for cat_id, name in rows},
+        )
+        # словарь видит незакоммиченные категории этой сессии: кэшируется только без них
+        if not any(pending[0] == user_id for pending in session.info.get(PENDING_KEY, ())):
+            self._users.set(user_id, entry)
+        return entry
+
+    async def get_id(self, session: AsyncSession, user_id: str, name: str) -> int:
+        """
+        Возвращает id категории, создавая ее при первом использовании.
+
+        Вызывать до добавления других объектов в сессию: при гонке с другим
+        запросом (нарушение уникальности) сессия откатывается.
+        """
+        entry = self._users.get(user_id)
+        if entry is not None and name in entry.ids:
+            return entry.ids[name]
+
+        entry = await self._load(session, user_id)
+        if name in entry.ids:
+            return entry.ids[name]
+
+        category = Category(user_id=user_id, name=name)
+        session.add(category)
+        try:
+            await session.flush()
+        except IntegrityError:
+            # категорию только что создал параллельный запрос
+            await session.rollback()
+            entry = await self._load(session, user_id)
+            return entry.ids[name]
+
+        session.info.setdefault(PENDING_KEY, []).append((user_id, name, category.id))
+        return category.id
+
+    def publish(self, pending: Iterable[tuple[str, str, int]]) -> None:
+        """Добавляет закоммиченные категории в кэш (словари, которых в кэше нет, не создаются)."""
+        for user_id, name, cat_id in pending:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                entry.ids[name] = cat_id
+                entry.names[cat_id] = name
+
+    async def get_names(
+        self, session: AsyncSession, user_id: str, ids: Iterable[int]
+    ) -> dict[int, str]:
+        """Возвращает названия для переданных id (словарь пользователя целиком)."""
+        entry = self._users.get(user_id)
+        if entry is None or any(cat_id not in entry.names for cat_id in ids):
+            entry = await self._load(session, user_id)
+        return entry.names
+
+
+categories = CategoryCache(get_settings().category_cache_users)
+
+
+def _publish_pending(session: Session) -> None:
+    categories.publish(session.info.pop(PENDING_KEY, ()))
+
+
+def _drop_pending(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+event.listen(Session, "after_commit", _publish_pending)
+event.listen(Session, "after_rollback", _drop_pending)
@@ -21,14 +21,31 @@ class Settings(BaseSettings):
         "http://auth-service:8001/auth/validate",
         env="AUTH_VALIDATE_URL",
     )
+    auth_health_url: str = Field(
+        "http://auth-service:8001/health/live",
+        env="AUTH_HEALTH_URL",
+    )
+    # общий с web-frontend секрет подписи X-Internal-Identity; пусто — заголовок не принимается
+    internal_identity_secret: str = Field("", env="INTERNAL_IDENTITY_SECRET")
     notification_url: str = Field(
         "http://notification-service:8004/notify/log",
         env="NOTIFICATION_URL",
     )
+    category_cache_users: int = Field(10000, env="CATEGORY_CACHE_USERS")
+    anomaly_threshold: float = Field(3.5, env="ANOMALY_THRESHOLD")
+    anomaly_min_samples: int = Field(5, env="ANOMALY_MIN_SAMPLES")
+    anomaly_cache_users: int = Field(1000, env="ANOMALY_CACHE_USERS")
+    forecast_history_days: int = Field(180, env="FORECAST_HISTORY_DAYS")
+    forecast_recurring_share: float = Field(0.6, env="FORECAST_RECURRING_SHARE")
+    # пусто — отчеты по платформе выключены, пока администраторы не заданы явно
+    admin_usernames: str = Field("", env="ADMIN_USERNAMES")
+    reports_refresh_interval_seconds: int = Field(300, env="REPORTS_REFRESH_INTERVAL_SECONDS")
     log_level: str = Field("INFO", env="LOG_LEVEL")
     log_format: str = Field(
         "%(asctime)s %(levelname)s [%(name)s] %(message)s", env="LOG_FORMAT"
     )
+    log_json: bool = Field(True, env="LOG_JSON")
+    log_sampling: str = Field("", env="LOG_SAMPLING")
 
     class Config:
         env_file = ".env"
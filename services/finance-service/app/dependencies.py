@@ -1,42 +1,55 @@
 """Зависимости FastAPI: проверка JWT через auth-service и доступ к БД."""
-from typing import Annotated, Dict
+from typing import Annotated, AsyncGenerator, Dict
 
 import httpx
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.session import get_session
+from common.identity import IDENTITY_HEADER, verify_identity
+from common.logs import correlation_headers
+from common.tracing import span
+from db.session import LAST_WRITE_COOKIE, last_write_at, read_session_scope, session_scope
 from .config import get_settings
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-async def get_db_session() -> AsyncSession:
-    """Возвращает асинхронную сессию БД."""
-    async for session in get_session():
-        return session
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия БД на время запроса; закрывается после отправки ответа."""
+    async with session_scope() as session:
+        yield session
 
 
 async def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)]
+    request: Request,
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(bearer_scheme)],
 ) -> Dict[str, str]:
     """
     Проверяет Bearer токен, вызывая auth-service /auth/validate.
 
+    Подписанный web-frontend заголовок X-Internal-Identity принимается без
+    обращения к auth-service.
+
     Возвращает payload с user_id и username или 401.
     """
+    settings = get_settings()
+    # запрос через web-frontend: токен уже проверен на входе
+    identity = verify_identity(request.headers.get(IDENTITY_HEADER), settings.internal_identity_secret)
+    if identity is not None:
+        return identity
+
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Отсутствует Bearer токен",
         )
 
-    settings = get_settings()
-    headers = {"Authorization": f"Bearer {credentials.credentials}"}
     async with httpx.AsyncClient(timeout=5.0) as client:
         try:
-            resp = await client.get(settings.auth_validate_url, headers=headers)
+            with span("auth-service GET /auth/validate"):
+                headers = correlation_headers({"Authorization": f"Bearer {credentials.credentials}"})
+                resp = await client.get(settings.auth_validate_url, headers=headers)
         except httpx.HTTPError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,3 +64,27 @@ async def get_current_user(
 
     data = resp.json()
     return {"user_id": data.get("user_id"), "username": data.get("username")}
+
+
+async def get_admin_user(
+    current_user: Annotated[Dict[str, str], Depends(get_current_user)]
+) -> Dict[str, str]:
+    """Пропускает только пользователей из ADMIN_USERNAMES (через запятую), иначе 403."""
+    settings = get_settings()
+    admins = {name.strip() for name in settings.admin_usernames.split(",") if name.strip()}
+    if current_user["username"] not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав",
+        )
+    return current_user
+
+
+async def get_read_db_session(
+    request: Request,
+    current_user: Annotated[Dict[str, str], Depends(get_current_user)],
+) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для чтения (реплика или primary с учетом недавних записей пользователя)."""
+    last_write = last_write_at(request.cookies.get(LAST_WRITE_COOKIE))
+    async with read_session_scope(current_user["user_id"], last_write) as session:
+        yield session
@@ -0,0 +1,289 @@
+"""
+Аналитика по истории операций: поиск аномально крупных расходов.
+
+История пользователя загружается одним запросом в виде колонок (numpy
+массивов), статистика считается векторно по всем категориям сразу.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Transaction
+from .cache import LRUCache
+from .config import get_settings
+from .serialization import cents_to_json
+
+# 0.6745 = Φ⁻¹(0.75): приводит MAD к масштабу стандартного отклонения
+MAD_SCALE = 0.6745
+# для вырожденного MAD (больше половины одинаковых сумм) берем среднее
+# абсолютное отклонение с поправкой sqrt(pi/2) ≈ 1.2533
+MEAN_AD_SCALE = 0.7979
+
+
+@dataclass(frozen=True)
+class Anomalies:
+    """Результат поиска: индексы в исходных массивах и характеристики."""
+
+    indices: np.ndarray
+    scores: np.ndarray
+    medians: np.ndarray
+
+
+def detect_anomalies(
+    category_ids: np.ndarray,
+    amounts: np.ndarray,
+    *,
+    threshold: float,
+    min_samples: int,
+) -> Anomalies:
+    """
+    Находит суммы, аномально большие для своей категории.
+
+    Для каждой категории считается медиана и MAD, оценка — robust z-score
+    0.6745 * (x - median) / MAD. Аномалией считается оценка выше threshold
+    в категориях, где не меньше min_samples операций. Результат отсортирован
+    по убыванию оценки.
+    """
+    n = amounts.shape[0]
+    if n == 0:
+        empty = np.empty(0)
+        return Anomalies(np.empty(0, dtype=np.int64), empty, empty)
+
+    order = np.lexsort((amounts, category_ids))
+    cats = category_ids[order]
+    values = amounts[order].astype(np.float64)
+
+    starts = np.flatnonzero(np.r_[True, cats[1:] != cats[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    lo = starts + (counts - 1) // 2
+    hi = starts + counts // 2
+    group = np.repeat(np.arange(starts.shape[0]), counts)
+
+    medians = (values[lo] + values[hi]) / 2
+    deviation = values - medians[group]
+    abs_dev = np.abs(deviation)
+    sorted_dev = abs_dev[np.lexsort((abs_dev, group))]
+    mad = (sorted_dev[lo] + sorted_dev[hi]) / 2
+    mean_ad = np.add.reduceat(abs_dev, starts) / counts
+
+    scale = np.where(mad > 0, mad / MAD_SCALE, mean_ad / MEAN_AD_SCALE)
+    safe_scale = np.where(scale > 0, scale, 1.0)
+    scores = np.where(scale[group] > 0, deviation / safe_scale[group], 0.0)
+
+    flagged = np.flatnonzero((scores > threshold) & (counts[group] >= min_samples))
+    flagged = flagged[np.argsort(-scores[flagged], kind="stable")]
+    return Anomalies(
+        indices=order[flagged],
+        scores=scores[flagged],
+        medians=medians[group[flagged]],
+    )
+
+
+@dataclass(frozen=True)
+class ExpenseHistory:
+    """Расходы пользователя в колоночном виде."""
+
+    ids: np.ndarray
+    category_ids: np.ndarray
+    amounts: np.ndarray
+    occurred_at: np.ndarray
+
+
+async def load_expense_history(session: AsyncSession, user_id: str) -> ExpenseHistory:
+    """Загружает все расходы пользователя одним запросом без ORM-сущностей."""
+    stmt = select(
+        Transaction.id,
+        Transaction.category_id,
+        Transaction.amount_cents,
+        Transaction.occurred_at,
+    ).where(Transaction.user_id == user_id, Transaction.type == "expense")
+    rows = (await session.execute(stmt)).all()
+    if not rows:
+        return ExpenseHistory(
+            ids=np.empty(0, dtype=object),
+            category_ids=np.empty(0, dtype=np.int64),
+            amounts=np.empty(0, dtype=np.int64),
+            occurred_at=np.empty(0, dtype=object),
+        )
+    ids, category_ids, amounts, occurred_at = zip(*rows)
+    return ExpenseHistory(
+        ids=np.array(ids, dtype=object),
+        category_ids=np.array(category_ids, dtype=np.int64),
+        amounts=np.array(amounts, dtype=np.int64),
+        occurred_at=np.array(occurred_at, dtype=object),
+    )
+
+
+@dataclass(frozen=True)
+class CachedAnomalies:
+    """Найденные аномалии вместе с отпечатком данных, по которым они считались."""
+
+    fingerprint: tuple
+    params: tuple
+    analyzed: int
+    items: list[dict]
+
+
+class AnomalyCache:
+    """
+    Кэш результатов по пользователям.
+
+    Запись сбрасывается при создании операции в этом процессе, а отпечаток
+    (число операций и время последней) защищает от операций, созданных
+    другими репликами.
+    """
+
+    def __init__(self, max_users: int) -> None:
+        self._entries: LRUCache[str, CachedAnomalies] = LRUCache(max_users)
+
+    @staticmethod
+    async def fingerprint(session: AsyncSession, user_id: str) -> tuple:
+        """Отпечаток операций пользователя: (количество, время последней)."""
+        stmt = select(func.count(), func.max(Transaction.created_at)).where(
+            Transaction.user_id == user_id
+        )
+        count, last_created = (await session.execute(stmt)).one()
+        return count, last_created
+
+    def get(self, user_id: str, fingerprint: tuple, params: tuple) -> Optional[CachedAnomalies]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry.fingerprint != fingerprint or entry.params != params:
+            return None
+        return entry
+
+    def set(self, user_id: str, entry: CachedAnomalies) -> None:
+        self._entries.set(user_id, entry)
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id)
+
+
+anomaly_cache = AnomalyCache(get_settings().anomaly_cache_users)
+
+
+def anomaly_items(
+    history: ExpenseHistory, found: Anomalies, names: dict[int, str], limit: int
+) -> list[dict]:
+    """Описания найденных аномалий (не больше limit, по убыванию оценки)."""
+    items = []
+    for idx, score, median in zip(
+        found.indices[:limit].tolist(), found.scores[:limit].tolist(), found.medians[:limit].tolist()
+    ):
+        occurred_at: datetime = history.occurred_at[idx]
+        items.append(
+            {
+                "transaction_id": str(history.ids[idx]),
+                "category": names[int(history.category_ids[idx])],
+                "amount": cents_to_json(int(history.amounts[idx])),
+                "category_median": cents_to_json(round(median)),
+                "score": round(score, 2),
+                "occurred_at": occurred_at,
+            }
+        )
+    return items
+
+
+@dataclass(frozen=True)
+class MonthForecast:
+    """Прогноз на конец одного месяца (суммы в копейках)."""
+
+    month_end: date
+    income: int
+    expense: int
+    balance: int
+
+
+def forecast_month_ends(
+    days: np.ndarray,
+    income: np.ndarray,
+    expense: np.ndarray,
+    *,
+    today: date,
+    history_days: int,
+    months: int,
+    balance: int,
+    recurring_share: float,
+) -> list[MonthForecast]:
+    """
+    Прогнозирует баланс на конец текущего и следующих months месяцев.
+
+    Вход — дневные агрегаты (ordinal даты, доходы, расходы в копейках) за
+    последние history_days дней, как их отдает daily_totals_stmt. Поток
+    каждой стороны раскладывается на:
+
+    - регулярные платежи: число месяца, в которое операции были не меньше
+      чем в recurring_share месяцев истории (зарплата, аренда) — ожидается
+      средняя ненулевая сумма в это число;
+    - фон: остальные операции, равномерно распределенные по дням.
+
+    Платеж 29-31 числа в более коротком месяце ожидается в его последний
+    день; ежедневные траты на конец месяца не переносятся.
+
+    Будущие дни (начиная с завтрашнего) получают ожидаемые суммы, баланс
+    накапливается от текущего.
+    """
+    start = today.toordinal() - history_days
+    history_dom = np.array(
+        [date.fromordinal(start + i).day for i in range(history_days)], dtype=np.int64
+    )
+    dom_seen = np.bincount(history_dom, minlength=32)
+
+    end = _month_end(today, months)
+    future = np.arange(today.toordinal() + 1, end.toordinal() + 1)
+    future_dates = [date.fromordinal(int(o)) for o in future]
+    future_dom = np.array([d.day for d in future_dates], dtype=np.int64)
+    is_month_end = np.array([(d + timedelta(days=1)).day == 1 for d in future_dates], dtype=bool)
+
+    expected = []
+    for values in (income, expense):
+        dense = np.zeros(history_days, dtype=np.float64)
+        idx = days - start
+        keep = (idx >= 0) & (idx < history_days)
+        dense[idx[keep]] = values[keep]
+
+        hits = np.bincount(history_dom, weights=dense > 0, minlength=32)
+        sums = np.bincount(history_dom, weights=dense, minlength=32)
+        recurring = (dom_seen >= 2) & (hits >= recurring_share * np.maximum(dom_seen, 1))
+        per_dom = np.where(recurring, sums / np.maximum(hits, 1), 0.0)
+        background = dense[~recurring[history_dom]].sum() / history_days
+
+        # регулярный платеж 29-31 числа в коротком месяце приходится на последний день;
+        # переносится только превышение над обычным днем, иначе ежедневный поток
+        # получил бы в 30-дневном месяце лишний день, а в феврале — до трех
+        typical = np.median(per_dom[1:29])
+        tail = np.cumsum(np.maximum(per_dom - typical, 0.0)[::-1])[::-1]
+        daily = per_dom[future_dom] + background
+        daily[is_month_end] += tail[np.minimum(future_dom[is_month_end] + 1, 31)] * (
+            future_dom[is_month_end] < 31
+        )
+        expected.append(daily)
+
+    income_daily, expense_daily = expected
+    balance_path = balance + np.cumsum(income_daily - expense_daily)
+    month_keys = np.array([d.year * 12 + d.month for d in future_dates], dtype=np.int64)
+
+    result = []
+    for offset in range(months + 1):
+        month_end = _month_end(today, offset)
+        mask = month_keys == month_end.year * 12 + month_end.month
+        last = np.flatnonzero(future <= month_end.toordinal())
+        result.append(
+            MonthForecast(
+                month_end=month_end,
+                income=int(round(income_daily[mask].sum())),
+                expense=int(round(expense_daily[mask].sum())),
+                balance=int(round(balance_path[last[-1]])) if last.size else balance,
+            )
+        )
+    return result
+
+
+def _month_end(day: date, months_ahead: int) -> date:
+    """Последний день месяца, отстоящего от day на months_ahead."""
+    month_index = day.year * 12 + day.month - 1 + months_ahead + 1
+    first_of_next = date(month_index // 12, month_index % 12 + 1, 1)
+    return first_of_next - timedelta(days=1)
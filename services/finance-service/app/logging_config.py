@@ -1,19 +1,19 @@
 """Настройки логирования для сервиса."""
-import logging
-
+from common.logs import setup_logging
 from .config import get_settings
 
 
 def configure_logging() -> None:
     """
-    Включает базовое логирование в stdout.
+    Включает логирование в stdout через очередь (запись в фоновом потоке).
 
-    Уровень и формат можно задать через переменные окружения:
-    LOG_LEVEL и LOG_FORMAT.
+    Переменные окружения: LOG_LEVEL, LOG_JSON (JSON-формат, по умолчанию),
+    LOG_FORMAT (формат при LOG_JSON=false) и LOG_SAMPLING.
     """
     settings = get_settings()
-    logging.basicConfig(
+    setup_logging(
         level=settings.log_level,
-        format=settings.log_format,
-        handlers=[logging.StreamHandler()],
+        fmt=settings.log_format,
+        json_format=settings.log_json,
+        sampling=settings.log_sampling,
     )
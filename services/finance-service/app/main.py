@@ -1,37 +1,95 @@
 """Точка входа сервиса финансов."""
 import logging
-from datetime import datetime, timedelta
-from decimal import Decimal
-from typing import Dict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Literal
 
 import httpx
-from fastapi import Depends, FastAPI, HTTPException, Query, status
-from sqlalchemy import case, func, select
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from common.health import ReadinessMonitor, require_loopback
+from common.logs import correlation_headers, install_request_id
+from common.loop_monitor import LoopMonitor
+from common.metrics import install_metrics, mark_process_dead
+from common.profiling import install_profiling
+from common.tracing import install_tracing, span
+from db.instrumentation import install_query_stats, query_stats
+from db.leaks import install_leak_detector
 from db.models import Transaction
+from db.pool import pool_stats
+from db.reports import active_users, daily_volume, top_categories
+from db.session import mark_write, ping
+from .categories import categories
 from .config import get_settings
-from .dependencies import get_current_user, get_db_session
+from .dependencies import (
+    get_admin_user,
+    get_current_user,
+    get_db_session,
+    get_read_db_session,
+)
+from .insights import (
+    CachedAnomalies,
+    anomaly_cache,
+    anomaly_items,
+    detect_anomalies,
+    forecast_month_ends,
+    load_expense_history,
+)
 from .logging_config import configure_logging
+from .queries import daily_totals_stmt, summary_stmt
+from .reports import ReportRefresher, refreshed_at
 from .schemas import (
+    ActiveUsersReport,
+    AnomaliesResponse,
     CategoryStatsResponse,
-    DayStatsItem,
+    DailyVolumeReport,
     DayStatsResponse,
+    ForecastResponse,
     SummaryResponse,
+    TopCategoriesReport,
     TransactionCreate,
     TransactionResponse,
     TransactionsListResponse,
+    from_cents,
+    to_cents,
+)
+from .serialization import (
+    TRANSACTION_COLUMNS,
+    FastJSONResponse,
+    cents_to_json,
+    category_stats_payload,
+    day_stats_payload,
+    summary_payload,
+    transactions_page_payload,
 )
 
 configure_logging()
 settings = get_settings()
 logger = logging.getLogger(settings.app_name)
 
+readiness = ReadinessMonitor()
+readiness.add_check("db", ping)
+readiness.add_http_check("auth", settings.auth_health_url)
+loop_monitor = LoopMonitor()
+
+ANOMALY_ITEMS_MAX = 100
+
+report_refresher = ReportRefresher(settings.reports_refresh_interval_seconds)
+
 app = FastAPI(
     title="Finance Service",
     version="0.1.0",
     description="Каркас сервиса финансовых операций.",
 )
+install_profiling(app)
+install_leak_detector(app)
+install_query_stats(app)
+install_metrics(app)
+install_tracing(app, settings.app_name)
+install_request_id(app)
 
 
 @app.get("/health/live")
@@ -41,11 +99,39 @@ async def health_live() -> Dict[str, str]:
 
 
 @app.get("/health/ready")
-async def health_ready() -> Dict[str, str]:
-    """Эндпоинт для проверки готовности приложения."""
+async def health_ready() -> JSONResponse:
+    """Готовность по кэшированным проверкам зависимостей; 503, если не готов."""
+    ready, body = readiness.status()
+    status_code = status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.post("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_drain() -> Dict[str, str]:
+    """Вызывается preStop-хуком с localhost: переводит сервис в drain перед остановкой."""
+    await readiness.drain()
+    return {"status": "draining"}
+
+
+@app.delete("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_undrain() -> Dict[str, str]:
+    """Возвращает сервис из drain (только с localhost)."""
+    readiness.undrain()
     return {"status": "ready"}
 
 
+@app.get("/metrics/db-pool")
+async def metrics_db_pool() -> Dict[str, list]:
+    """Состояние пулов соединений с БД: занятые, overflow, время ожидания."""
+    return {"pools": pool_stats()}
+
+
+@app.get("/metrics/db-queries")
+async def metrics_db_queries() -> Dict[str, dict]:
+    """Запросы к БД по маршрутам: число на запрос и доля времени в БД."""
+    return {"routes": query_stats()}
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
     """Выводит информацию при старте сервиса."""
@@ -56,11 +142,18 @@ async def on_startup() -> None:
         settings.port,
         settings.database_url,
     )
+    await readiness.start()
+    await loop_monitor.start()
+    report_refresher.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
     """Финализирует работу сервиса."""
+    await loop_monitor.stop()
+    await readiness.stop()
+    mark_process_dead()
+    await report_refresher.stop()
     logger.info("Сервис %s завершает работу", settings.app_name)
 
 
@@ -69,7 +162,8 @@ async def _notify(user_id: str, payload: dict) -> None:
     settings = get_settings()
     try:
         async with httpx.AsyncClient(timeout=5.0) as client:
-            await client.post(settings.notification_url, json=payload)
+            with span("notification-service POST /notify/log"):
+                await client.post(settings.notification_url, json=payload, headers=correlation_headers())
     except httpx.HTTPError as exc:
         logger.warning("Не удалось отправить уведомление: %s", exc)
 
@@ -81,6 +175,7 @@ async def _notify(user_id: str, payload: dict) -> None:
 )
 async def create_transaction(
     payload: TransactionCreate,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session),
 ) -> TransactionResponse:
@@ -89,17 +184,20 @@ async def create_transaction(
 
     После успешного сохранения пытается отправить лог в notification-service.
     """
+    category_id = await categories.get_id(session, current_user["user_id"], payload.category)
     tx = Transaction(
         user_id=current_user["user_id"],
         type=payload.type,
-        amount=payload.amount,
-        category=payload.category,
+        amount_cents=to_cents(payload.amount),
+        category_id=category_id,
         description=payload.description,
         occurred_at=payload.occurred_at,
     )
     session.add(tx)
     await session.commit()
     await session.refresh(tx)
+    mark_write(current_user["user_id"], response)
+    anomaly_cache.invalidate(current_user["user_id"])
 
     # fire-and-forget уведомление
     message = f"Добавлена операция {payload.type} на сумму {payload.amount}"
@@ -120,82 +218,63 @@ async def create_transaction(
         id=str(tx.id),
         user_id=str(tx.user_id),
         type=tx.type,
-        amount=Decimal(tx.amount),
-        category=tx.category,
+        amount=from_cents(tx.amount_cents),
+        category=payload.category,
         description=tx.description,
         occurred_at=tx.occurred_at,
         created_at=tx.created_at,
     )
 
 
-@app.get("/finance/transactions", response_model=TransactionsListResponse)
+@app.get(
+    "/finance/transactions",
+    response_model=TransactionsListResponse,
+    response_class=FastJSONResponse,
+)
 async def list_transactions(
     current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-) -> TransactionsListResponse:
+) -> FastJSONResponse:
     """
     Возвращает операции пользователя с пагинацией, отсортированные по occurred_at DESC.
     """
     stmt = (
-        select(Transaction)
+        select(*TRANSACTION_COLUMNS)
         .where(Transaction.user_id == current_user["user_id"])
         .order_by(Transaction.occurred_at.desc())
         .limit(limit)
         .offset(offset)
     )
-    result = await session.execute(stmt)
-    items = result.scalars().all()
+    rows = (await session.execute(stmt)).all()
 
     count_stmt = select(func.count()).where(Transaction.user_id == current_user["user_id"])
     total = (await session.execute(count_stmt)).scalar_one()
+    names = await categories.get_names(
+        session, current_user["user_id"], {row.category_id for row in rows}
+    )
 
-    return TransactionsListResponse(
-        items=[
-            TransactionResponse(
-                id=str(tx.id),
-                user_id=str(tx.user_id),
-                type=tx.type,
-                amount=Decimal(tx.amount),
-                category=tx.category,
-                description=tx.description,
-                occurred_at=tx.occurred_at,
-                created_at=tx.created_at,
-            )
-            for tx in items
-        ],
-        total=total,
-        limit=limit,
-        offset=offset,
+    return FastJSONResponse(
+        transactions_page_payload(rows, names, total=total, limit=limit, offset=offset)
     )
 
 
-@app.get("/finance/stats/summary", response_model=SummaryResponse)
+@app.get(
+    "/finance/stats/summary",
+    response_model=SummaryResponse,
+    response_class=FastJSONResponse,
+)
 async def stats_summary(
     current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
-) -> SummaryResponse:
+    session: AsyncSession = Depends(get_read_db_session),
+) -> FastJSONResponse:
     """Возвращает агрегаты: сумма доходов, расходов и баланс."""
 
     try:
-        stmt = (
-            select(
-                func.coalesce(
-                    func.sum(case((Transaction.type == "income", Transaction.amount))), 0
-                ).label("income"),
-                func.coalesce(
-                    func.sum(case((Transaction.type == "expense", Transaction.amount))), 0
-                ).label("expense"),
-            )
-            .where(Transaction.user_id == current_user["user_id"])
-        )
-        result = await session.execute(stmt)
+        result = await session.execute(summary_stmt(current_user["user_id"]))
         income, expense = result.one()
-        income = Decimal(income or 0)
-        expense = Decimal(expense or 0)
-        balance = income - expense
-        return SummaryResponse(total_income=income, total_expense=expense, balance=balance)
+        return FastJSONResponse(summary_payload(income or 0, expense or 0))
     except HTTPException:
         raise
     except Exception as exc:
@@ -206,34 +285,38 @@ async def stats_summary(
         ) from exc
 
 
-@app.get("/finance/stats/by-category", response_model=CategoryStatsResponse)
+@app.get(
+    "/finance/stats/by-category",
+    response_model=CategoryStatsResponse,
+    response_class=FastJSONResponse,
+)
 async def stats_by_category(
     current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
-) -> CategoryStatsResponse:
+    session: AsyncSession = Depends(get_read_db_session),
+) -> FastJSONResponse:
     """Суммы по категориям отдельно для income и expense."""
     stmt = (
-        select(Transaction.type, Transaction.category, func.sum(Transaction.amount))
+        select(Transaction.type, Transaction.category_id, func.sum(Transaction.amount_cents))
         .where(Transaction.user_id == current_user["user_id"])
-        .group_by(Transaction.type, Transaction.category)
+        .group_by(Transaction.type, Transaction.category_id)
     )
     rows = (await session.execute(stmt)).all()
-    income_map: dict[str, Decimal] = {}
-    expense_map: dict[str, Decimal] = {}
-    for t_type, category, amount in rows:
-        if t_type == "income":
-            income_map[category] = Decimal(amount)
-        else:
-            expense_map[category] = Decimal(amount)
-    return CategoryStatsResponse(income=income_map, expense=expense_map)
+    names = await categories.get_names(
+        session, current_user["user_id"], {category_id for _, category_id, _ in rows}
+    )
+    return FastJSONResponse(category_stats_payload(rows, names))
 
 
-@app.get("/finance/stats/by-day", response_model=DayStatsResponse)
+@app.get(
+    "/finance/stats/by-day",
+    response_model=DayStatsResponse,
+    response_class=FastJSONResponse,
+)
 async def stats_by_day(
     current_user: dict = Depends(get_current_user),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
     days: int = Query(30, ge=1, le=365),
-) -> DayStatsResponse:
+) -> FastJSONResponse:
     """
     Суммы по дням за последние N дней (по occurred_at).
 
@@ -242,34 +325,9 @@ async def stats_by_day(
 
     try:
         cutoff = datetime.utcnow() - timedelta(days=days)
-        stmt = (
-            select(
-                func.date(Transaction.occurred_at).label("day"),
-                func.sum(
-                    case((Transaction.type == "income", Transaction.amount), else_=0)
-                ).label("income"),
-                func.sum(
-                    case((Transaction.type == "expense", Transaction.amount), else_=0)
-                ).label("expense"),
-            )
-            .where(
-                Transaction.user_id == current_user["user_id"],
-                Transaction.occurred_at >= cutoff,
-            )
-            .group_by(func.date(Transaction.occurred_at))
-            .order_by(func.date(Transaction.occurred_at))
-        )
+        stmt = daily_totals_stmt(current_user["user_id"], cutoff)
         rows = (await session.execute(stmt)).all()
-        items = []
-        for row in rows:
-            items.append(
-                DayStatsItem(
-                    date=datetime.combine(row.day, datetime.min.time()),
-                    income=Decimal(row.income or 0),
-                    expense=Decimal(row.expense or 0),
-                )
-            )
-        return DayStatsResponse(items=items)
+        return FastJSONResponse(day_stats_payload(rows))
     except HTTPException:
         raise
     except Exception as exc:
@@ -278,3 +336,221 @@ async def stats_by_day(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Не удалось загрузить статистику по дням",
         ) from exc
+
+
+@app.get(
+    "/finance/insights/anomalies",
+    response_model=AnomaliesResponse,
+    response_class=FastJSONResponse,
+)
+async def insights_anomalies(
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session),
+    limit: int = Query(20, ge=1, le=ANOMALY_ITEMS_MAX),
+    threshold: float | None = Query(None, gt=0),
+) -> FastJSONResponse:
+    """
+    Аномально крупные расходы относительно медианы своей категории.
+
+    Считается по всей истории пользователя (robust z-score по медиане/MAD),
+    результат кэшируется до появления новых операций.
+    """
+    user_id = current_user["user_id"]
+    threshold = threshold or settings.anomaly_threshold
+    params = (threshold, settings.anomaly_min_samples)
+
+    fingerprint = await anomaly_cache.fingerprint(session, user_id)
+    cached = anomaly_cache.get(user_id, fingerprint, params)
+    if cached is None:
+        history = await load_expense_history(session, user_id)
+        found = detect_anomalies(
+            history.category_ids,
+            history.amounts,
+            threshold=threshold,
+            min_samples=settings.anomaly_min_samples,
+        )
+        names = await categories.get_names(
+            session, user_id, set(history.category_ids[found.indices].tolist())
+        )
+        cached = CachedAnomalies(
+            fingerprint=fingerprint,
+            params=params,
+            analyzed=int(history.amounts.shape[0]),
+            items=anomaly_items(history, found, names, ANOMALY_ITEMS_MAX),
+        )
+        anomaly_cache.set(user_id, cached)
+
+    return FastJSONResponse(
+        {"items": cached.items[:limit], "threshold": threshold, "analyzed": cached.analyzed}
+    )
+
+
+@app.get(
+    "/finance/insights/forecast",
+    response_model=ForecastResponse,
+    response_class=FastJSONResponse,
+)
+async def insights_forecast(
+    current_user: dict = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session),
+    months: int = Query(1, ge=0, le=12),
+) -> FastJSONResponse:
+    """
+    Прогноз баланса на конец текущего месяца и следующих months месяцев.
+
+    Строится по тем же дневным агрегатам, что и /finance/stats/by-day,
+    за последние FORECAST_HISTORY_DAYS дней — сырые операции не читаются.
+    """
+    user_id = current_user["user_id"]
+    now = datetime.utcnow()
+    history_days = settings.forecast_history_days
+
+    income_total, expense_total = (await session.execute(summary_stmt(user_id))).one()
+    balance = int(income_total or 0) - int(expense_total or 0)
+
+    since = datetime.combine(now.date() - timedelta(days=history_days), datetime.min.time())
+    rows = (await session.execute(daily_totals_stmt(user_id, since))).all()
+    days = np.array([date.fromisoformat(str(row.day)).toordinal() for row in rows], dtype=np.int64)
+    income = np.array([int(row.income or 0) for row in rows], dtype=np.int64)
+    expense = np.array([int(row.expense or 0) for row in rows], dtype=np.int64)
+
+    forecast = forecast_month_ends(
+        days,
+        income,
+        expense,
+        today=now.date(),
+        history_days=history_days,
+        months=months,
+        balance=balance,
+        recurring_share=settings.forecast_recurring_share,
+    )
+    return FastJSONResponse(
+        {
+            "current_balance": cents_to_json(balance),
+            "history_days": history_days,
+            "items": [
+                {
+                    "month_end": item.month_end,
+                    "projected_income": cents_to_json(item.income),
+                    "projected_expense": cents_to_json(item.expense),
+                    "projected_balance": cents_to_json(item.balance),
+                }
+                for item in forecast
+            ],
+        }
+    )
+
+
+async def _report_freshness(session: AsyncSession, view_name: str) -> dict:
+    """Поля свежести отчета: время обновления представления и возраст в секундах."""
+    at = await refreshed_at(session, view_name)
+    age = (datetime.now(timezone.utc) - at).total_seconds() if at is not None else None
+    return {"refreshed_at": at, "age_seconds": age}
+
+
+@app.get(
+    "/finance/admin/reports/daily-volume",
+    response_model=DailyVolumeReport,
+    response_class=FastJSONResponse,
+)
+async def report_daily_volume(
+    _: dict = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_read_db_session),
+    days: int = Query(30, ge=1, le=365),
+) -> FastJSONResponse:
+    """Оборот платформы по дням за последние N дней (из mv_daily_volume)."""
+    since = datetime.utcnow().date() - timedelta(days=days)
+    stmt = (
+        select(daily_volume)
+        .where(daily_volume.c.day >= since)
+        .order_by(daily_volume.c.day)
+    )
+    rows = (await session.execute(stmt)).all()
+    return FastJSONResponse(
+        {
+            **await _report_freshness(session, daily_volume.name),
+            "items": [
+                {
+                    "day": row.day,
+                    "tx_count": row.tx_count,
+                    "income": cents_to_json(row.income_cents),
+                    "expense": cents_to_json(row.expense_cents),
+                    "active_users": row.active_users,
+                }
+                for row in rows
+            ],
+        }
+    )
+
+
+@app.get(
+    "/finance/admin/reports/top-categories",
+    response_model=TopCategoriesReport,
+    response_class=FastJSONResponse,
+)
+async def report_top_categories(
+    _: dict = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_read_db_session),
+    type: Literal["income", "expense"] = Query("expense"),
+    limit: int = Query(10, ge=1, le=100),
+) -> FastJSONResponse:
+    """Категории с наибольшей суммой операций по всем пользователям (из mv_top_categories)."""
+    stmt = (
+        select(top_categories)
+        .where(top_categories.c.type == type)
+        .order_by(top_categories.c.total_cents.desc())
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    return FastJSONResponse(
+        {
+            **await _report_freshness(session, top_categories.name),
+            "items": [
+                {
+                    "category": row.category,
+                    "type": row.type,
+                    "tx_count": row.tx_count,
+                    "total": cents_to_json(row.total_cents),
+                    "users": row.users,
+                }
+                for row in rows
+            ],
+        }
+    )
+
+
+@app.get(
+    "/finance/admin/reports/active-users",
+    response_model=ActiveUsersReport,
+    response_class=FastJSONResponse,
+)
+async def report_active_users(
+    _: dict = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_read_db_session),
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(20, ge=1, le=100),
+) -> FastJSONResponse:
+    """Самые активные пользователи среди тех, у кого были операции за N дней (из mv_active_users)."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    stmt = (
+        select(active_users)
+        .where(active_users.c.last_activity >= since)
+        .order_by(active_users.c.tx_count.desc())
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    return FastJSONResponse(
+        {
+            **await _report_freshness(session, active_users.name),
+            "items": [
+                {
+                    "user_id": row.user_id,
+                    "username": row.username,
+                    "tx_count": row.tx_count,
+                    "volume": cents_to_json(row.volume_cents),
+                    "last_activity": row.last_activity,
+                }
+                for row in rows
+            ],
+        }
+    )
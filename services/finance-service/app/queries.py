@@ -0,0 +1,40 @@
+"""Общие агрегирующие запросы по операциям пользователя."""
+from datetime import datetime
+
+from sqlalchemy import Select, case, func, select
+
+from db.models import Transaction
+
+
+def summary_stmt(user_id: str) -> Select:
+    """Суммы доходов и расходов (в копейках) за все время."""
+    return select(
+        func.coalesce(
+            func.sum(case((Transaction.type == "income", Transaction.amount_cents))), 0
+        ).label("income"),
+        func.coalesce(
+            func.sum(case((Transaction.type == "expense", Transaction.amount_cents))), 0
+        ).label("expense"),
+    ).where(Transaction.user_id == user_id)
+
+
+def daily_totals_stmt(user_id: str, since: datetime) -> Select:
+    """Доходы и расходы (в копейках) по дням начиная с since, по возрастанию даты."""
+    day = func.date(Transaction.occurred_at)
+    return (
+        select(
+            day.label("day"),
+            func.sum(
+                case((Transaction.type == "income", Transaction.amount_cents), else_=0)
+            ).label("income"),
+            func.sum(
+                case((Transaction.type == "expense", Transaction.amount_cents), else_=0)
+            ).label("expense"),
+        )
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.occurred_at >= since,
+        )
+        .group_by(day)
+        .order_by(day)
+    )
@@ -0,0 +1,117 @@
+"""
+Фоновое обновление материализованных представлений для отчетов.
+
+Каждая реплика запускает планировщик, но каждое представление обновляет
+только та, что получила advisory lock в Postgres на время транзакции
+обновления; представления, обновленные недавно (другой репликой),
+пропускаются. Время обновления пишется в report_refreshes и отдается в
+отчетах как признак свежести данных.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+import db.session as db_session
+from db.models import ReportRefresh
+from db.reports import REPORT_VIEWS
+from .config import get_settings
+
+# произвольный, но постоянный ключ advisory lock для обновления отчетов
+REFRESH_LOCK_KEY = 20261019_0006
+
+logger = logging.getLogger(get_settings().app_name)
+
+
+async def refreshed_at(session: AsyncSession, view_name: str) -> Optional[datetime]:
+    """Время последнего обновления представления."""
+    stmt = select(ReportRefresh.refreshed_at).where(ReportRefresh.view_name == view_name)
+    return (await session.execute(stmt)).scalar_one_or_none()
+
+
+class ReportRefresher:
+    """Периодически обновляет представления из REPORT_VIEWS."""
+
+    def __init__(self, interval_seconds: int) -> None:
+        self.interval = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запускает планировщик (только для Postgres и положительного интервала)."""
+        if self.interval <= 0:
+            logger.info("Обновление отчетов отключено")
+            return
+        if db_session.engine.dialect.name != "postgresql":
+            logger.info("Обновление отчетов пропущено: БД %s", db_session.engine.dialect.name)
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает планировщик."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_once()
+            except Exception:
+                logger.warning("Не удалось обновить отчеты", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def refresh_once(self) -> list[str]:
+        """
+        Обновляет устаревшие представления, если удалось взять блокировку.
+
+        Возвращает имена обновленных представлений.
+        """
+        refreshed: list[str] = []
+        async with db_session.engine.connect() as conn:
+            for view_name in REPORT_VIEWS:
+                # блокировка на время транзакции: commit или rollback снимает ее сам,
+                # и ошибка обновления не оставит ее висеть на соединении из пула
+                try:
+                    locked = (await conn.execute(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_KEY)))).scalar()
+                    if not locked:
+                        await conn.rollback()
+                        break
+                    # свежесть проверяется под блокировкой: другая реплика могла только что обновить
+                    if view_name not in await self._stale_views(conn):
+                        await conn.rollback()
+                        continue
+                    started = datetime.now(timezone.utc)
+                    await conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}"))
+                    stmt = insert(ReportRefresh).values(view_name=view_name, refreshed_at=started)
+                    await conn.execute(
+                        stmt.on_conflict_do_update(
+                            index_elements=[ReportRefresh.view_name],
+                            set_={"refreshed_at": stmt.excluded.refreshed_at},
+                        )
+                    )
+                    await conn.commit()
+                except BaseException:
+                    await conn.rollback()
+                    raise
+                refreshed.append(view_name)
+        if refreshed:
+            logger.info("Обновлены отчеты: %s", ", ".join(refreshed))
+        return refreshed
+
+    async def _stale_views(self, conn: AsyncConnection) -> list[str]:
+        # небольшой запас, чтобы не пропускать обновление из-за дрожания таймеров
+        fresh_after = datetime.now(timezone.utc) - timedelta(seconds=self.interval * 0.9)
+        rows = await conn.execute(
+            select(ReportRefresh.view_name).where(ReportRefresh.refreshed_at >= fresh_after)
+        )
+        fresh = set(rows.scalars())
+        return [name for name in REPORT_VIEWS if name not in fresh]
@@ -1,10 +1,22 @@
 """Схемы запросов/ответов для сервиса финансов."""
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Literal, Optional
 
 from pydantic import BaseModel, Field, condecimal
 
+CENTS_EXPONENT = -2
+
+
+def to_cents(amount: Decimal) -> int:
+    """Переводит сумму из API (Decimal с 2 знаками) в копейки для хранения."""
+    return int(amount.scaleb(-CENTS_EXPONENT))
+
+
+def from_cents(cents: int | Decimal) -> Decimal:
+    """Переводит копейки (или агрегат по ним из БД) обратно в Decimal для API."""
+    return Decimal(cents).scaleb(CENTS_EXPONENT)
+
 
 class TransactionCreate(BaseModel):
     """Запрос на создание операции."""
@@ -65,3 +77,88 @@ class DayStatsResponse(BaseModel):
     """Суммы по дням."""
 
     items: list[DayStatsItem]
+
+
+class AnomalyItem(BaseModel):
+    """Расход, аномально крупный для своей категории."""
+
+    transaction_id: str
+    category: str
+    amount: Decimal
+    category_median: Decimal
+    score: float
+    occurred_at: datetime
+
+
+class AnomaliesResponse(BaseModel):
+    """Найденные аномалии и параметры поиска."""
+
+    items: list[AnomalyItem]
+    threshold: float
+    analyzed: int
+
+
+class MonthForecastItem(BaseModel):
+    """Прогноз на конец месяца."""
+
+    month_end: date
+    projected_income: Decimal
+    projected_expense: Decimal
+    projected_balance: Decimal
+
+
+class ForecastResponse(BaseModel):
+    """Прогноз баланса на концы месяцев."""
+
+    current_balance: Decimal
+    history_days: int
+    items: list[MonthForecastItem]
+
+
+class DailyVolumeItem(BaseModel):
+    """Оборот платформы за день."""
+
+    day: date
+    tx_count: int
+    income: Decimal
+    expense: Decimal
+    active_users: int
+
+
+class TopCategoryItem(BaseModel):
+    """Категория в рейтинге по сумме операций."""
+
+    category: str
+    type: Literal["income", "expense"]
+    tx_count: int
+    total: Decimal
+    users: int
+
+
+class ActiveUserItem(BaseModel):
+    """Активный пользователь платформы."""
+
+    user_id: str
+    username: str
+    tx_count: int
+    volume: Decimal
+    last_activity: datetime
+
+
+class ReportFreshness(BaseModel):
+    """Время последнего обновления представления и его возраст."""
+
+    refreshed_at: Optional[datetime]
+    age_seconds: Optional[float]
+
+
+class DailyVolumeReport(ReportFreshness):
+    items: list[DailyVolumeItem]
+
+
+class TopCategoriesReport(ReportFreshness):
+    items: list[TopCategoryItem]
+
+
+class ActiveUsersReport(ReportFreshness):
+    items: list[ActiveUserItem]
@@ -0,0 +1,109 @@
+"""
+Быстрая сериализация списков и статистики.
+
+Обработчики выбирают из БД только нужные колонки (кортежи строк, без ORM
+сущностей) и собирают ответ сразу в виде словарей, которые кодируются orjson.
+Pydantic-модели из schemas.py остаются в response_model для OpenAPI, но
+повторная валидация каждой строки не выполняется.
+
+Формат совпадает с тем, что FastAPI отдавал через response_model: суммы —
+JSON-числа с дробной частью, даты — ISO 8601.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+from fastapi.responses import ORJSONResponse
+
+from db.models import Transaction
+
+FastJSONResponse = ORJSONResponse
+
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.user_id,
+    Transaction.type,
+    Transaction.amount_cents,
+    Transaction.category_id,
+    Transaction.description,
+    Transaction.occurred_at,
+    Transaction.created_at,
+)
+
+
+def cents_to_json(cents: int | Decimal) -> float:
+    """Копейки (или агрегат по ним) в JSON-число рублей."""
+    return int(cents) / 100
+
+
+def transactions_page_payload(
+    rows: Iterable[Sequence[Any]],
+    names: dict[int, str],
+    *,
+    total: int,
+    limit: int,
+    offset: int,
+) -> dict[str, Any]:
+    """Страница операций из строк, выбранных по TRANSACTION_COLUMNS."""
+    return {
+        "items": [
+            {
+                "id": tx_id,
+                "user_id": user_id,
+                "type": t_type,
+                "amount": amount_cents / 100,
+                "category": names[category_id],
+                "description": description,
+                "occurred_at": occurred_at,
+                "created_at": created_at,
+            }
+            for (
+                tx_id,
+                user_id,
+                t_type,
+                amount_cents,
+                category_id,
+                description,
+                occurred_at,
+                created_at,
+            ) in rows
+        ],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
+
+
+def summary_payload(income_cents: int | Decimal, expense_cents: int | Decimal) -> dict[str, Any]:
+    """Сводка доходов/расходов и баланс."""
+    return {
+        "total_income": cents_to_json(income_cents),
+        "total_expense": cents_to_json(expense_cents),
+        "balance": cents_to_json(int(income_cents) - int(expense_cents)),
+    }
+
+
+def category_stats_payload(
+    rows: Iterable[Sequence[Any]], names: dict[int, str]
+) -> dict[str, dict[str, float]]:
+    """Суммы по категориям из строк (type, category_id, sum_cents)."""
+    income: dict[str, float] = {}
+    expense: dict[str, float] = {}
+    for t_type, category_id, amount in rows:
+        target = income if t_type == "income" else expense
+        target[names[category_id]] = cents_to_json(amount)
+    return {"income": income, "expense": expense}
+
+
+def day_stats_payload(rows: Iterable[Sequence[Any]]) -> dict[str, list[dict[str, Any]]]:
+    """Суммы по дням из строк (day, income_cents, expense_cents)."""
+    return {
+        "items": [
+            {
+                "date": datetime.combine(day, datetime.min.time()),
+                "income": cents_to_json(income or 0),
+                "expense": cents_to_json(expense or 0),
+            }
+            for day, income, expense in rows
+        ]
+    }
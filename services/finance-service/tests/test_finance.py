@@ -1,17 +1,24 @@
 """Интеграционные тесты finance-service с моками auth/notification."""
 import asyncio
 import os
+import pstats
 import sys
+import time
 import uuid
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from pathlib import Path
 from typing import AsyncGenerator
 
+import numpy as np
 import pytest
 import respx
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from httpx import Response
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 
 ROOT_DIR = Path(__file__).resolve().parents[3]
@@ -20,9 +27,18 @@ for p in (ROOT_DIR, SERVICE_DIR):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
 
+import db.pool as db_pool  # noqa: E402
 import db.session as db_session  # noqa: E402
-from db.models import Base  # noqa: E402
+from db.leaks import SessionLeakMiddleware  # noqa: E402
+from common.logs import RequestIdMiddleware  # noqa: E402
+from common.profiling import ProfilingMiddleware  # noqa: E402
+from db.models import Base, Category  # noqa: E402
+from db.reports import daily_volume, report_metadata  # noqa: E402
 from app.main import app  # noqa: E402
+from app.categories import categories  # noqa: E402
+from app.config import Settings, get_settings  # noqa: E402
+from app.insights import detect_anomalies, forecast_month_ends  # noqa: E402
+from app.schemas import from_cents, to_cents  # noqa: E402
 
 
 @asynccontextmanager
@@ -106,3 +122,422 @@ def test_create_transaction_and_summary(client: tuple[TestClient, respx.Router])
     assert summary["total_income"] == "100.50"
     assert summary["total_expense"] == "0"
     assert summary["balance"] == "100.50"
+
+
+def test_stats_by_category_returns_names(client: tuple[TestClient, respx.Router]) -> None:
+    """Категории хранятся по id, но в API приходят и уходят названиями."""
+    test_client, router = client
+    user_id = str(uuid.uuid4())
+    _mock_auth(router, user_id, "bob")
+    _mock_notification(router)
+    headers = {"Authorization": "Bearer token"}
+
+    for amount, category in (("10.00", "food"), ("5.00", "food"), ("7.00", "transport")):
+        resp = test_client.post(
+            "/finance/transactions",
+            json={"type": "expense", "amount": amount, "category": category},
+            headers=headers,
+        )
+        assert resp.status_code == 201, resp.text
+        assert resp.json()["category"] == category
+
+    resp_stats = test_client.get("/finance/stats/by-category", headers=headers)
+    assert resp_stats.status_code == 200, resp_stats.text
+    stats = resp_stats.json()
+    assert stats["income"] == {}
+    assert set(stats["expense"]) == {"food", "transport"}
+
+    resp_list = test_client.get("/finance/transactions", headers=headers)
+    assert resp_list.status_code == 200, resp_list.text
+    assert {item["category"] for item in resp_list.json()["items"]} == {"food", "transport"}
+
+
+def test_category_id_cached_only_after_commit(client: tuple[TestClient, respx.Router]) -> None:
+    """Категория из неудавшегося коммита не остается в кэше, следующая операция создает ее заново."""
+    user_id = str(uuid.uuid4())
+
+    async def scenario() -> tuple[int, set[int]]:
+        async with db_session.SessionFactory() as session:
+            await categories.get_id(session, user_id, "gifts")
+            # дубликат нарушает уникальность: коммит падает, категория откатывается
+            session.add(Category(user_id=user_id, name="gifts"))
+            with pytest.raises(IntegrityError):
+                await session.commit()
+            await session.rollback()
+
+        async with db_session.SessionFactory() as session:
+            created_id = await categories.get_id(session, user_id, "gifts")
+            await session.commit()
+            stored = set(
+                (await session.execute(select(Category.id).where(Category.user_id == user_id))).scalars()
+            )
+        return created_id, stored
+
+    # id из отката в кэше вернулся бы без создания строки, и stored был бы пуст
+    created_id, stored = asyncio.get_event_loop().run_until_complete(scenario())
+    assert stored == {created_id}
+
+    async def cached_id() -> int:
+        async with db_session.SessionFactory() as session:
+            return await categories.get_id(session, user_id, "gifts")
+
+    assert asyncio.get_event_loop().run_until_complete(cached_id()) == created_id
+
+
+def test_traceparent_propagates_to_auth_and_notification(client: tuple[TestClient, respx.Router]) -> None:
+    """Trace id входящего traceparent доходит до вызовов auth-service и notification-service."""
+    test_client, router = client
+    user_id = str(uuid.uuid4())
+    _mock_auth(router, user_id, "trace")
+    _mock_notification(router)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    resp = test_client.post(
+        "/finance/transactions",
+        json={"type": "expense", "amount": "5.00", "category": "food", "occurred_at": datetime.utcnow().isoformat()},
+        headers={"Authorization": "Bearer token", "traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"},
+    )
+    assert resp.status_code == 201, resp.text
+    assert resp.headers["x-trace-id"] == trace_id
+
+    outgoing = {call.request.url.path: call.request.headers.get("traceparent") for call in router.calls}
+    for path in ("/auth/validate", "/notify/log"):
+        assert outgoing[path].startswith(f"00-{trace_id}-")
+        assert outgoing[path].endswith("-01")
+    assert outgoing["/auth/validate"] != outgoing["/notify/log"]
+
+
+def _replicas(*names: str) -> list[db_session.ReadReplica]:
+    return [db_session.ReadReplica(name=name, engine=None, session_factory=None) for name in names]
+
+
+def test_read_router_rotates_and_skips_ejected_replicas() -> None:
+    """Каждое чтение начинает со следующей реплики; исключенная пропускается до конца срока."""
+    router = db_session.ReadRouter(_replicas("a", "b", "c"), eject_seconds=30, read_your_writes_seconds=5)
+    order = [[r.name for r in router.candidates(None)] for _ in range(4)]
+    assert order == [["a", "b", "c"], ["b", "c", "a"], ["c", "a", "b"], ["a", "b", "c"]]
+
+    router.eject(router.replicas[1])
+    assert [r.name for r in router.candidates(None)] == ["c", "a"]
+    router.replicas[1].ejected_until = 0.0
+    assert [r.name for r in router.candidates(None)] == ["c", "a", "b"]
+
+
+def test_read_router_reads_own_writes_from_primary() -> None:
+    """После записи чтения пользователя идут на primary: по отметке процесса или по cookie из другой реплики."""
+    router = db_session.ReadRouter(_replicas("a", "b"), eject_seconds=30, read_your_writes_seconds=5)
+    router.mark_write("alice")
+    assert router.candidates("alice") == []
+    assert len(router.candidates("bob")) == 2
+
+    # запись прошла через другой процесс: о ней знает только cookie клиента
+    assert router.candidates("carol", last_write=time.time() - 1) == []
+    assert len(router.candidates("carol", last_write=time.time() - 10)) == 2
+    assert len(router.candidates("carol", last_write=db_session.last_write_at("junk"))) == 2
+
+    router.read_your_writes_seconds = 0
+    router.mark_write("alice")
+    assert len(router.candidates("alice")) == 2
+
+
+def test_engine_options_for_transaction_pooling(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Для PgBouncer в режиме транзакций кэш подготовленных выражений asyncpg выключается."""
+    assert "poolclass" not in db_pool.engine_options("sqlite+aiosqlite:///:memory:", "test")
+
+    monkeypatch.setattr(db_pool, "TRANSACTION_POOLING", True)
+    options = db_pool.engine_options("postgresql+asyncpg://u:p@db/app", "test")
+    assert options["poolclass"] is db_pool.InstrumentedPool
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+
+
+def test_db_pool_metrics(client: tuple[TestClient, respx.Router], tmp_path: Path) -> None:
+    """/metrics/db-pool отдает состояние каждого InstrumentedPool и гистограмму ожидания."""
+    test_client, _ = client
+    metrics = db_pool.PoolMetrics("test")
+    metrics.observe_wait(0.003)
+    metrics.observe_wait(2.0)
+    wait = metrics.snapshot()["wait_seconds"]
+    assert wait["buckets"]["0.005"] == 1
+    assert wait["buckets"]["2.5"] == 2
+    assert wait["buckets"]["+Inf"] == 2
+
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=db_pool.InstrumentedPool,
+        pool_logging_name="test-pool",
+        pool_size=2,
+        max_overflow=1,
+    )
+    loop = asyncio.get_event_loop()
+    try:
+        conn = loop.run_until_complete(engine.connect())
+        resp = test_client.get("/metrics/db-pool")
+        assert resp.status_code == 200
+        pool = next(pool for pool in resp.json()["pools"] if pool["name"] == "test-pool")
+        assert pool["size"] == 2
+        assert pool["max_overflow"] == 1
+        assert pool["checked_out"] == 1
+        assert pool["wait_seconds"]["count"] == 1
+        loop.run_until_complete(conn.close())
+        assert db_pool.POOL_METRICS["test-pool"].snapshot()["checked_out"] == 0
+    finally:
+        loop.run_until_complete(engine.dispose())
+        db_pool.POOL_METRICS.pop("test-pool", None)
+
+
+def test_leak_detector_reports_unreturned_connection(
+    client: tuple[TestClient, respx.Router], caplog: pytest.LogCaptureFixture
+) -> None:
+    """Детектор утечек пишет маршрут и место взятия соединения, не возвращенного после ответа."""
+    leaked = []
+    leak_app = FastAPI()
+
+    @leak_app.get("/leak")
+    async def leak() -> dict:
+        session = db_session.SessionFactory()
+        await session.connection()
+        leaked.append(session)
+        return {}
+
+    @leak_app.get("/release")
+    async def release() -> dict:
+        for session in leaked:
+            await session.close()
+        return {}
+
+    @leak_app.get("/ok")
+    async def ok() -> dict:
+        async with db_session.session_scope() as session:
+            await session.connection()
+        return {}
+
+    with TestClient(SessionLeakMiddleware(leak_app)) as leak_client, caplog.at_level("WARNING", "db.leaks"):
+        assert leak_client.get("/ok").status_code == 200
+        assert not caplog.records
+        assert leak_client.get("/leak").status_code == 200
+        assert leak_client.get("/release").status_code == 200
+
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "GET /leak" in message
+    assert "in leak" in message
+
+
+def test_profiling_writes_pstats_for_token_requests(tmp_path: Path) -> None:
+    """Запрос с верным X-Profile-Token профилируется, файл pstats называется по маршруту и request_id."""
+    profiled_app = FastAPI()
+
+    @profiled_app.get("/finance/stats/by-day")
+    async def by_day() -> dict:
+        return {"items": sorted(range(1000), key=lambda i: -i)[:3]}
+
+    wrapped = RequestIdMiddleware(ProfilingMiddleware(profiled_app, token="s3cret", directory=str(tmp_path)))
+    with TestClient(wrapped) as profiled_client:
+        assert "x-profile-file" not in profiled_client.get("/finance/stats/by-day").headers
+        wrong = profiled_client.get("/finance/stats/by-day", headers={"X-Profile-Token": "nope"})
+        assert "x-profile-file" not in wrong.headers
+        resp = profiled_client.get(
+            "/finance/stats/by-day", headers={"X-Profile-Token": "s3cret", "X-Request-ID": "req-42"}
+        )
+
+    assert resp.status_code == 200
+    filename = resp.headers["x-profile-file"]
+    assert filename.endswith("_GET_finance_stats_by-day_req-42.prof")
+    assert [p.name for p in tmp_path.iterdir()] == [filename]
+    stats = pstats.Stats(str(tmp_path / filename))
+    assert any(func[2] == "by_day" for func in stats.stats)
+
+
+def test_profiling_sanitizes_hostile_request_id(tmp_path: Path) -> None:
+    """X-Request-ID с ../ не выводит файл профиля за пределы PROFILE_DIR."""
+    profiled_app = FastAPI()
+
+    @profiled_app.get("/finance/stats/summary")
+    async def summary() -> dict:
+        return {}
+
+    profile_dir = tmp_path / "profiles"
+    wrapped = RequestIdMiddleware(ProfilingMiddleware(profiled_app, sample_rate=1.0, directory=str(profile_dir)))
+    with TestClient(wrapped) as profiled_client:
+        resp = profiled_client.get(
+            "/finance/stats/summary", headers={"X-Request-ID": "../../../../etc/cron.d/x"}
+        )
+
+    assert resp.status_code == 200
+    filename = resp.headers["x-profile-file"]
+    assert filename.endswith("_GET_finance_stats_summary_etc_cron_d_x.prof")
+    assert [p.name for p in profile_dir.iterdir()] == [filename]
+    assert [p.name for p in tmp_path.iterdir()] == ["profiles"]
+
+
+def test_cents_conversion_roundtrip() -> None:
+    """Суммы хранятся в копейках и без потерь возвращаются в Decimal."""
+    assert to_cents(Decimal("100.50")) == 10050
+    assert to_cents(Decimal("0.01")) == 1
+    assert from_cents(10050) == Decimal("100.50")
+    assert str(from_cents(Decimal(199))) == "1.99"
+
+
+def test_detect_anomalies_per_category() -> None:
+    """Крупная сумма выделяется относительно своей категории, а не общей выборки."""
+    category_ids = np.array([1] * 10 + [2] * 10)
+    amounts = np.array([100, 110, 90, 105, 95, 100, 102, 98, 101, 1000] + [5000] * 10)
+    found = detect_anomalies(category_ids, amounts, threshold=3.5, min_samples=5)
+    assert found.indices.tolist() == [9]
+    assert found.medians.tolist() == [100.5]
+
+    rng = np.random.default_rng(0)
+    big = detect_anomalies(
+        rng.integers(1, 30, 100_000), rng.integers(100, 10_000, 100_000), threshold=3.5, min_samples=5
+    )
+    assert big.indices.shape == big.scores.shape
+
+
+def test_anomalies_endpoint(client: tuple[TestClient, respx.Router]) -> None:
+    """GET /finance/insights/anomalies учитывает новые операции."""
+    test_client, router = client
+    user_id = str(uuid.uuid4())
+    _mock_auth(router, user_id, "carol")
+    _mock_notification(router)
+    headers = {"Authorization": "Bearer token"}
+
+    for amount in ("10.00", "11.00", "9.00", "10.50", "9.50", "10.00"):
+        test_client.post(
+            "/finance/transactions",
+            json={"type": "expense", "amount": amount, "category": "coffee"},
+            headers=headers,
+        )
+    resp = test_client.get("/finance/insights/anomalies", headers=headers)
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["items"] == []
+    assert resp.json()["analyzed"] == 6
+
+    test_client.post(
+        "/finance/transactions",
+        json={"type": "expense", "amount": "250.00", "category": "coffee"},
+        headers=headers,
+    )
+    items = test_client.get("/finance/insights/anomalies", headers=headers).json()["items"]
+    assert len(items) == 1
+    assert items[0]["category"] == "coffee"
+    assert items[0]["amount"] == 250.0
+
+
+def test_forecast_month_ends_uses_recurring_days() -> None:
+    """Зарплата 5-го числа и ежедневные траты переносятся на будущие месяцы."""
+    today = date(2026, 10, 19)
+    start = today.toordinal() - 180
+    history = [date.fromordinal(start + i) for i in range(180)]
+    days = np.array([d.toordinal() for d in history])
+    income = np.array([100_000 if d.day == 5 else 0 for d in history])
+    expense = np.array([1_000] * len(history))
+
+    forecast = forecast_month_ends(
+        days, income, expense,
+        today=today, history_days=180, months=1, balance=50_000, recurring_share=0.6,
+    )
+    assert [item.month_end for item in forecast] == [date(2026, 10, 31), date(2026, 11, 30)]
+    assert forecast[0].income == 0
+    assert forecast[0].expense == 12 * 1_000
+    assert forecast[1].income == 100_000
+    assert forecast[1].expense == 30 * 1_000
+    assert forecast[1].balance == 50_000 - 12_000 + 100_000 - 30_000
+
+
+def test_forecast_month_end_payment_moves_to_short_month_end() -> None:
+    """Платеж 31-го числа в феврале приходится на 28-е, ежедневные траты — только за 28 дней."""
+    today = date(2027, 1, 20)
+    start = today.toordinal() - 180
+    history = [date.fromordinal(start + i) for i in range(180)]
+    days = np.array([d.toordinal() for d in history])
+    income = np.array([100_000 if d.day == 31 else 0 for d in history])
+    expense = np.array([1_000] * len(history))
+
+    forecast = forecast_month_ends(
+        days, income, expense,
+        today=today, history_days=180, months=1, balance=0, recurring_share=0.6,
+    )
+    assert [item.month_end for item in forecast] == [date(2027, 1, 31), date(2027, 2, 28)]
+    assert (forecast[0].income, forecast[0].expense) == (100_000, 11 * 1_000)
+    assert (forecast[1].income, forecast[1].expense) == (100_000, 28 * 1_000)
+    assert forecast[1].balance == 2 * 100_000 - 39 * 1_000
+
+
+def test_forecast_endpoint(client: tuple[TestClient, respx.Router]) -> None:
+    """GET /finance/insights/forecast строится от текущего баланса."""
+    test_client, router = client
+    user_id = str(uuid.uuid4())
+    _mock_auth(router, user_id, "dave")
+    _mock_notification(router)
+    headers = {"Authorization": "Bearer token"}
+
+    test_client.post(
+        "/finance/transactions",
+        json={
+            "type": "income",
+            "amount": "300.00",
+            "category": "salary",
+            "occurred_at": (datetime.utcnow() - timedelta(days=3)).isoformat(),
+        },
+        headers=headers,
+    )
+    resp = test_client.get("/finance/insights/forecast?months=2", headers=headers)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["current_balance"] == 300.0
+    assert len(data["items"]) == 3
+
+
+def test_admin_reports_require_admin(client: tuple[TestClient, respx.Router]) -> None:
+    """Отчеты по платформе доступны только пользователям из ADMIN_USERNAMES."""
+    test_client, router = client
+    _mock_auth(router, str(uuid.uuid4()), "eve")
+
+    resp = test_client.get("/finance/admin/reports/daily-volume", headers={"Authorization": "Bearer token"})
+    assert resp.status_code == 403
+
+
+def test_admin_reports_for_configured_admin(
+    client: tuple[TestClient, respx.Router], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Администратор из ADMIN_USERNAMES получает строки представлений."""
+    test_client, router = client
+    monkeypatch.setattr(get_settings(), "admin_usernames", "root, ops")
+    _mock_auth(router, str(uuid.uuid4()), "ops")
+
+    async def fill_views() -> None:
+        # в SQLite представления заменяются таблицами с теми же колонками
+        async with db_session.engine.begin() as conn:
+            await conn.run_sync(report_metadata.create_all)
+            await conn.execute(
+                insert(daily_volume).values(
+                    day=date.today(), tx_count=3, income_cents=150_000, expense_cents=2_550, active_users=2
+                )
+            )
+
+    asyncio.get_event_loop().run_until_complete(fill_views())
+
+    resp = test_client.get("/finance/admin/reports/daily-volume?days=7", headers={"Authorization": "Bearer token"})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert data["items"] == [
+        {
+            "day": date.today().isoformat(),
+            "tx_count": 3,
+            "income": 1500.0,
+            "expense": 25.5,
+            "active_users": 2,
+        }
+    ]
+    # представление еще ни разу не обновлялось
+    assert data["refreshed_at"] is None and data["age_seconds"] is None
+
+    resp = test_client.get("/finance/admin/reports/top-categories", headers={"Authorization": "Bearer token"})
+    assert resp.status_code == 200, resp.text
+    assert resp.json() == {"refreshed_at": None, "age_seconds": None, "items": []}
+
+
+def test_admin_reports_disabled_by_default() -> None:
+    """Без ADMIN_USERNAMES администраторов нет: отчеты выключены."""
+    assert Settings(_env_file=None).admin_usernames == ""
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
     log_format: str = Field(
         "%(asctime)s %(levelname)s [%(name)s] %(message)s", env="LOG_FORMAT"
     )
+    log_json: bool = Field(True, env="LOG_JSON")
+    log_sampling: str = Field("notification-service.events=0.1", env="LOG_SAMPLING")
     default_page_size: int = Field(20, env="DEFAULT_PAGE_SIZE")
     max_page_size: int = Field(100, env="MAX_PAGE_SIZE")
 
@@ -1,10 +1,18 @@
 """Зависимости FastAPI для доступа к БД."""
+from typing import AsyncGenerator
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.session import get_session
+from db.session import read_session_scope, session_scope
+
+
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия БД на время запроса; закрывается после отправки ответа."""
+    async with session_scope() as session:
+        yield session
 
 
-async def get_db_session() -> AsyncSession:
-    """Возвращает асинхронную сессию БД."""
-    async for session in get_session():
-        return session
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Сессия для чтения (реплика, если настроена, иначе primary)."""
+    async with read_session_scope() as session:
+        yield session
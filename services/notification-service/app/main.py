@@ -2,12 +2,23 @@ import logging
 from typing import Dict
 
 from fastapi import Depends, FastAPI, Query, status
+from fastapi.responses import JSONResponse
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from common.health import ReadinessMonitor, require_loopback
+from common.logs import install_request_id
+from common.loop_monitor import LoopMonitor
+from common.metrics import install_metrics, mark_process_dead
+from common.profiling import install_profiling
+from common.tracing import current_trace_id, install_tracing
+from db.instrumentation import install_query_stats, query_stats
+from db.leaks import install_leak_detector
 from db.models import NotificationLog
+from db.pool import pool_stats
+from db.session import ping
 from .config import get_settings
-from .dependencies import get_db_session
+from .dependencies import get_db_session, get_read_db_session
 from .logging_config import configure_logging
 from .schemas import (
     NotificationLogCreate,
@@ -18,12 +29,24 @@ from .schemas import (
 configure_logging()
 settings = get_settings()
 logger = logging.getLogger(settings.app_name)
+# строка на каждое событие — отдельный логгер, чтобы выборка LOG_SAMPLING не затрагивала остальные логи
+events_logger = logging.getLogger(f"{settings.app_name}.events")
+
+readiness = ReadinessMonitor()
+readiness.add_check("db", ping)
+loop_monitor = LoopMonitor()
 
 app = FastAPI(
     title="Notification Service",
     version="0.1.0",
     description="Каркас сервиса уведомлений.",
 )
+install_profiling(app)
+install_leak_detector(app)
+install_query_stats(app)
+install_metrics(app)
+install_tracing(app, settings.app_name)
+install_request_id(app)
 
 
 @app.get("/health/live")
@@ -32,10 +55,34 @@ async def health_live() -> Dict[str, str]:
 
 
 @app.get("/health/ready")
-async def health_ready() -> Dict[str, str]:
+async def health_ready() -> JSONResponse:
+    ready, body = readiness.status()
+    status_code = status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.post("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_drain() -> Dict[str, str]:
+    await readiness.drain()
+    return {"status": "draining"}
+
+
+@app.delete("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_undrain() -> Dict[str, str]:
+    readiness.undrain()
     return {"status": "ready"}
 
 
+@app.get("/metrics/db-pool")
+async def metrics_db_pool() -> Dict[str, list]:
+    return {"pools": pool_stats()}
+
+
+@app.get("/metrics/db-queries")
+async def metrics_db_queries() -> Dict[str, dict]:
+    return {"routes": query_stats()}
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
     logger.info(
@@ -45,10 +92,15 @@ async def on_startup() -> None:
         settings.port,
         settings.database_url,
     )
+    await readiness.start()
+    await loop_monitor.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await loop_monitor.stop()
+    await readiness.stop()
+    mark_process_dead()
     logger.info("Сервис %s завершает работу", settings.app_name)
 
 
@@ -57,15 +109,20 @@ async def log_notification(
     payload: NotificationLogCreate,
     session: AsyncSession = Depends(get_db_session),
 ) -> Dict[str, str]:
+    event_payload = payload.payload
+    trace_id = current_trace_id()
+    if trace_id is not None:
+        # связывает событие с трассой запроса, который его породил
+        event_payload = {**(event_payload or {}), "trace_id": trace_id}
     log_entry = NotificationLog(
         user_id=payload.user_id,
         event_type=payload.event_type,
         message=payload.message,
-        payload=payload.payload,
+        payload=event_payload,
     )
     session.add(log_entry)
     await session.commit()
-    logger.info(
+    events_logger.info(
         "Принято событие %s для пользователя %s: %s",
         payload.event_type,
         payload.user_id,
@@ -76,7 +133,7 @@ async def log_notification(
 
 @app.get("/notify/logs", response_model=NotificationLogsList)
 async def get_logs(
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncSession = Depends(get_read_db_session),
     limit: int = Query(None, ge=1, le=500),
     offset: int = Query(0, ge=0),
 ) -> NotificationLogsList:
@@ -16,6 +16,7 @@ for p in (ROOT_DIR, SERVICE_DIR):
     if str(p) not in sys.path:
         sys.path.insert(0, str(p))
 
+import db.instrumentation as db_instrumentation  # noqa: E402
 import db.session as db_session  # noqa: E402
 from db.models import Base  # noqa: E402
 from app.main import app  # noqa: E402
@@ -75,3 +76,52 @@ def test_log_and_list(client: TestClient) -> None:
     assert data["total"] >= 1
     assert len(data["items"]) >= 1
     assert data["items"][0]["event_type"] == "test_event"
+
+
+def test_query_stats_per_route(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Запросы к БД относятся к маршруту, медленные пишутся в лог без значений параметров."""
+    monkeypatch.setattr(db_instrumentation, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level("WARNING", "db.slow_queries"):
+        assert client.get("/notify/logs", params={"limit": 5, "offset": 0}).status_code == 200
+
+    stats = client.get("/metrics/db-queries").json()["routes"]["GET /notify/logs"]
+    assert stats["requests"] >= 1
+    assert stats["max_queries_per_request"] == 2
+    assert 0 < stats["db_share"] <= 1
+
+    slow = [record.getMessage() for record in caplog.records if record.name == "db.slow_queries"]
+    assert slow and all("(GET /notify/logs)" in message for message in slow)
+    assert "<int>" in slow[0]
+    assert db_instrumentation.redact_parameters({"password": "secret"}) == {"password": "<str>"}
+
+
+def test_prometheus_metrics_by_route_template(client: TestClient) -> None:
+    """/metrics отдает счетчики и гистограммы по шаблону маршрута, а не по пути."""
+    assert client.get("/notify/logs", params={"limit": 1}).status_code == 200
+    assert client.get("/no-such-path").status_code == 404
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    assert 'http_requests_total{method="GET",route="/notify/logs",status="200"}' in text
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/notify/logs",status="200"}' in text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in text
+    assert 'http_requests_in_flight{method="GET",route="/metrics"} 1.0' in text
+
+
+def test_log_stores_trace_id(client: TestClient) -> None:
+    """Событие сохраняет trace_id из traceparent запроса в payload."""
+    trace_id = "0af7651916cd43dd8448eb211c80319c"
+    resp = client.post(
+        "/notify/log",
+        json={"user_id": None, "event_type": "traced_event", "message": "Hi", "payload": {"key": "value"}},
+        headers={"traceparent": f"00-{trace_id}-b7ad6b7169203331-01"},
+    )
+    assert resp.status_code == 202, resp.text
+
+    items = client.get("/notify/logs", params={"limit": 50}).json()["items"]
+    traced = next(item for item in items if item["event_type"] == "traced_event")
+    assert traced["payload"] == {"key": "value", "trace_id": trace_id}
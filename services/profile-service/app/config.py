@@ -16,10 +16,18 @@ class Settings(BaseSettings):
         "http://auth-service:8001/auth/validate",
         env="AUTH_VALIDATE_URL",
     )
+    auth_health_url: str = Field(
+        "http://auth-service:8001/health/live",
+        env="AUTH_HEALTH_URL",
+    )
+    # общий с web-frontend секрет подписи X-Internal-Identity; пусто — заголовок не принимается
+    internal_identity_secret: str = Field("", env="INTERNAL_IDENTITY_SECRET")
     log_level: str = Field("INFO", env="LOG_LEVEL")
     log_format: str = Field(
         "%(asctime)s %(levelname)s [%(name)s] %(message)s", env="LOG_FORMAT"
     )
+    log_json: bool = Field(True, env="LOG_JSON")
+    log_sampling: str = Field("", env="LOG_SAMPLING")
 
     class Config:
         env_file = ".env"
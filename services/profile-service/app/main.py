@@ -2,14 +2,25 @@
 import logging
 from typing import Dict
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy import func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from common.health import ReadinessMonitor, require_loopback
+from common.logs import install_request_id
+from common.loop_monitor import LoopMonitor
+from common.metrics import install_metrics, mark_process_dead
+from common.profiling import install_profiling
+from common.tracing import install_tracing
+from db.instrumentation import install_query_stats, query_stats
+from db.leaks import install_leak_detector
 from db.models import Profile
+from db.pool import pool_stats
+from db.session import mark_write, ping
 from .config import get_settings
-from .dependencies import get_current_user, get_db_session
+from .dependencies import get_current_user, get_db_session, get_read_db_session
 from .logging_config import configure_logging
 from .schemas import ProfileResponse, ProfileUpdateRequest
 
@@ -17,11 +28,22 @@ configure_logging()
 settings = get_settings()
 logger = logging.getLogger(settings.app_name)
 
+readiness = ReadinessMonitor()
+readiness.add_check("db", ping)
+readiness.add_http_check("auth", settings.auth_health_url)
+loop_monitor = LoopMonitor()
+
 app = FastAPI(
     title="Profile Service",
     version="0.1.0",
     description="Каркас сервиса профилей.",
 )
+install_profiling(app)
+install_leak_detector(app)
+install_query_stats(app)
+install_metrics(app)
+install_tracing(app, settings.app_name)
+install_request_id(app)
 
 
 @app.get("/health/live")
@@ -30,10 +52,34 @@ async def health_live() -> Dict[str, str]:
 
 
 @app.get("/health/ready")
-async def health_ready() -> Dict[str, str]:
+async def health_ready() -> JSONResponse:
+    ready, body = readiness.status()
+    status_code = status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(body, status_code=status_code)
+
+
+@app.post("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_drain() -> Dict[str, str]:
+    await readiness.drain()
+    return {"status": "draining"}
+
+
+@app.delete("/health/drain", dependencies=[Depends(require_loopback)])
+async def health_undrain() -> Dict[str, str]:
+    readiness.undrain()
     return {"status": "ready"}
 
 
+@app.get("/metrics/db-pool")
+async def metrics_db_pool() -> Dict[str, list]:
+    return {"pools": pool_stats()}
+
+
+@app.get("/metrics/db-queries")
+async def metrics_db_queries() -> Dict[str, dict]:
+    return {"routes": query_stats()}
+
+
 @app.on_event("startup")
 async def on_startup() -> None:
     logger.info(
@@ -43,28 +89,38 @@ async def on_startup() -> None:
         settings.port,
         settings.database_url,
     )
+    await readiness.start()
+    await loop_monitor.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await loop_monitor.stop()
+    await readiness.stop()
+    mark_process_dead()
     logger.info("Сервис %s завершает работу", settings.app_name)
 
 
 @app.get("/profile/me", response_model=ProfileResponse)
 async def get_my_profile(
+    response: Response,
     current_user: dict = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
     session: AsyncSession = Depends(get_db_session),
 ) -> ProfileResponse:
     try:
         stmt = select(Profile).where(Profile.user_id == current_user["user_id"])
-        result = await session.execute(stmt)
+        result = await read_session.execute(stmt)
         profile: Profile | None = result.scalar_one_or_none()
 
         if profile is None:
+            # профиль создается при первом чтении — это запись, она идет на primary
+            await read_session.rollback()
             profile = Profile(user_id=current_user["user_id"])
             session.add(profile)
             await session.commit()
             await session.refresh(profile)
+            mark_write(current_user["user_id"], response)
 
         return ProfileResponse(
             user_id=str(profile.user_id),
@@ -88,6 +144,7 @@ async def get_my_profile(
 @app.put("/profile/me", response_model=ProfileResponse)
 async def update_my_profile(
     payload: ProfileUpdateRequest,
+    response: Response,
     current_user: dict = Depends(get_current_user),
     session: AsyncSession = Depends(get_db_session),
 ) -> ProfileResponse:
@@ -114,6 +171,7 @@ async def update_my_profile(
         try:
             await session.execute(stmt_update)
             await session.commit()
+            mark_write(current_user["user_id"], response)
         except IntegrityError:
             await session.rollback()
             raise HTTPException(
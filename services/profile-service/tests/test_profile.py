@@ -9,6 +9,7 @@ from typing import AsyncGenerator
 
 import pytest
 import respx
+from fastapi import HTTPException, Request
 from fastapi.testclient import TestClient
 from httpx import Response
 from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
@@ -20,8 +21,11 @@ for p in (ROOT_DIR, SERVICE_DIR):
         sys.path.insert(0, str(p))
 
 import db.session as db_session  # noqa: E402
+from common.health import ReadinessMonitor, require_loopback  # noqa: E402
+from common.identity import sign_identity  # noqa: E402
 from db.models import Base  # noqa: E402
-from app.main import app  # noqa: E402
+from app.config import get_settings  # noqa: E402
+from app.main import app, readiness  # noqa: E402
 
 
 @asynccontextmanager
@@ -111,3 +115,92 @@ def test_unauthorized(client: tuple[TestClient, respx.Router]) -> None:
 
     resp = test_client.get("/profile/me", headers={"Authorization": "Bearer token"})
     assert resp.status_code == 401
+
+
+def test_readiness_monitor_caches_checks() -> None:
+    """Проверки выполняются только в refresh(), status() отдает кэш; drain — сразу не готов."""
+    calls = {"db": 0}
+
+    async def db_ok() -> None:
+        calls["db"] += 1
+
+    async def auth_hangs() -> None:
+        await asyncio.sleep(10)
+
+    monitor = ReadinessMonitor(interval=60, timeout=0.05)
+    monitor.add_check("db", db_ok)
+    monitor.add_check("auth", auth_hangs)
+    assert monitor.status() == (False, {"status": "starting"})
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(monitor.refresh())
+    for _ in range(5):
+        ready, body = monitor.status()
+    assert calls["db"] == 1
+    assert not ready
+    assert body["checks"] == {"db": "ok", "auth": "error: TimeoutError"}
+
+    loop.run_until_complete(monitor.drain(0))
+    assert monitor.status() == (False, {"status": "draining"})
+
+
+def test_drain_only_from_localhost(client: tuple[TestClient, respx.Router]) -> None:
+    """drain — POST только с localhost; GET и запросы с других адресов не выводят под из балансировки."""
+    test_client, _ = client
+    assert test_client.get("/health/drain").status_code == 405
+    assert test_client.post("/health/drain").status_code == 403
+    assert test_client.delete("/health/drain").status_code == 403
+    assert not readiness.draining
+
+    def request_from(host: str) -> Request:
+        return Request({"type": "http", "method": "POST", "path": "/health/drain", "headers": [], "client": (host, 4321)})
+
+    for host in ("127.0.0.1", "::1"):
+        require_loopback(request_from(host))
+    for host in ("10.0.3.7", "localhost.evil"):
+        with pytest.raises(HTTPException):
+            require_loopback(request_from(host))
+
+    monitor = ReadinessMonitor()
+    asyncio.get_event_loop().run_until_complete(monitor.drain(0))
+    monitor.undrain()
+    assert not monitor.draining
+
+
+def test_ready_reports_dependencies(client: tuple[TestClient, respx.Router]) -> None:
+    """/health/ready отражает БД и доступность auth-service (без мока — недоступен)."""
+    test_client, _ = client
+    resp = test_client.get("/health/ready")
+    assert resp.status_code == 503
+    assert resp.json()["checks"]["db"] == "ok"
+    assert resp.json()["checks"]["auth"].startswith("error")
+
+
+def test_internal_identity_skips_auth_validate(
+    client: tuple[TestClient, respx.Router], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Подписанный web-frontend X-Internal-Identity принимается без вызова auth-service."""
+    test_client, router = client
+    monkeypatch.setattr(get_settings(), "internal_identity_secret", "identity-secret")
+    user_id = str(uuid.uuid4())
+    validate = router.get("http://auth-service:8001/auth/validate").mock(
+        return_value=Response(status_code=401, json={"detail": "invalid"}),
+    )
+    # маршрут с тем же URL общий для всех тестов модуля
+    calls_before = validate.call_count
+
+    identity = sign_identity(user_id, "dora", "identity-secret", ttl_seconds=30)
+    resp = test_client.get("/profile/me", headers={"X-Internal-Identity": identity})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["user_id"] == user_id
+    assert validate.call_count == calls_before
+
+    # подделанная или просроченная подпись не принимается: остается обычная проверка токена
+    forged = sign_identity(user_id, "dora", "other-secret", ttl_seconds=30)
+    expired = sign_identity(user_id, "dora", "identity-secret", ttl_seconds=-1)
+    for value in (forged, expired):
+        resp = test_client.get(
+            "/profile/me", headers={"X-Internal-Identity": value, "Authorization": "Bearer token"}
+        )
+        assert resp.status_code == 401
+    assert validate.call_count == calls_before + 2
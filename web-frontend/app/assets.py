@@ -0,0 +1,183 @@
+"""
+Статические файлы SPA из памяти процесса.
+
+Файлы из static/ читаются один раз при старте и сразу сжимаются gzip и,
+если установлен пакет brotli, br; клиенту отдается самый компактный вариант,
+который он принимает по Accept-Encoding. Каждый вариант получает свой ETag,
+ответы отдаются с Last-Modified и 304 на If-None-Match / If-Modified-Since.
+
+Файлы с отпечатком содержимого в имени (app.3f2a9c1b.js) не меняются по
+тому же адресу и кэшируются браузером на год (immutable); остальные, включая
+index.html, браузер перепроверяет при каждом обращении (no-cache).
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен
+    brotli = None
+
+logger = logging.getLogger("static")
+
+# имя с отпечатком: хотя бы 8 шестнадцатеричных символов между точками
+FINGERPRINT = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# форматы, которые уже сжаты: повторное сжатие только тратит CPU клиента
+COMPRESSED_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp", "font/woff", "font/woff2")
+# меньше этого сжатие не окупает заголовок Content-Encoding
+MIN_COMPRESS_SIZE = 256
+# сжатый вариант хранится, если он хотя бы на 10% меньше исходного
+MAX_COMPRESSED_RATIO = 0.9
+
+
+@dataclass
+class StaticAsset:
+    """Файл и его сжатые варианты: кодировка -> (тело, ETag)."""
+
+    media_type: str
+    last_modified: str
+    mtime: int
+    cache_control: str
+    variants: Dict[str, Tuple[bytes, str]] = field(default_factory=dict)
+
+
+def _etag(body: bytes, encoding: str) -> str:
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+
+
+def _compressed(body: bytes) -> Dict[str, bytes]:
+    gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+    # содержимое, которое почти не сжимается, отдается как есть: brotli на нем только тратит время старта
+    if len(gzipped) > len(body) * MAX_COMPRESSED_RATIO:
+        return {}
+    variants = {"gzip": gzipped}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+
+def load_asset(path: Path, name: str) -> StaticAsset:
+    body = path.read_bytes()
+    mtime = int(path.stat().st_mtime)
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    asset = StaticAsset(
+        media_type=media_type,
+        last_modified=formatdate(mtime, usegmt=True),
+        mtime=mtime,
+        cache_control=IMMUTABLE_CACHE if FINGERPRINT.search(name) else REVALIDATE_CACHE,
+    )
+    asset.variants["identity"] = (body, _etag(body, "identity"))
+    if len(body) >= MIN_COMPRESS_SIZE and not media_type.startswith(COMPRESSED_TYPES):
+        for encoding, data in _compressed(body).items():
+            asset.variants[encoding] = (data, _etag(body, encoding))
+    return asset
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Кодировки из Accept-Encoding с их q; identity допустима, если не запрещена явно."""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    if "*" in accepted:
+        for coding in ("br", "gzip", "identity"):
+            accepted.setdefault(coding, accepted["*"])
+    accepted.setdefault("identity", 1.0)
+    return accepted
+
+
+def _not_modified(request: Request, etag: str, asset: StaticAsset) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return asset.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class StaticAssets:
+    """
+    Все файлы каталога в памяти: относительный путь -> StaticAsset.
+
+    Если нет какого-либо из файлов required, поднимается RuntimeError: без них
+    процесс не стартует, а не отвечает 500 на каждый запрос.
+    """
+
+    def __init__(self, directory: Path, required: Tuple[str, ...] = ()) -> None:
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        for path in sorted(directory.rglob("*")):
+            if path.is_file():
+                name = path.relative_to(directory).as_posix()
+                self.assets[name] = load_asset(path, name)
+        missing = [name for name in required if name not in self.assets]
+        if missing:
+            raise RuntimeError(f"В {directory} нет обязательных файлов: {', '.join(missing)}")
+        logger.info(
+            "Статика загружена в память: %d файлов, кодировки %s",
+            len(self.assets),
+            "br, gzip" if brotli is not None else "gzip",
+        )
+
+    def get(self, name: str) -> Optional[StaticAsset]:
+        return self.assets.get(name)
+
+    def response(self, request: Request, asset: StaticAsset) -> Response:
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        # самый короткий вариант из принятых клиентом (q > 0)
+        candidates: List[Tuple[int, str]] = [
+            (len(body), encoding)
+            for encoding, (body, _) in asset.variants.items()
+            if accepted.get(encoding, 0.0) > 0
+        ]
+        if not candidates:
+            return Response(status_code=406)
+        encoding = min(candidates)[1]
+        body, etag = asset.variants[encoding]
+        headers = {
+            "etag": etag,
+            "last-modified": asset.last_modified,
+            "cache-control": asset.cache_control,
+        }
+        if len(asset.variants) > 1:
+            headers["vary"] = "Accept-Encoding"
+        if _not_modified(request, etag, asset):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["content-encoding"] = encoding
+        content = b"" if request.method == "HEAD" else body
+        response = Response(content, media_type=asset.media_type, headers=headers)
+        if request.method == "HEAD":
+            response.headers["content-length"] = str(len(body))
+        return response
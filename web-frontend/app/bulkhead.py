@@ -0,0 +1,161 @@
+"""
+Изоляция сервисов за шлюзом (bulkhead) и автомат отключения (circuit breaker).
+
+У каждого сервиса (auth, profile, finance) свой лимит одновременных
+запросов, свое время ожидания места в очереди и свои таймауты соединения и
+чтения. Медленный finance-service занимает только свои места и не мешает
+входу через auth-service.
+
+Автомат: после CIRCUIT_FAILURE_THRESHOLD ошибок подряд (сетевая ошибка,
+таймаут, ответ 5xx) сервис считается недоступным и запросы к нему сразу
+получают 503 на CIRCUIT_RESET_SECONDS; затем пропускается один пробный
+запрос, и по его результату автомат замыкается или снова размыкается.
+Результаты запросов, начатых до размыкания и завершившихся позже, пока
+автомат не замкнут, не учитываются: решает только пробный запрос.
+Состояние — метрика gateway_upstream_circuit_state{upstream}
+(0 — замкнут, 1 — пробный запрос, 2 — разомкнут).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Callable
+
+import httpx
+from fastapi import HTTPException, status
+from prometheus_client import Counter, Gauge
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+CIRCUIT_STATE = Gauge(
+    "gateway_upstream_circuit_state",
+    "Состояние автомата сервиса: 0 — замкнут, 1 — пробный запрос, 2 — разомкнут",
+    ["upstream"],
+)
+IN_FLIGHT = Gauge(
+    "gateway_upstream_in_flight",
+    "Выполняющиеся запросы шлюза к сервису",
+    ["upstream"],
+)
+REJECTED = Counter(
+    "gateway_upstream_rejected_total",
+    "Запросы, отклоненные шлюзом без обращения к сервису",
+    ["upstream", "reason"],
+)
+
+logger = logging.getLogger("bulkhead")
+
+
+class Bulkhead:
+    """Лимит одновременных запросов, таймауты и автомат отключения одного сервиса."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        queue_timeout: float,
+        connect_timeout: float,
+        read_timeout: float,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.queue_timeout = queue_timeout
+        # запись и ожидание соединения из пула ограничены тем же временем, что и чтение
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        CIRCUIT_STATE.labels(name).set(CLOSED)
+
+    @property
+    def state(self) -> str:
+        return STATE_NAMES[self._state]
+
+    async def acquire(self) -> bool:
+        """
+        Занимает место для запроса к сервису или отклоняет его с 503.
+
+        Возвращает True, если запрос пробный (после паузы разомкнутого автомата):
+        это значение передается в release().
+        """
+        probe = self._admit()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(probe)
+            raise
+        except asyncio.TimeoutError:
+            self._abandon(probe)
+            REJECTED.labels(self.name, "queue_timeout").inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис перегружен, повторите позже",
+            )
+        IN_FLIGHT.labels(self.name).inc()
+        return probe
+
+    def release(self, probe: bool = False) -> None:
+        self._abandon(probe)
+        IN_FLIGHT.labels(self.name).dec()
+        self._slots.release()
+
+    def record_success(self, probe: bool = False) -> None:
+        """Успешный ответ сервиса; probe — значение, полученное от acquire()."""
+        if self._state != CLOSED and not probe:
+            return
+        if self._state != CLOSED:
+            logger.info("Сервис %s снова доступен", self.name)
+        self._failures = 0
+        self._set_state(CLOSED)
+
+    def record_failure(self, probe: bool = False) -> None:
+        """Ошибка запроса к сервису; probe — значение, полученное от acquire()."""
+        if self._state != CLOSED and not probe:
+            # запрос, начатый до размыкания, не продлевает паузу
+            return
+        self._failures += 1
+        if probe or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                logger.warning(
+                    "Сервис %s недоступен (%d ошибок подряд), запросы отклоняются %.0f с",
+                    self.name,
+                    self._failures,
+                    self.reset_seconds,
+                )
+            self._opened_at = self._clock()
+            self._set_state(OPEN)
+
+    def _admit(self) -> bool:
+        if self._state == CLOSED:
+            return False
+        remaining = self._opened_at + self.reset_seconds - self._clock()
+        if self._state == OPEN and remaining <= 0:
+            self._set_state(HALF_OPEN)
+        if self._state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        REJECTED.labels(self.name, "circuit_open").inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис временно недоступен",
+            headers={"Retry-After": str(max(1, math.ceil(remaining)))},
+        )
+
+    def _abandon(self, probe: bool) -> None:
+        # пробный запрос, оборванный без результата, не должен оставить автомат в ожидании
+        if probe:
+            self._probing = False
+
+    def _set_state(self, state: int) -> None:
+        self._state = state
+        CIRCUIT_STATE.labels(self.name).set(state)
@@ -0,0 +1,143 @@
+"""
+Кэш ответов шлюза на GET-запросы пользователя.
+
+SPA при перезагрузке и переключении вкладок заново запрашивает профиль и
+статистику, которые почти никогда не успевают измениться. Ответы сервисов
+хранятся в памяти процесса по ключу (пользователь, URL со строкой запроса)
+RESPONSE_CACHE_TTL_SECONDS секунд; общий объем тел ограничен
+RESPONSE_CACHE_MAX_BYTES, при переполнении вытесняются давно не читанные.
+
+Изменяющие запросы пользователя через этот же процесс сбрасывают его записи;
+изменения через другие реплики видны не позже чем через TTL.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from prometheus_client import Counter
+
+CACHE_REQUESTS = Counter(
+    "gateway_cache_requests_total",
+    "Запросы к кэшу ответов шлюза",
+    ["result"],
+)
+
+# сколько последних сбросов помнить для защиты от записи устаревших ответов
+INVALIDATIONS_KEPT = 10000
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли If-None-Match с ETag (слабое сравнение, RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+@dataclass
+class CachedResponse:
+    """Ответ сервиса: статус, заголовки для клиента, тело и его ETag."""
+
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    expires_at: float = 0.0
+
+
+class ResponseCache:
+    """
+    LRU по записям с ограничением суммарного размера тел и индексом по пользователям.
+
+    Не потокобезопасен: рассчитан на использование из одного event loop.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int, max_body_bytes: int) -> None:
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_body_bytes = max_body_bytes
+        self._entries: OrderedDict[Tuple[str, str], CachedResponse] = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        # время последнего сброса по пользователю: ответ, запрошенный раньше, не кэшируется
+        self._invalidated: OrderedDict[str, float] = OrderedDict()
+        self._size = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def now() -> float:
+        return time.monotonic()
+
+    def get(self, user_id: str, url: str) -> Optional[CachedResponse]:
+        key = (user_id, url)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.now():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, user_id: str, url: str, entry: CachedResponse, requested_at: float) -> bool:
+        """
+        Сохраняет ответ, запрошенный в момент requested_at (ResponseCache.now()).
+
+        Ответ не сохраняется, если тело слишком большое или после requested_at
+        записи пользователя сбрасывались: сервис мог ответить до изменения.
+        """
+        if len(entry.body) > self.max_body_bytes or self._invalidated.get(user_id, 0.0) >= requested_at:
+            return False
+        key = (user_id, url)
+        self._remove(key)
+        entry.expires_at = self.now() + self.ttl
+        self._entries[key] = entry
+        self._by_user.setdefault(user_id, set()).add(url)
+        self._size += len(entry.body)
+        while self._size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+        return True
+
+    def invalidate(self, user_id: str) -> None:
+        """Сбрасывает все записи пользователя."""
+        self._invalidated[user_id] = self.now()
+        self._invalidated.move_to_end(user_id)
+        while len(self._invalidated) > INVALIDATIONS_KEPT:
+            self._invalidated.popitem(last=False)
+        for url in self._by_user.pop(user_id, ()):
+            entry = self._entries.pop((user_id, url), None)
+            if entry is not None:
+                self._size -= len(entry.body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_user.clear()
+        self._invalidated.clear()
+        self._size = 0
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry.body)
+        user_id, url = key
+        urls = self._by_user.get(user_id)
+        if urls is not None:
+            urls.discard(url)
+            if not urls:
+                del self._by_user[user_id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
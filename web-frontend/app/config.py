@@ -13,8 +13,40 @@ class Settings(BaseSettings):
     auth_base_url: str = Field("http://auth-service:8001", env="AUTH_BASE_URL")
     profile_base_url: str = Field("http://profile-service:8002", env="PROFILE_BASE_URL")
     finance_base_url: str = Field("http://finance-service:8003", env="FINANCE_BASE_URL")
+    proxy_max_connections: int = Field(100, env="PROXY_MAX_CONNECTIONS")
+    # тело POST/PUT/PATCH читается целиком до обращения к сервису: предел размера и времени
+    proxy_max_body_bytes: int = Field(1024 * 1024, env="PROXY_MAX_BODY_BYTES")
+    proxy_body_timeout_seconds: float = Field(10.0, env="PROXY_BODY_TIMEOUT_SECONDS")
+    # изоляция сервисов: одновременные запросы, ожидание места, таймауты соединения и чтения
+    auth_max_concurrency: int = Field(30, env="AUTH_MAX_CONCURRENCY")
+    auth_queue_timeout_seconds: float = Field(1.0, env="AUTH_QUEUE_TIMEOUT_SECONDS")
+    auth_connect_timeout_seconds: float = Field(2.0, env="AUTH_CONNECT_TIMEOUT_SECONDS")
+    auth_read_timeout_seconds: float = Field(5.0, env="AUTH_READ_TIMEOUT_SECONDS")
+    profile_max_concurrency: int = Field(30, env="PROFILE_MAX_CONCURRENCY")
+    profile_queue_timeout_seconds: float = Field(1.0, env="PROFILE_QUEUE_TIMEOUT_SECONDS")
+    profile_connect_timeout_seconds: float = Field(2.0, env="PROFILE_CONNECT_TIMEOUT_SECONDS")
+    profile_read_timeout_seconds: float = Field(5.0, env="PROFILE_READ_TIMEOUT_SECONDS")
+    finance_max_concurrency: int = Field(40, env="FINANCE_MAX_CONCURRENCY")
+    finance_queue_timeout_seconds: float = Field(1.0, env="FINANCE_QUEUE_TIMEOUT_SECONDS")
+    finance_connect_timeout_seconds: float = Field(2.0, env="FINANCE_CONNECT_TIMEOUT_SECONDS")
+    finance_read_timeout_seconds: float = Field(10.0, env="FINANCE_READ_TIMEOUT_SECONDS")
+    # автомат отключения: ошибок подряд до размыкания и пауза до пробного запроса
+    circuit_failure_threshold: int = Field(5, env="CIRCUIT_FAILURE_THRESHOLD")
+    circuit_reset_seconds: float = Field(10.0, env="CIRCUIT_RESET_SECONDS")
+    # проверка JWT на входе и подписанная личность для profile/finance (оба секрета должны быть заданы)
+    jwt_secret: str = Field("", env="JWT_SECRET")
+    internal_identity_secret: str = Field("", env="INTERNAL_IDENTITY_SECRET")
+    internal_identity_ttl_seconds: int = Field(30, env="INTERNAL_IDENTITY_TTL_SECONDS")
+    # кэш GET-ответов по пользователю (нужен JWT_SECRET); TTL 0 — выключен
+    response_cache_ttl_seconds: float = Field(10.0, env="RESPONSE_CACHE_TTL_SECONDS")
+    response_cache_max_bytes: int = Field(32 * 1024 * 1024, env="RESPONSE_CACHE_MAX_BYTES")
+    response_cache_max_body_bytes: int = Field(256 * 1024, env="RESPONSE_CACHE_MAX_BODY_BYTES")
+    # /api/dashboard: сколько ждать каждую часть, прежде чем отдать ответ без нее
+    dashboard_part_timeout_seconds: float = Field(3.0, env="DASHBOARD_PART_TIMEOUT_SECONDS")
 
     log_level: str = Field("INFO", env="LOG_LEVEL")
+    log_json: bool = Field(True, env="LOG_JSON")
+    log_sampling: str = Field("", env="LOG_SAMPLING")
 
     login_title: str = Field("Вход в систему", env="LOGIN_TITLE")
     register_title: str = Field("Создайте аккаунт", env="REGISTER_TITLE")
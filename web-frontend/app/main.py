@@ -1,15 +1,29 @@
 ﻿from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import logging
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import httpx
-from fastapi import FastAPI, HTTPException, Request, Response, status
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-
+import jwt
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+from common.identity import IDENTITY_HEADER, sign_identity
+from common.logs import correlation_headers, install_request_id, setup_logging
+from common.loop_monitor import LoopMonitor
+from common.metrics import install_metrics, mark_process_dead
+from common.profiling import install_profiling
+from common.tracing import install_tracing, span
+from .assets import StaticAssets
+from .bulkhead import Bulkhead
+from .cache import CACHE_REQUESTS, CachedResponse, ResponseCache, etag_matches, make_etag
 from .config import get_settings
+from .singleflight import SingleFlight
 
 settings = get_settings()
 
@@ -17,46 +31,398 @@ def _resolve_log_level(value: str) -> int:
     level_name = (value or "INFO").upper()
     return logging._nameToLevel.get(level_name, logging.INFO)
 
-logging.basicConfig(
+setup_logging(
     level=_resolve_log_level(settings.log_level),
-    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+    fmt="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+    json_format=settings.log_json,
+    sampling=settings.log_sampling,
 )
 logger = logging.getLogger(settings.app_name)
+loop_monitor = LoopMonitor()
 
 app = FastAPI(title="Web Frontend", description="SPA для Autoexam", version="0.1.0")
+install_profiling(app)
+install_metrics(app)
+install_tracing(app, settings.app_name, trace_db=False)
+install_request_id(app)
 
 static_dir = Path(__file__).resolve().parent.parent / "static"
-app.mount("/static", StaticFiles(directory=static_dir, html=True), name="static")
+# статика целиком в памяти, сжатая при старте; без index.html шлюз не запускается
+static_assets = StaticAssets(static_dir, required=("index.html",))
+
 
+@app.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_file(path: str, request: Request) -> Response:
+    asset = static_assets.get(path or "index.html")
+    if asset is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return static_assets.response(request, asset)
 
-def _frontend_index() -> FileResponse:
-    return FileResponse(static_dir / "index.html")
 
+def _frontend_index(request: Request) -> Response:
+    return static_assets.response(request, static_assets.assets["index.html"])
 
-def _auth_header(request: Request) -> Dict[str, str]:
-    auth = request.headers.get("Authorization")
-    return {"Authorization": auth} if auth else {}
 
+# заголовки запроса клиента, которые передаются сервисам как есть
+FORWARDED_REQUEST_HEADERS = (
+    "authorization",
+    # last_write: время последней записи для read-your-writes на репликах БД
+    "cookie",
+    "content-type",
+    "content-length",
+    "accept",
+    "accept-encoding",
+    "if-none-match",
+    "if-modified-since",
+)
+# заголовки ответа сервиса, которые не передаются клиенту: hop-by-hop (RFC 9110, 7.6.1)
+# и те, что шлюз выставляет сам (uvicorn, RequestIdMiddleware, TracingMiddleware)
+SKIPPED_RESPONSE_HEADERS = frozenset(
+    (
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailer",
+        "transfer-encoding",
+        "upgrade",
+        "date",
+        "server",
+        "x-request-id",
+        "x-trace-id",
+    )
+)
 
-async def _proxy(
-    method: str,
-    url: str,
-    request: Request,
-    json_body: Any = None,
-    params: Dict[str, Any] | None = None,
-) -> Response:
-    headers = _auth_header(request)
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            resp = await client.request(method, url, headers=headers, json=json_body, params=params)
-        except httpx.HTTPError as exc:
-            logger.error("Ошибка запроса к %s: %s", url, exc)
-            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Сервис временно недоступен")
+# ответы из кэша шлюза браузер должен перепроверять (If-None-Match) и не отдавать чужим
+CACHE_HEADERS = ((b"cache-control", b"private, no-cache"), (b"vary", b"Authorization"))
 
-    content_type = resp.headers.get("content-type", "")
-    if "application/json" in content_type:
-        return JSONResponse(status_code=resp.status_code, content=resp.json())
-    return Response(status_code=resp.status_code, content=resp.content, media_type=content_type)
+http_client: httpx.AsyncClient | None = None
+response_cache = ResponseCache(
+    settings.response_cache_ttl_seconds, settings.response_cache_max_bytes, settings.response_cache_max_body_bytes
+)
+bulkheads = {
+    name: Bulkhead(
+        name,
+        max_concurrency=getattr(settings, f"{name}_max_concurrency"),
+        queue_timeout=getattr(settings, f"{name}_queue_timeout_seconds"),
+        connect_timeout=getattr(settings, f"{name}_connect_timeout_seconds"),
+        read_timeout=getattr(settings, f"{name}_read_timeout_seconds"),
+        failure_threshold=settings.circuit_failure_threshold,
+        reset_seconds=settings.circuit_reset_seconds,
+    )
+    for name in ("auth", "profile", "finance")
+}
+# выполняющиеся GET к сервисам: (пользователь, метод, URL) -> (ответ, сохранен ли в кэше)
+upstream_gets: SingleFlight[Tuple[str, str, str], Tuple[CachedResponse, bool]] = SingleFlight()
+
+
+def _bulkhead(url: str) -> Bulkhead:
+    """Изоляция сервиса, к которому идет запрос, по его базовому адресу."""
+    for name, bulkhead in bulkheads.items():
+        if url.startswith(getattr(settings, f"{name}_base_url")):
+            return bulkhead
+    raise ValueError(f"Неизвестный сервис: {url}")
+
+
+def _forward_headers(request: Request) -> Dict[str, str]:
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS if name in request.headers}
+    return correlation_headers(headers)
+
+
+def _verified_claims(request: Request) -> Optional[Dict[str, Any]]:
+    """
+    Проверяет JWT локально (HS256, общий JWT_SECRET) и возвращает его claims.
+
+    None — проверка на входе выключена или токена нет (сервис сам ответит 401);
+    недействительный токен отклоняется здесь, не доходя до сервисов.
+    """
+    if not (settings.jwt_secret and settings.internal_identity_secret):
+        return None
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        claims = jwt.decode(token, settings.jwt_secret, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        claims = {}
+    if not claims.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Недействительный или истекший токен",
+        )
+    return claims
+
+
+def _identity_headers(claims: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Подписанная личность для сервиса (X-Internal-Identity)."""
+    if claims is None:
+        return {}
+    value = sign_identity(
+        claims["sub"], claims.get("username"), settings.internal_identity_secret, settings.internal_identity_ttl_seconds
+    )
+    return {IDENTITY_HEADER: value}
+
+
+def _response_headers(resp: httpx.Response) -> List[Tuple[bytes, bytes]]:
+    # raw_headers, а не dict: повторяющиеся заголовки (set-cookie) сохраняются
+    return [
+        (name.encode("latin-1"), value.encode("latin-1"))
+        for name, value in resp.headers.multi_items()
+        if name not in SKIPPED_RESPONSE_HEADERS
+    ]
+
+
+async def _proxy(method: str, url: str, request: Request, identity: bool = False) -> Response:
+    """
+    Потоковая передача запроса сервису и его ответа клиенту.
+
+    Тело запроса и байты ответа (включая сжатые) передаются без разбора,
+    поэтому память шлюза не зависит от размера ответа. Тело запроса
+    читается до того, как занять место у сервиса (см. _read_body):
+    медленно отправляющий клиент не держит место. Строка запроса
+    передается целиком. identity=True — запрос к profile/finance с
+    проверкой токена на входе (X-Internal-Identity); изменяющий запрос
+    сбрасывает кэш ответов пользователя.
+    """
+    claims = _verified_claims(request) if identity else None
+    headers = _identity_headers(claims)
+    content = await _read_body(request) if method in ("POST", "PUT", "PATCH") else None
+    bulkhead = _bulkhead(url)
+    probe = await bulkhead.acquire()
+    try:
+        with span(f"{method} {url}"):
+            headers.update(_forward_headers(request))
+            upstream_request = http_client.build_request(
+                method,
+                url,
+                params=request.url.query or None,
+                headers=headers,
+                content=content,
+                timeout=bulkhead.timeout,
+            )
+            resp = await http_client.send(upstream_request, stream=True)
+    except httpx.HTTPError as exc:
+        bulkhead.record_failure(probe)
+        bulkhead.release(probe)
+        logger.error("Ошибка запроса к %s: %s", url, exc)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Сервис временно недоступен")
+    except BaseException:
+        bulkhead.release(probe)
+        raise
+    finally:
+        if identity and method != "GET":
+            # сервис мог применить изменение, даже если ответ до шлюза не дошел
+            _invalidate_user(_flight_user(request, claims))
+    _record_status(bulkhead, resp.status_code, probe)
+
+    # место у сервиса занято, пока тело ответа не передано или передача не оборвалась
+    released = False
+
+    async def finish() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            bulkhead.release(probe)
+            await resp.aclose()
+
+    response = StreamingResponse(
+        _stream_body(resp, url, bulkhead, probe, finish), status_code=resp.status_code, background=BackgroundTask(finish)
+    )
+    response.raw_headers = _response_headers(resp)
+    return response
+
+
+def _flight_user(request: Request, claims: Optional[Dict[str, Any]]) -> str:
+    """
+    Чей запрос: sub проверенного токена, а без проверки токена шлюзом — хэш
+    заголовка Authorization (запросы с разными токенами не объединяются).
+    """
+    if claims is not None:
+        return claims["sub"]
+    digest = hashlib.sha256(request.headers.get("authorization", "").encode()).hexdigest()
+    return f"authorization:{digest}"
+
+
+async def _read_body(request: Request) -> bytes:
+    """
+    Тело запроса клиента целиком: не больше PROXY_MAX_BODY_BYTES (иначе 413)
+    и не дольше PROXY_BODY_TIMEOUT_SECONDS (иначе 408).
+    """
+    limit = settings.proxy_max_body_bytes
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Слишком большой запрос")
+    chunks: List[bytes] = []
+    size = 0
+
+    async def read() -> None:
+        nonlocal size
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Слишком большой запрос"
+                )
+            chunks.append(chunk)
+
+    try:
+        await asyncio.wait_for(read(), settings.proxy_body_timeout_seconds)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=status.HTTP_408_REQUEST_TIMEOUT, detail="Тело запроса не получено вовремя")
+    return b"".join(chunks)
+
+
+def _invalidate_user(user_id: str) -> None:
+    """Сбрасывает кэш пользователя; GET, начатые до изменения, больше не объединяются с новыми."""
+    response_cache.invalidate(user_id)
+    upstream_gets.forget(lambda key: key[0] == user_id)
+
+
+def _record_status(bulkhead: Bulkhead, status_code: int, probe: bool) -> None:
+    if status_code >= 500:
+        bulkhead.record_failure(probe)
+    else:
+        bulkhead.record_success(probe)
+
+
+def _cached_response(entry: CachedResponse, request: Request, result: str) -> Response:
+    CACHE_REQUESTS.labels(result).inc()
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        response.raw_headers = [(b"etag", entry.etag.encode()), *CACHE_HEADERS]
+        return response
+    response = Response(content=entry.body, status_code=entry.status_code)
+    response.raw_headers = [
+        *entry.headers,
+        (b"content-length", str(len(entry.body)).encode()),
+        (b"etag", entry.etag.encode()),
+        *CACHE_HEADERS,
+    ]
+    return response
+
+
+async def _cached_get(url: str, request: Request) -> Response:
+    """
+    GET к profile/finance через кэш ответов пользователя.
+
+    Кэшируются только ответы 200 без Set-Cookie и Cache-Control: no-store.
+    Шлюз сам ставит ETag (хэш тела) и отвечает 304 на совпавший If-None-Match,
+    в том числе для ответов из кэша; Cache-Control: private, no-cache
+    заставляет браузер перепроверять ответ при каждом обращении.
+    """
+    claims = _verified_claims(request)
+    entry, result = await _upstream_get(url, request.url.query, request, claims)
+    if result != "bypass":
+        return _cached_response(entry, request, result)
+    CACHE_REQUESTS.labels("bypass").inc()
+    response = Response(content=entry.body, status_code=entry.status_code)
+    response.raw_headers = [*entry.headers, (b"content-length", str(len(entry.body)).encode())]
+    return response
+
+
+async def _upstream_get(
+    url: str, query: str, request: Request, claims: Optional[Dict[str, Any]]
+) -> Tuple[CachedResponse, str]:
+    """
+    Ответ сервиса на GET и откуда он: hit — из кэша, miss — получен и сохранен,
+    bypass — получен, но не кэшируется.
+
+    Одновременные одинаковые запросы пользователя (метод и URL) объединяются
+    в один запрос к сервису, ответ или ошибку получают все. Без проверенного
+    токена (claims=None) ответы не кэшируются, а пользователя определяет
+    заголовок Authorization (см. _flight_user).
+    """
+    key = f"{url}?{query}"
+    user_id = _flight_user(request, claims)
+    if claims is not None and response_cache.enabled:
+        entry = response_cache.get(user_id, key)
+        if entry is not None:
+            return entry, "hit"
+    entry, stored = await upstream_gets.do(
+        (user_id, "GET", key), lambda: _fetch(url, query, request, claims, key)
+    )
+    return entry, "miss" if stored else "bypass"
+
+
+async def _fetch(
+    url: str, query: str, request: Request, claims: Optional[Dict[str, Any]], key: str
+) -> Tuple[CachedResponse, bool]:
+    """Ответ сервиса целиком и признак того, что он сохранен в кэше."""
+    requested_at = response_cache.now()
+    headers = _identity_headers(claims)
+    # тело кэшируется без сжатия, а условные заголовки обрабатывает сам шлюз
+    headers.update(
+        (name, value)
+        for name, value in _forward_headers(request).items()
+        if name not in ("content-type", "content-length", "accept-encoding", "if-none-match", "if-modified-since")
+    )
+    headers["accept-encoding"] = "identity"
+    bulkhead = _bulkhead(url)
+    probe = await bulkhead.acquire()
+    try:
+        with span(f"GET {url}"):
+            resp = await http_client.get(url, params=query or None, headers=headers, timeout=bulkhead.timeout)
+    except httpx.HTTPError as exc:
+        bulkhead.record_failure(probe)
+        logger.error("Ошибка запроса к %s: %s", url, exc)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Сервис временно недоступен")
+    finally:
+        bulkhead.release(probe)
+    _record_status(bulkhead, resp.status_code, probe)
+
+    entry = CachedResponse(
+        status_code=resp.status_code,
+        headers=[
+            (name, value)
+            for name, value in _response_headers(resp)
+            if name not in (b"content-length", b"content-encoding", b"etag", b"cache-control")
+        ],
+        body=resp.content,
+        etag=make_etag(resp.content),
+    )
+    cacheable = (
+        claims is not None
+        and response_cache.enabled
+        and resp.status_code == status.HTTP_200_OK
+        and "set-cookie" not in resp.headers
+        and "no-store" not in resp.headers.get("cache-control", "")
+    )
+    return entry, cacheable and response_cache.set(claims["sub"], key, entry, requested_at)
+
+
+async def _dashboard_part(name: str, url: str, query: str, request: Request, claims: Optional[Dict[str, Any]]) -> Any:
+    """Тело части панели (JSON-байты) или описание ошибки {status, detail}."""
+    try:
+        entry, _ = await asyncio.wait_for(
+            _upstream_get(url, query, request, claims), settings.dashboard_part_timeout_seconds
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Часть панели %s не получена за %.1f с", name, settings.dashboard_part_timeout_seconds)
+        return {"status": status.HTTP_504_GATEWAY_TIMEOUT, "detail": "Сервис не ответил вовремя"}
+    except HTTPException as exc:
+        return {"status": exc.status_code, "detail": exc.detail}
+    content_type = next((value for header, value in entry.headers if header == b"content-type"), b"")
+    if entry.status_code != status.HTTP_200_OK or not content_type.startswith(b"application/json"):
+        logger.warning("Часть панели %s: сервис ответил %s", name, entry.status_code)
+        return {"status": entry.status_code, "detail": "Ошибка сервиса"}
+    return entry.body
+
+
+async def _stream_body(
+    resp: httpx.Response, url: str, bulkhead: Bulkhead, probe: bool, finish: Callable[[], Awaitable[None]]
+) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in resp.aiter_raw():
+            yield chunk
+    except httpx.HTTPError as exc:
+        # статус уже отправлен клиенту, остается оборвать ответ
+        bulkhead.record_failure(probe)
+        logger.error("Обрыв ответа %s: %s", url, exc)
+        raise
+    finally:
+        # при ошибке фоновая задача ответа не запускается
+        await finish()
 
 
 @app.get("/health/live")
@@ -69,74 +435,132 @@ async def health_ready() -> Dict[str, str]:
     return {"status": "ready"}
 
 
-@app.get("/ui-config.json")
-async def ui_config() -> Dict[str, str]:
-    return {
+@app.on_event("startup")
+async def on_startup() -> None:
+    global http_client
+    # один клиент на процесс: соединения с сервисами переиспользуются
+    # таймауты задаются на каждый запрос по сервису (bulkheads)
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=settings.proxy_max_connections),
+    )
+    await loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await loop_monitor.stop()
+    if http_client is not None:
+        await http_client.aclose()
+    mark_process_dead()
+
+
+# тексты интерфейса одинаковы для всех пользователей и не меняются до рестарта:
+# тело ответа собирается один раз, запросы к /ui-config.json его только отдают
+UI_CONFIG_BODY = json.dumps(
+    {
         "login_title": settings.login_title,
         "register_title": settings.register_title,
         "welcome_message": settings.welcome_message,
-    }
+    },
+    ensure_ascii=False,
+    separators=(",", ":"),
+).encode("utf-8")
+
+
+@app.get("/ui-config.json")
+async def ui_config() -> Response:
+    return Response(UI_CONFIG_BODY, media_type="application/json")
 
 
 @app.post("/api/auth/register")
 async def api_register(request: Request) -> Response:
-    body = await request.json()
     url = f"{settings.auth_base_url}/auth/register"
-    return await _proxy("POST", url, request, json_body=body)
+    return await _proxy("POST", url, request)
 
 
 @app.post("/api/auth/login")
 async def api_login(request: Request) -> Response:
-    body = await request.json()
     url = f"{settings.auth_base_url}/auth/login"
-    return await _proxy("POST", url, request, json_body=body)
+    return await _proxy("POST", url, request)
+
+
+@app.get("/api/dashboard")
+async def api_dashboard(request: Request, days: int = Query(30, ge=1, le=365)) -> Response:
+    """
+    Данные стартовой страницы одним ответом: профиль, сводка, статистика
+    по категориям и дням, первая страница операций.
+
+    Запросы к сервисам идут параллельно внутри кластера, через кэш шлюза.
+    Часть, которую сервис не отдал за DASHBOARD_PART_TIMEOUT_SECONDS или
+    отдал с ошибкой, равна null и описана в errors; 401 от сервиса (токен
+    не принят) возвращается клиенту как есть.
+    """
+    claims = _verified_claims(request)
+    parts = {
+        "profile": (f"{settings.profile_base_url}/profile/me", ""),
+        "summary": (f"{settings.finance_base_url}/finance/stats/summary", ""),
+        "by_category": (f"{settings.finance_base_url}/finance/stats/by-category", ""),
+        "by_day": (f"{settings.finance_base_url}/finance/stats/by-day", f"days={days}"),
+        "transactions": (f"{settings.finance_base_url}/finance/transactions", ""),
+    }
+    results = await asyncio.gather(
+        *(_dashboard_part(name, url, query, request, claims) for name, (url, query) in parts.items())
+    )
+    errors = {name: result for name, result in zip(parts, results) if isinstance(result, dict)}
+    if any(error["status"] == status.HTTP_401_UNAUTHORIZED for error in errors.values()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Требуется авторизация")
+    # тела сервисов уже JSON: документ собирается из байтов без разбора
+    body = b"{" + b",".join(
+        json.dumps(name).encode() + b":" + (b"null" if name in errors else result)
+        for name, result in zip(parts, results)
+    )
+    body += b',"errors":' + json.dumps(errors, ensure_ascii=False).encode("utf-8") + b"}"
+    return Response(body, media_type="application/json", headers={"cache-control": "private, no-cache"})
 
 
 @app.get("/api/profile/me")
 async def api_profile_me(request: Request) -> Response:
     url = f"{settings.profile_base_url}/profile/me"
-    return await _proxy("GET", url, request)
+    return await _cached_get(url, request)
 
 
 @app.put("/api/profile/me")
 async def api_profile_update(request: Request) -> Response:
-    body = await request.json()
     url = f"{settings.profile_base_url}/profile/me"
-    return await _proxy("PUT", url, request, json_body=body)
+    return await _proxy("PUT", url, request, identity=True)
 
 
 @app.post("/api/finance/transactions")
 async def api_finance_create(request: Request) -> Response:
-    body = await request.json()
     url = f"{settings.finance_base_url}/finance/transactions"
-    return await _proxy("POST", url, request, json_body=body)
+    return await _proxy("POST", url, request, identity=True)
 
 
 @app.get("/api/finance/transactions")
 async def api_finance_list(request: Request) -> Response:
-    params = dict(request.query_params)
     url = f"{settings.finance_base_url}/finance/transactions"
-    return await _proxy("GET", url, request, params=params)
+    # список может быть большим: отдается потоком, без буферизации в кэше и без
+    # объединения одновременных запросов — для этого ответ пришлось бы держать в памяти
+    return await _proxy("GET", url, request, identity=True)
 
 
 @app.get("/api/finance/stats/summary")
 async def api_finance_summary(request: Request) -> Response:
     url = f"{settings.finance_base_url}/finance/stats/summary"
-    return await _proxy("GET", url, request)
+    return await _cached_get(url, request)
 
 
 @app.get("/api/finance/stats/by-category")
 async def api_finance_by_category(request: Request) -> Response:
     url = f"{settings.finance_base_url}/finance/stats/by-category"
-    return await _proxy("GET", url, request)
+    return await _cached_get(url, request)
 
 
 @app.get("/api/finance/stats/by-day")
 async def api_finance_by_day(request: Request) -> Response:
-    params = dict(request.query_params)
     url = f"{settings.finance_base_url}/finance/stats/by-day"
-    return await _proxy("GET", url, request, params=params)
+    return await _cached_get(url, request)
 
 @app.get("/{full_path:path}")
-async def spa_fallback(full_path: str) -> FileResponse:  
-    return _frontend_index()
+async def spa_fallback(full_path: str, request: Request) -> Response:
+    return _frontend_index(request)
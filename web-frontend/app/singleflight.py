@@ -0,0 +1,59 @@
+"""
+Объединение одинаковых одновременных запросов к сервисам (single-flight).
+
+Несколько вкладок или виджетов SPA часто запрашивают одно и то же
+одновременно. Первый запрос по ключу выполняется, остальные ждут его
+результата; исключение получают все ожидающие. Вызов идет отдельной
+задачей, поэтому отключение первого клиента не обрывает его для остальных.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from prometheus_client import Counter
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+COALESCED_REQUESTS = Counter(
+    "gateway_coalesced_requests_total",
+    "Запросы, дождавшиеся результата уже выполняющегося одинакового запроса",
+)
+
+
+class SingleFlight(Generic[K, T]):
+    """Не больше одного выполняющегося вызова на ключ; рассчитан на один event loop."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[K, asyncio.Future[T]] = {}
+
+    async def do(self, key: K, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            COALESCED_REQUESTS.inc()
+        return await asyncio.shield(task)
+
+    def forget(self, predicate: Callable[[K], bool]) -> None:
+        """
+        Новые запросы по подходящим ключам не присоединяются к уже выполняющимся.
+
+        Нужен после изменения данных: вызов, начатый до изменения, может вернуть
+        старые данные. Те, кто уже ждет его, получат его результат.
+        """
+        for key in [key for key in self._calls if predicate(key)]:
+            del self._calls[key]
+
+    def _finish(self, key: K, task: asyncio.Future[T]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # исключение, которое некому получить (все клиенты отключились), не пишется в лог как потерянное
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
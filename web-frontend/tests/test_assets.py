@@ -0,0 +1,129 @@
+"""Тесты статики из памяти: выбор кодировки по Accept-Encoding, ETag/304 и Cache-Control."""
+import gzip
+import os
+import sys
+from email.utils import formatdate
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+from starlette.requests import Request
+
+FRONTEND_DIR = Path(__file__).resolve().parents[1]
+if str(FRONTEND_DIR) not in sys.path:
+    sys.path.insert(0, str(FRONTEND_DIR))
+
+from app.assets import IMMUTABLE_CACHE, REVALIDATE_CACHE, StaticAssets, accepted_encodings  # noqa: E402
+
+MTIME = 1_700_000_000
+SCRIPT = b"function render(items) { return items.map(function (item) { return item.name; }); }\n" * 20
+
+
+def make_request(method: str = "GET", **headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "path": "/",
+            "query_string": b"",
+            "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+        }
+    )
+
+
+@pytest.fixture
+def assets(tmp_path: Path) -> StaticAssets:
+    (tmp_path / "index.html").write_bytes(b"<!doctype html><title>x</title>")
+    (tmp_path / "app.3f2a9c1b.js").write_bytes(SCRIPT)
+    (tmp_path / "app.js").write_bytes(SCRIPT)
+    for path in tmp_path.iterdir():
+        os.utime(path, (MTIME, MTIME))
+    return StaticAssets(tmp_path, required=("index.html",))
+
+
+def serve(assets: StaticAssets, name: str, method: str = "GET", **headers: str) -> Tuple[int, dict, bytes]:
+    response = assets.response(make_request(method, **headers), assets.assets[name])
+    return response.status_code, dict(response.headers), response.body
+
+
+def test_accepted_encodings_parses_q_values_and_wildcard() -> None:
+    assert accepted_encodings("gzip;q=0.5, br") == {"gzip": 0.5, "br": 1.0, "identity": 1.0}
+    assert accepted_encodings("*;q=0.3, gzip;q=0") == {"gzip": 0.0, "*": 0.3, "br": 0.3, "identity": 0.3}
+    assert accepted_encodings("identity;q=0") == {"identity": 0.0}
+    assert accepted_encodings("") == {"identity": 1.0}
+
+
+def test_negotiates_smallest_accepted_encoding(assets: StaticAssets) -> None:
+    """Выбирается самый компактный из вариантов с q > 0; identity;q=0 без подходящего сжатия — 406."""
+    status, headers, body = serve(assets, "app.js", accept_encoding="gzip, br")
+    assert status == 200
+    assert headers["content-encoding"] == "br"
+    assert headers["vary"] == "Accept-Encoding"
+
+    status, headers, body = serve(assets, "app.js", accept_encoding="br;q=0, gzip;q=0.5")
+    assert headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == SCRIPT
+
+    status, headers, body = serve(assets, "app.js", accept_encoding="*")
+    assert headers["content-encoding"] == "br"
+
+    status, headers, body = serve(assets, "app.js", accept_encoding="deflate")
+    assert "content-encoding" not in headers
+    assert body == SCRIPT
+
+    # index.html слишком мал для сжатия: кроме identity вариантов нет
+    status, _, _ = serve(assets, "index.html", accept_encoding="gzip, identity;q=0")
+    assert status == 406
+
+
+def test_etag_per_encoding_and_304(assets: StaticAssets) -> None:
+    """У каждого варианта свой ETag; 304 только на ETag выбранного варианта."""
+    _, gzipped, _ = serve(assets, "app.js", accept_encoding="gzip")
+    _, plain, _ = serve(assets, "app.js")
+    assert gzipped["etag"] != plain["etag"]
+    assert gzipped["etag"].endswith('-gzip"')
+
+    status, headers, body = serve(assets, "app.js", accept_encoding="gzip", if_none_match=gzipped["etag"])
+    assert status == 304
+    assert body == b""
+    assert headers["etag"] == gzipped["etag"]
+
+    status, _, _ = serve(assets, "app.js", if_none_match=gzipped["etag"])
+    assert status == 200
+
+
+def test_if_modified_since(assets: StaticAssets) -> None:
+    """If-Modified-Since сравнивается с mtime файла; при If-None-Match он не учитывается."""
+    status, headers, _ = serve(assets, "app.js", if_modified_since=formatdate(MTIME, usegmt=True))
+    assert status == 304
+    assert headers["last-modified"] == formatdate(MTIME, usegmt=True)
+
+    status, _, _ = serve(assets, "app.js", if_modified_since=formatdate(MTIME - 60, usegmt=True))
+    assert status == 200
+    status, _, _ = serve(assets, "app.js", if_modified_since="not a date")
+    assert status == 200
+    status, _, _ = serve(
+        assets, "app.js", if_none_match='"other"', if_modified_since=formatdate(MTIME, usegmt=True)
+    )
+    assert status == 200
+
+
+def test_cache_control_by_fingerprint(assets: StaticAssets) -> None:
+    assert serve(assets, "app.3f2a9c1b.js")[1]["cache-control"] == IMMUTABLE_CACHE
+    assert serve(assets, "app.js")[1]["cache-control"] == REVALIDATE_CACHE
+    assert serve(assets, "index.html")[1]["cache-control"] == REVALIDATE_CACHE
+
+
+def test_head_reports_length_of_selected_variant(assets: StaticAssets) -> None:
+    _, get_headers, get_body = serve(assets, "app.js", accept_encoding="gzip")
+    status, headers, body = serve(assets, "app.js", "HEAD", accept_encoding="gzip")
+    assert status == 200
+    assert body == b""
+    assert headers["content-length"] == str(len(get_body)) == get_headers["content-length"]
+    assert headers["content-encoding"] == "gzip"
+
+
+def test_missing_required_file_fails_at_startup(tmp_path: Path) -> None:
+    (tmp_path / "app.js").write_bytes(SCRIPT)
+    with pytest.raises(RuntimeError, match="index.html"):
+        StaticAssets(tmp_path, required=("index.html",))
@@ -0,0 +1,207 @@
+"""Тесты изоляции сервисов и автомата отключения (Bulkhead) с управляемыми часами."""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+
+FRONTEND_DIR = Path(__file__).resolve().parents[1]
+if str(FRONTEND_DIR) not in sys.path:
+    sys.path.insert(0, str(FRONTEND_DIR))
+
+from app.bulkhead import Bulkhead  # noqa: E402
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_bulkhead(clock: Clock, name: str, max_concurrency: int = 2, queue_timeout: float = 0.05) -> Bulkhead:
+    return Bulkhead(
+        name,
+        max_concurrency=max_concurrency,
+        queue_timeout=queue_timeout,
+        connect_timeout=1.0,
+        read_timeout=1.0,
+        failure_threshold=3,
+        reset_seconds=10.0,
+        clock=clock,
+    )
+
+
+def circuit_state(name: str) -> float:
+    return REGISTRY.get_sample_value("gateway_upstream_circuit_state", {"upstream": name})
+
+
+def rejected(name: str, reason: str) -> float:
+    return REGISTRY.get_sample_value("gateway_upstream_rejected_total", {"upstream": name, "reason": reason}) or 0.0
+
+
+async def call(bulkhead: Bulkhead, ok: bool) -> None:
+    probe = await bulkhead.acquire()
+    try:
+        if ok:
+            bulkhead.record_success(probe)
+        else:
+            bulkhead.record_failure(probe)
+    finally:
+        bulkhead.release(probe)
+
+
+def open_circuit(bulkhead: Bulkhead) -> None:
+    for _ in range(bulkhead.failure_threshold):
+        asyncio.run(call(bulkhead, ok=False))
+
+
+def test_opens_after_consecutive_failures_and_fails_fast() -> None:
+    clock = Clock()
+    bulkhead = make_bulkhead(clock, "t-open")
+
+    asyncio.run(call(bulkhead, ok=False))
+    asyncio.run(call(bulkhead, ok=False))
+    asyncio.run(call(bulkhead, ok=True))  # успех обнуляет счетчик ошибок подряд
+    asyncio.run(call(bulkhead, ok=False))
+    asyncio.run(call(bulkhead, ok=False))
+    assert bulkhead.state == "closed"
+    assert circuit_state("t-open") == 0
+
+    asyncio.run(call(bulkhead, ok=False))
+    assert bulkhead.state == "open"
+    assert circuit_state("t-open") == 2
+
+    clock.now += 6.5
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(bulkhead.acquire())
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "4"}
+    assert rejected("t-open", "circuit_open") == 1
+
+
+def test_single_half_open_probe_closes_or_reopens() -> None:
+    clock = Clock()
+    bulkhead = make_bulkhead(clock, "t-probe")
+    open_circuit(bulkhead)
+    clock.now += 10
+
+    async def scenario() -> None:
+        probe = await bulkhead.acquire()
+        assert probe is True
+        assert bulkhead.state == "half_open"
+        assert circuit_state("t-probe") == 1
+        # пока идет пробный запрос, остальные отклоняются
+        with pytest.raises(HTTPException) as exc_info:
+            await bulkhead.acquire()
+        assert exc_info.value.status_code == 503
+        bulkhead.record_failure(probe)
+        bulkhead.release(probe)
+
+    asyncio.run(scenario())
+    # неудачная проба снова размыкает автомат на полный интервал
+    assert bulkhead.state == "open"
+    clock.now += 9
+    with pytest.raises(HTTPException):
+        asyncio.run(bulkhead.acquire())
+
+    clock.now += 1
+    asyncio.run(call(bulkhead, ok=True))
+    assert bulkhead.state == "closed"
+    assert circuit_state("t-probe") == 0
+    assert asyncio.run(bulkhead.acquire()) is False
+
+
+def test_late_results_do_not_decide_half_open() -> None:
+    """Запросы, начатые до размыкания, не замыкают автомат и не продлевают паузу: решает только проба."""
+    clock = Clock()
+    bulkhead = make_bulkhead(clock, "t-late", max_concurrency=4)
+
+    async def scenario() -> None:
+        late = [await bulkhead.acquire() for _ in range(2)]
+        assert late == [False, False]
+        for _ in range(bulkhead.failure_threshold):
+            await call(bulkhead, ok=False)
+        # запросы, начатые до размыкания, завершаются, пока автомат разомкнут
+        bulkhead.record_failure(late[0])
+        bulkhead.release(late[0])
+        assert bulkhead._opened_at == 1000.0
+        clock.now += 10
+        probe = await bulkhead.acquire()
+        bulkhead.record_success(late[1])
+        bulkhead.release(late[1])
+        assert bulkhead.state == "half_open"
+        bulkhead.record_failure(probe)
+        bulkhead.release(probe)
+        assert bulkhead.state == "open"
+
+    asyncio.run(scenario())
+
+
+def test_probe_abandoned_on_queue_timeout() -> None:
+    clock = Clock()
+    bulkhead = make_bulkhead(clock, "t-queue", max_concurrency=1)
+    open_circuit(bulkhead)
+    clock.now += 10
+
+    async def scenario() -> None:
+        # единственное место занято запросом, начатым до размыкания
+        await bulkhead._slots.acquire()
+        with pytest.raises(HTTPException) as exc_info:
+            await bulkhead.acquire()
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.detail == "Сервис перегружен, повторите позже"
+        bulkhead._slots.release()
+        # проба не зависла: следующий запрос снова пробный
+        probe = await bulkhead.acquire()
+        assert probe is True
+        bulkhead.release(probe)
+
+    asyncio.run(scenario())
+    assert rejected("t-queue", "queue_timeout") == 1
+    assert bulkhead.state == "half_open"
+
+
+def test_probe_abandoned_on_cancel() -> None:
+    clock = Clock()
+    bulkhead = make_bulkhead(clock, "t-cancel", max_concurrency=1, queue_timeout=5)
+    open_circuit(bulkhead)
+    clock.now += 10
+
+    async def scenario() -> None:
+        await bulkhead._slots.acquire()
+        waiting = asyncio.create_task(bulkhead.acquire())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        bulkhead._slots.release()
+        probe = await bulkhead.acquire()
+        assert probe is True
+        bulkhead.record_success(probe)
+        bulkhead.release(probe)
+
+    asyncio.run(scenario())
+    assert bulkhead.state == "closed"
+
+
+def test_concurrency_limit_and_release() -> None:
+    clock = Clock()
+    bulkhead = make_bulkhead(clock, "t-limit", max_concurrency=2)
+
+    async def scenario() -> None:
+        first = await bulkhead.acquire()
+        second = await bulkhead.acquire()
+        with pytest.raises(HTTPException):
+            await bulkhead.acquire()
+        bulkhead.release(first)
+        third = await bulkhead.acquire()
+        bulkhead.release(second)
+        bulkhead.release(third)
+
+    asyncio.run(scenario())
+    assert bulkhead._slots._value == 2
+    assert REGISTRY.get_sample_value("gateway_upstream_in_flight", {"upstream": "t-limit"}) == 0
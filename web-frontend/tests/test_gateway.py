@@ -0,0 +1,510 @@
+"""Тесты шлюза web-frontend: кэш ответов, ETag/304, сброс по изменениям и объединение запросов (сервисы — httpx.MockTransport)."""
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+import httpx
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+FRONTEND_DIR = Path(__file__).resolve().parents[1]
+for p in (ROOT_DIR, FRONTEND_DIR):
+    if str(p) not in sys.path:
+        sys.path.insert(0, str(p))
+
+os.environ.setdefault("JWT_SECRET", "gateway-test-jwt")
+os.environ.setdefault("INTERNAL_IDENTITY_SECRET", "gateway-test-identity")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from common.identity import IDENTITY_HEADER, verify_identity  # noqa: E402
+from app import main as gateway  # noqa: E402
+from app.cache import CachedResponse, ResponseCache  # noqa: E402
+
+
+class Upstream:
+    """Мок profile/finance: версия данных по пользователю и журнал запросов."""
+
+    def __init__(self) -> None:
+        self.versions: Dict[str, int] = {}
+        self.requests: List[httpx.Request] = []
+
+    def user(self, request: httpx.Request) -> str:
+        identity = verify_identity(request.headers.get(IDENTITY_HEADER), gateway.settings.internal_identity_secret)
+        assert identity is not None, "шлюз должен передать подписанную личность"
+        return identity["user_id"]
+
+    def calls(self, method: str, path: str) -> int:
+        return sum(1 for r in self.requests if r.method == method and r.url.path == path)
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        user_id = self.user(request)
+        path = request.url.path
+        if request.method in ("PUT", "POST"):
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            return json_response(201 if request.method == "POST" else 200, {"ok": True})
+        if path == "/finance/stats/by-day" and request.url.params.get("days") == "0":
+            return json_response(422, {"detail": "days"})
+        return json_response(200, {"user": user_id, "path": path, "v": self.versions.get(user_id, 0)})
+
+
+def json_response(status_code: int, payload: dict) -> httpx.Response:
+    # непрочитанный поток, как от настоящего сервиса: шлюз отдает такие ответы через aiter_raw
+    return httpx.Response(
+        status_code,
+        headers={"content-type": "application/json"},
+        stream=httpx.ByteStream(json.dumps(payload).encode()),
+    )
+
+
+def auth(user_id: str) -> Dict[str, str]:
+    token = jwt.encode({"sub": user_id, "username": user_id}, gateway.settings.jwt_secret, algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def upstream() -> Upstream:
+    return Upstream()
+
+
+def gateway_client(upstream: Upstream) -> Iterator[TestClient]:
+    """Клиент шлюза, у которого сервисы заменены моком upstream."""
+    gateway.response_cache.clear()
+    for bulkhead in gateway.bulkheads.values():
+        # как после удачного пробного запроса: автомат замкнут
+        bulkhead.record_success(probe=True)
+    with TestClient(gateway.app) as test_client:
+        test_client.portal.call(gateway.http_client.aclose)
+        gateway.http_client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+        yield test_client
+    gateway.response_cache.clear()
+
+
+@pytest.fixture
+def client(upstream: Upstream) -> Iterator[TestClient]:
+    yield from gateway_client(upstream)
+
+
+def test_cached_per_user_with_etag(client: TestClient, upstream: Upstream) -> None:
+    first = client.get("/api/profile/me", headers=auth("alice"))
+    assert first.status_code == 200
+    assert first.json() == {"user": "alice", "path": "/profile/me", "v": 0}
+    assert first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    again = client.get("/api/profile/me", headers=auth("alice"))
+    assert again.content == first.content
+    assert again.headers["etag"] == first.headers["etag"]
+    assert upstream.calls("GET", "/profile/me") == 1
+
+    # другой пользователь не получает чужой ответ
+    other = client.get("/api/profile/me", headers=auth("bob"))
+    assert other.json()["user"] == "bob"
+    assert upstream.calls("GET", "/profile/me") == 2
+
+    # строка запроса — часть ключа
+    client.get("/api/finance/stats/by-day?days=7", headers=auth("alice"))
+    client.get("/api/finance/stats/by-day?days=30", headers=auth("alice"))
+    assert upstream.calls("GET", "/finance/stats/by-day") == 2
+
+
+def test_if_none_match_returns_304_from_cache(client: TestClient, upstream: Upstream) -> None:
+    first = client.get("/api/finance/stats/summary", headers=auth("alice"))
+    etag = first.headers["etag"]
+
+    resp = client.get("/api/finance/stats/summary", headers={**auth("alice"), "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+    assert upstream.calls("GET", "/finance/stats/summary") == 1
+
+    resp = client.get("/api/finance/stats/summary", headers={**auth("alice"), "If-None-Match": '"stale"'})
+    assert resp.status_code == 200
+    assert resp.content == first.content
+    # условные заголовки клиента сервису не передаются
+    assert all("if-none-match" not in r.headers for r in upstream.requests)
+
+
+def test_mutations_invalidate_only_that_user(client: TestClient, upstream: Upstream) -> None:
+    client.get("/api/profile/me", headers=auth("alice"))
+    client.get("/api/finance/stats/summary", headers=auth("alice"))
+    client.get("/api/finance/stats/summary", headers=auth("bob"))
+
+    assert client.put("/api/profile/me", headers=auth("alice"), json={}).status_code == 200
+    assert client.get("/api/profile/me", headers=auth("alice")).json()["v"] == 1
+    assert upstream.calls("GET", "/profile/me") == 2
+
+    assert client.post("/api/finance/transactions", headers=auth("alice"), json={}).status_code == 201
+    assert client.get("/api/finance/stats/summary", headers=auth("alice")).json()["v"] == 2
+    assert upstream.calls("GET", "/finance/stats/summary") == 3
+
+    # записи bob не сбрасывались
+    assert client.get("/api/finance/stats/summary", headers=auth("bob")).json()["v"] == 0
+    assert upstream.calls("GET", "/finance/stats/summary") == 3
+
+
+def test_errors_and_transaction_list_are_not_cached(client: TestClient, upstream: Upstream) -> None:
+    for _ in range(2):
+        assert client.get("/api/finance/stats/by-day?days=0", headers=auth("alice")).status_code == 422
+    assert upstream.calls("GET", "/finance/stats/by-day") == 2
+
+    # список операций идет потоком мимо кэша
+    for _ in range(2):
+        resp = client.get("/api/finance/transactions", headers=auth("alice"))
+        assert resp.status_code == 200
+        assert "etag" not in resp.headers
+    assert upstream.calls("GET", "/finance/transactions") == 2
+
+
+def test_invalid_token_rejected_at_gateway(client: TestClient, upstream: Upstream) -> None:
+    resp = client.get("/api/profile/me", headers={"Authorization": "Bearer junk"})
+    assert resp.status_code == 401
+    assert upstream.requests == []
+
+
+def test_response_requested_before_invalidation_is_not_stored() -> None:
+    cache = ResponseCache(ttl_seconds=60, max_bytes=1024, max_body_bytes=512)
+    entry = CachedResponse(status_code=200, headers=[], body=json.dumps({"v": 0}).encode(), etag='"e"')
+
+    requested_at = cache.now()
+    cache.invalidate("alice")
+    assert not cache.set("alice", "/stats", entry, requested_at)
+    assert cache.get("alice", "/stats") is None
+
+    assert cache.set("alice", "/stats", entry, cache.now())
+    assert cache.get("alice", "/stats") is entry
+    cache.invalidate("alice")
+    assert cache.get("alice", "/stats") is None
+
+
+def test_cache_bounds_body_and_total_size() -> None:
+    cache = ResponseCache(ttl_seconds=60, max_bytes=10, max_body_bytes=6)
+    big = CachedResponse(status_code=200, headers=[], body=b"x" * 7, etag='"b"')
+    assert not cache.set("alice", "/big", big, cache.now())
+
+    for name in ("a", "b"):
+        cache.set("alice", f"/{name}", CachedResponse(200, [], b"x" * 6, f'"{name}"'), cache.now())
+    # вторая запись вытеснила первую: суммарно не больше max_bytes
+    assert cache.get("alice", "/a") is None
+    assert cache.get("alice", "/b") is not None
+
+
+
+class SlowUpstream(Upstream):
+    """Первый GET читает данные сразу, а отвечает только после release."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "GET" and not self.started.is_set():
+            self.requests.append(request)
+            user_id = self.user(request)
+            snapshot = {"user": user_id, "v": self.versions.get(user_id, 0)}
+            self.started.set()
+            await self.release.wait()
+            return json_response(200, snapshot)
+        return await super().__call__(request)
+
+
+@pytest.fixture
+def slow_upstream() -> SlowUpstream:
+    return SlowUpstream()
+
+
+@pytest.fixture
+def slow_client(slow_upstream: SlowUpstream) -> Iterator[TestClient]:
+    yield from gateway_client(slow_upstream)
+
+
+def run_in_app(test_client: TestClient, scenario: Callable[[httpx.AsyncClient], Awaitable[Any]]) -> Any:
+    """Выполняет сценарий с одновременными запросами в event loop приложения."""
+
+    async def run() -> Any:
+        transport = httpx.ASGITransport(app=gateway.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as http:
+            return await scenario(http)
+
+    return test_client.portal.call(run)
+
+
+def test_concurrent_gets_are_coalesced(slow_client: TestClient, slow_upstream: SlowUpstream) -> None:
+    async def scenario(http: httpx.AsyncClient) -> list:
+        first = asyncio.create_task(http.get("/api/finance/stats/summary", headers=auth("alice")))
+        await slow_upstream.started.wait()
+        others = [asyncio.create_task(http.get("/api/finance/stats/summary", headers=auth("alice"))) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        slow_upstream.release.set()
+        return await asyncio.gather(first, *others)
+
+    responses = run_in_app(slow_client, scenario)
+    assert [r.json()["v"] for r in responses] == [0, 0, 0, 0]
+    assert slow_upstream.calls("GET", "/finance/stats/summary") == 1
+
+
+def test_get_after_write_does_not_join_older_request(slow_client: TestClient, slow_upstream: SlowUpstream) -> None:
+    async def scenario(http: httpx.AsyncClient) -> tuple:
+        before = asyncio.create_task(http.get("/api/finance/stats/summary", headers=auth("alice")))
+        await slow_upstream.started.wait()
+        created = await http.post("/api/finance/transactions", headers=auth("alice"), json={})
+        assert created.status_code == 201
+        after = asyncio.create_task(http.get("/api/finance/stats/summary", headers=auth("alice")))
+        await asyncio.sleep(0.05)
+        slow_upstream.release.set()
+        return await before, await after
+
+    before, after = run_in_app(slow_client, scenario)
+    assert before.json()["v"] == 0
+    assert after.json()["v"] == 1
+    assert slow_upstream.calls("GET", "/finance/stats/summary") == 2
+    # в кэше остался свежий ответ, а не запрошенный до записи
+    assert slow_client.get("/api/finance/stats/summary", headers=auth("alice")).json()["v"] == 1
+    assert slow_upstream.calls("GET", "/finance/stats/summary") == 2
+
+
+class TokenUpstream(SlowUpstream):
+    """SlowUpstream для шлюза без проверки токена: пользователь — заголовок Authorization."""
+
+    def user(self, request: httpx.Request) -> str:
+        assert IDENTITY_HEADER not in request.headers
+        return request.headers.get("authorization", "")
+
+
+@pytest.fixture
+def token_upstream() -> TokenUpstream:
+    return TokenUpstream()
+
+
+@pytest.fixture
+def token_client(token_upstream: TokenUpstream, monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    monkeypatch.setattr(gateway.settings, "jwt_secret", "")
+    yield from gateway_client(token_upstream)
+
+
+def test_gets_coalesced_by_authorization_without_gateway_secrets(
+    token_client: TestClient, token_upstream: TokenUpstream
+) -> None:
+    """Без JWT_SECRET шлюз объединяет GET по заголовку Authorization, разные токены — отдельно."""
+    upstream = token_upstream
+
+    async def scenario(http: httpx.AsyncClient) -> list:
+        first = asyncio.create_task(http.get("/api/finance/stats/summary", headers={"Authorization": "Bearer a"}))
+        await upstream.started.wait()
+        same = [
+            asyncio.create_task(http.get("/api/finance/stats/summary", headers={"Authorization": "Bearer a"}))
+            for _ in range(3)
+        ]
+        other = await http.get("/api/finance/stats/summary", headers={"Authorization": "Bearer b"})
+        await asyncio.sleep(0.05)
+        upstream.release.set()
+        return [other, *await asyncio.gather(first, *same)]
+
+    other, *same = run_in_app(token_client, scenario)
+    assert other.json()["user"] == "Bearer b"
+    assert [r.json()["user"] for r in same] == ["Bearer a"] * 4
+    assert upstream.calls("GET", "/finance/stats/summary") == 2
+
+
+class DashboardUpstream(Upstream):
+    """Upstream, у которого отдельные пути отвечают заданным статусом или зависают."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.statuses: Dict[str, int] = {}
+        self.hanging: Tuple[str, ...] = ()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path in self.hanging:
+            await asyncio.sleep(0.5)
+        if path in self.statuses:
+            self.requests.append(request)
+            return json_response(self.statuses[path], {"detail": "upstream"})
+        return await super().__call__(request)
+
+
+@pytest.fixture
+def dashboard_upstream() -> DashboardUpstream:
+    return DashboardUpstream()
+
+
+@pytest.fixture
+def dashboard_client(dashboard_upstream: DashboardUpstream) -> Iterator[TestClient]:
+    yield from gateway_client(dashboard_upstream)
+
+
+def test_dashboard_combines_parts_into_valid_json(
+    dashboard_client: TestClient, dashboard_upstream: DashboardUpstream
+) -> None:
+    """Тело склеено из байтов сервисов, но остается корректным JSON со всеми частями."""
+    resp = dashboard_client.get("/api/dashboard?days=7", headers=auth("alice"))
+    assert resp.status_code == 200
+    data = json.loads(resp.content)
+    assert list(data) == ["profile", "summary", "by_category", "by_day", "transactions", "errors"]
+    assert data["profile"] == {"user": "alice", "path": "/profile/me", "v": 0}
+    assert data["by_category"]["path"] == "/finance/stats/by-category"
+    assert data["errors"] == {}
+    by_day = next(r for r in dashboard_upstream.requests if r.url.path == "/finance/stats/by-day")
+    assert by_day.url.params["days"] == "7"
+
+
+def test_dashboard_returns_partial_result(
+    dashboard_client: TestClient, dashboard_upstream: DashboardUpstream, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Часть с 5xx или без ответа за таймаут равна null и описана в errors, остальные на месте."""
+    monkeypatch.setattr(gateway.settings, "dashboard_part_timeout_seconds", 0.1)
+    dashboard_upstream.statuses["/finance/stats/summary"] = 503
+    dashboard_upstream.hanging = ("/finance/stats/by-day",)
+    resp = dashboard_client.get("/api/dashboard?days=7", headers=auth("alice"))
+    assert resp.status_code == 200
+    data = json.loads(resp.content)
+    assert data["summary"] is None
+    assert data["by_day"] is None
+    assert data["errors"] == {
+        "summary": {"status": 503, "detail": "Ошибка сервиса"},
+        "by_day": {"status": 504, "detail": "Сервис не ответил вовремя"},
+    }
+    assert data["profile"]["user"] == "alice"
+    assert data["transactions"]["path"] == "/finance/transactions"
+
+
+def test_dashboard_propagates_401(dashboard_client: TestClient, dashboard_upstream: DashboardUpstream) -> None:
+    """401 от любого сервиса означает, что токен не принят: клиент получает 401, а не частичный ответ."""
+    dashboard_upstream.statuses["/profile/me"] = 401
+    resp = dashboard_client.get("/api/dashboard", headers=auth("alice"))
+    assert resp.status_code == 401
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """Тело, которое обрывается после первого фрагмента."""
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield b'{"items": ['
+        raise httpx.ReadError("upstream reset")
+
+
+def test_stream_releases_bulkhead_slot(client: TestClient, upstream: Upstream) -> None:
+    finance = gateway.bulkheads["finance"]
+    free = finance._slots._value
+
+    resp = client.get("/api/finance/transactions", headers=auth("alice"))
+    assert resp.status_code == 200
+    assert finance._slots._value == free
+
+    async def broken(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"content-type": "application/json"}, stream=BrokenStream())
+
+    gateway.http_client = httpx.AsyncClient(transport=httpx.MockTransport(broken))
+    with pytest.raises(httpx.ReadError):
+        client.get("/api/finance/transactions", headers=auth("alice"))
+    assert finance._slots._value == free
+    assert finance._failures == 1
+    assert REGISTRY.get_sample_value("gateway_upstream_in_flight", {"upstream": "finance"}) == 0
+
+
+def test_slow_upload_does_not_hold_bulkhead_slot(
+    client: TestClient, upstream: Upstream, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тело читается до того, как занять место у сервиса; слишком большое — 413, недосланное — 408."""
+    finance = gateway.bulkheads["finance"]
+    free = finance._slots._value
+    received = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def slow_body() -> AsyncIterator[bytes]:
+        yield b'{"amount": '
+        received.set()
+        await resume.wait()
+        yield b'"1.00"}'
+
+    async def scenario(http: httpx.AsyncClient) -> Tuple[int, httpx.Response]:
+        task = asyncio.create_task(http.post("/api/finance/transactions", headers=auth("alice"), content=slow_body()))
+        await received.wait()
+        await asyncio.sleep(0.05)
+        slots_while_uploading = finance._slots._value
+        resume.set()
+        return slots_while_uploading, await task
+
+    slots_while_uploading, resp = run_in_app(client, scenario)
+    assert slots_while_uploading == free
+    assert resp.status_code == 201
+    assert upstream.calls("POST", "/finance/transactions") == 1
+
+    monkeypatch.setattr(gateway.settings, "proxy_max_body_bytes", 8)
+    resp = client.post("/api/finance/transactions", headers=auth("alice"), content=b'{"amount": "1.00"}')
+    assert resp.status_code == 413
+
+    monkeypatch.setattr(gateway.settings, "proxy_max_body_bytes", 1024)
+    monkeypatch.setattr(gateway.settings, "proxy_body_timeout_seconds", 0.05)
+    resume.clear()
+
+    async def stalled(http: httpx.AsyncClient) -> httpx.Response:
+        return await http.post("/api/finance/transactions", headers=auth("alice"), content=slow_body())
+
+    assert run_in_app(client, stalled).status_code == 408
+    assert upstream.calls("POST", "/finance/transactions") == 1
+    assert finance._slots._value == free
+
+
+class Recorder:
+    """Мок сервиса, который запоминает запрос с телом и отвечает заданными заголовками."""
+
+    def __init__(self, headers: List[Tuple[str, str]], body: bytes) -> None:
+        self.headers = headers
+        self.body = body
+        self.requests: List[Tuple[httpx.Request, bytes]] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request, await request.aread()))
+        return httpx.Response(200, headers=self.headers, stream=httpx.ByteStream(self.body))
+
+
+def test_proxy_streams_raw_body_query_and_headers(client: TestClient) -> None:
+    """Потоковый прокси передает тело и строку запроса как есть, убирает hop-by-hop и сохраняет все set-cookie."""
+    body = b'\x00\xffnot json {"a": 1}'
+    recorder = Recorder(
+        headers=[
+            ("content-type", "application/octet-stream"),
+            ("set-cookie", "a=1; Path=/"),
+            ("set-cookie", "b=2; Path=/; HttpOnly"),
+            ("keep-alive", "timeout=5"),
+            ("upgrade", "h2c"),
+            ("proxy-authenticate", "Basic"),
+            ("x-upstream", "auth"),
+        ],
+        body=body,
+    )
+    gateway.http_client = httpx.AsyncClient(transport=httpx.MockTransport(recorder))
+
+    raw = b"username=alice&password=\xd0\xbf\xd0\xb0\xd1\x80\xd0\xbe\xd0\xbb\xd1\x8c"
+    resp = client.post(
+        "/api/auth/login",
+        content=raw,
+        headers={"Content-Type": "application/x-www-form-urlencoded", "Connection": "keep-alive"},
+    )
+    assert resp.status_code == 200
+    assert resp.content == body
+    assert resp.headers["content-type"] == "application/octet-stream"
+    assert resp.headers.get_list("set-cookie") == ["a=1; Path=/", "b=2; Path=/; HttpOnly"]
+    assert resp.headers["x-upstream"] == "auth"
+    for name in ("keep-alive", "upgrade", "proxy-authenticate"):
+        assert name not in resp.headers
+
+    sent, sent_body = recorder.requests[0]
+    assert sent.url.path == "/auth/login"
+    assert sent_body == raw
+    assert sent.headers["content-type"] == "application/x-www-form-urlencoded"
+
+    query = "limit=5&offset=10&tag=a&tag=b&q=%D0%B5%D0%B4%D0%B0"
+    assert client.get(f"/api/finance/transactions?{query}", headers=auth("alice")).status_code == 200
+    sent, _ = recorder.requests[1]
+    assert sent.url.path == "/finance/transactions"
+    assert sent.url.query == query.encode()